@@ -7,30 +7,105 @@
 
 from __future__ import annotations
 
+from collections.abc import Mapping
 from datetime import timedelta
+from functools import partial
 import logging
+from typing import Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity import DeviceInfo
-from smartmeter_austria_energy.smartmeter import Smartmeter
+from homeassistant.helpers.typing import ConfigType
+import homeassistant.util.dt as dt_util
 from smartmeter_austria_energy.supplier import SUPPLIERS
 
+from .adapter import (
+    SmartmeterAdapter,
+    adapter_port,
+    async_close_adapter,
+    async_create_adapter,
+    async_read_adapter,
+    async_shutdown_read_executor,
+)
+from .aggregate import MeterAggregate
+from .anomaly import ANOMALIES, BASE_LOAD, CONSUMPTION_ANOMALY, CONSUMPTION_BASELINE
+from .backfill import async_backfill_statistics
 from .const import (
     CONF_COM_PORT,
     CONF_KEY_HEX,
+    CONF_SHARED_PORT,
     CONF_SUPPLIER_NAME,
+    DATA_AGGREGATE,
+    DATA_AGGREGATE_OWNER,
     DOMAIN,
+    EVENT_ANOMALY,
+    OPT_AGGREGATE_INTERVAL,
     OPT_DATA_INTERVAL,
     OPT_DATA_INTERVAL_VALUE,
+    OPT_ENERGY_ROLLUP_STATES,
+    OPT_PUBLISH_MQTT_TOPIC,
+    OPT_PUBLISH_UDP_TARGET,
+    OPT_SURPLUS_FILTER,
+    OPT_SURPLUS_MAX_POWER,
+    OPT_SURPLUS_RAMP_RATE,
+    OPT_SURPLUS_WINDOW,
+    OPT_TARIFF_EXPORT_PRICE,
+    OPT_TARIFF_IMPORT_PRICE,
+    OPT_TARIFF_PEAK_HOURS,
+    OPT_TARIFF_PEAK_PRICE,
+    OPT_TARIFF_PRICE_FILE,
     PLATFORMS,
     STARTUP_MESSAGE,
 )
-from .coordinator import SmartmeterDataCoordinator
+from .coordinator import AggregateCoordinator, SmartmeterDataCoordinator
+from .pipeline import TelegramClock
+from .publisher import TelegramPublisher
+from .services import async_setup_services
 from .smartmeter_data import SmartMeterData, SmartMeterConfigEntry
+from .stage_store import PipelineStore, async_remove_pipeline_state
+from .surplus import (
+    SURPLUS_MAX_POWER,
+    SURPLUS_RAMP_RATE,
+    SURPLUS_WINDOW,
+    SurplusController,
+)
+from .tariff import CostCalculator, TariffSchedule, load_dynamic_prices
+from .watchdog import TelegramWatchdog, identify_port
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+# Options which are applied to a running entry, all others reload it.
+TARIFF_OPTIONS = frozenset(
+    {
+        OPT_TARIFF_IMPORT_PRICE,
+        OPT_TARIFF_PEAK_PRICE,
+        OPT_TARIFF_PEAK_HOURS,
+        OPT_TARIFF_EXPORT_PRICE,
+        OPT_TARIFF_PRICE_FILE,
+    }
+)
+SURPLUS_OPTIONS = frozenset(
+    {
+        OPT_SURPLUS_FILTER,
+        OPT_SURPLUS_WINDOW,
+        OPT_SURPLUS_RAMP_RATE,
+        OPT_SURPLUS_MAX_POWER,
+    }
+)
+LIVE_OPTIONS = TARIFF_OPTIONS | SURPLUS_OPTIONS | {OPT_DATA_INTERVAL, OPT_ENERGY_ROLLUP_STATES}
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the services, they are shared by all entries."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: SmartMeterConfigEntry) -> bool:
     """Set up this integration using UI."""
@@ -38,21 +113,28 @@ async def async_setup_entry(hass: HomeAssistant, entry: SmartMeterConfigEntry) -
         hass.data.setdefault(DOMAIN, {})
         _LOGGER.debug(STARTUP_MESSAGE)
 
+    started = dt_util.utcnow()
+
     # Set up the smart meter adapter from a config entry.
     supplier_name = entry.data.get(CONF_SUPPLIER_NAME)
     supplier = SUPPLIERS.get(supplier_name)
     port = entry.data.get(CONF_COM_PORT)
     key_hex = entry.data.get(CONF_KEY_HEX)
+    shared_port = entry.data.get(CONF_SHARED_PORT, False)
 
     data_interval = entry.options.get(
         OPT_DATA_INTERVAL, OPT_DATA_INTERVAL_VALUE)
 
+    adapter = async_create_adapter(hass, supplier, port, key_hex, shared_port)
+
     try:
-        adapter = Smartmeter(supplier, port, key_hex)
-        obisdata = await hass.async_add_executor_job(adapter.read)
+        obisdata = await async_read_adapter(hass, adapter)
     except Exception as err:
+        await async_close_adapter(hass, adapter)
         raise ConfigEntryNotReady from err
 
+    entry.async_on_unload(partial(async_close_adapter, hass, adapter))
+
     # Fetch data for the smart meter device
     device_number = obisdata.DeviceNumber.value
     device_info = DeviceInfo(
@@ -64,32 +146,343 @@ async def async_setup_entry(hass: HomeAssistant, entry: SmartMeterConfigEntry) -
     coordinator = SmartmeterDataCoordinator(hass, adapter)
     coordinator.update_interval = timedelta(seconds=data_interval)
     coordinator.logger = _LOGGER
+    coordinator.rollup_states = entry.options.get(OPT_ENERGY_ROLLUP_STATES, False)
+
+    # The reads are stopped and the port is closed right away on a stop.
+    entry.async_on_unload(hass.bus.async_listen_once(
+        EVENT_HOMEASSISTANT_STOP, partial(_async_stop, hass, coordinator, adapter)))
+
+    # The USB adapter is found again if it is enumerated with a new port.
+    if (local_port := adapter_port(adapter)) is not None:
+        identity = await hass.async_add_executor_job(identify_port, local_port)
+        if identity is not None and identity.is_usb:
+            coordinator.watchdog = TelegramWatchdog(local_port, identity)
+
+    # Optional fan-out of every telegram to local consumers
+    mqtt_topic = entry.options.get(OPT_PUBLISH_MQTT_TOPIC)
+    udp_target = entry.options.get(OPT_PUBLISH_UDP_TARGET)
+    if mqtt_topic or udp_target:
+        try:
+            publisher = TelegramPublisher(
+                hass, device_number, mqtt_topic, udp_target)
+            await publisher.async_start()
+        except (OSError, ValueError) as err:
+            _LOGGER.warning("Telegram publisher cannot be started. %s", err)
+        else:
+            entry.async_on_unload(publisher.stop)
+            coordinator.publisher = publisher
+
+    # Optional costs of the imported and exported energy
+    if entry.options.get(OPT_TARIFF_IMPORT_PRICE) is not None:
+        try:
+            coordinator.pipeline.stages.append(
+                await _async_create_cost_calculator(hass, entry, coordinator.pipeline.clock))
+        except (OSError, ValueError) as err:
+            _LOGGER.warning("Tariff cannot be loaded. %s", err)
+
+    # Optional surplus controller for EV or heat pump charging
+    if entry.options.get(OPT_SURPLUS_FILTER):
+        try:
+            coordinator.pipeline.stages.append(
+                SurplusController(
+                    *_surplus_parameters(entry.options), now=coordinator.pipeline.clock))
+        except ValueError as err:
+            _LOGGER.warning("Surplus controller cannot be set up. %s", err)
+
+    # The costs and the baselines continue after a restart or a reload.
+    pipeline_store = PipelineStore(hass, entry.entry_id, coordinator.pipeline)
+    await pipeline_store.async_restore()
+    coordinator.pipeline_store = pipeline_store
+    entry.async_on_unload(pipeline_store.async_save)
 
     # Fetch initial data so we have data when entities subscribe
     await coordinator.async_config_entry_first_refresh()
 
+    # The meter leaves the building totals when it is unloaded, its counters are kept.
+    entry.async_on_unload(partial(_async_leave_aggregate, hass, entry))
+
+    # Optional building totals of all meters, shown by one entry
+    aggregate_coordinator = None
+    if (aggregate_interval := entry.options.get(OPT_AGGREGATE_INTERVAL)) is not None:
+        aggregate_coordinator = await _async_setup_aggregate(
+            hass, entry, coordinator, aggregate_interval)
+
     # Store the deviceinfo and coordinator object for the platforms to access
     data = SmartMeterData(
-        coordinator=coordinator, device_info=device_info, device_number=device_number)
+        coordinator=coordinator,
+        device_info=device_info,
+        device_number=device_number,
+        options=entry.options,
+        aggregate_coordinator=aggregate_coordinator,
+    )
 
     entry.runtime_data = data
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    # Wait to install the reload listener until everything was successfully initialized
+    _async_track_anomalies(hass, entry, coordinator, device_number)
+
+    # Fill the energy statistics missed while Home Assistant was down
+    if "recorder" in hass.config.components:
+        entry.async_create_background_task(
+            hass,
+            async_backfill_statistics(hass, device_number, started),
+            f"{DOMAIN} backfill {device_number}",
+        )
+
+        # The hourly rollups of the energy counters continue the last statistics.
+        from .energy_statistics import RollupStatisticsPublisher
+
+        statistics_publisher = RollupStatisticsPublisher(
+            hass, device_number, coordinator.rollups)
+        coordinator.statistics_publisher = statistics_publisher
+        entry.async_create_background_task(
+            hass,
+            statistics_publisher.async_load(),
+            f"{DOMAIN} rollup statistics {device_number}",
+        )
+
+    # Wait to install the options listener until everything was successfully initialized
     entry.async_on_unload(entry.add_update_listener(
         async_options_update_listener))
 
     return True
 
 
+async def _async_stop(
+    hass: HomeAssistant,
+    coordinator: SmartmeterDataCoordinator,
+    adapter: SmartmeterAdapter,
+    event: Event,
+) -> None:
+    """Stop the reads of an entry and release its port when Home Assistant stops."""
+    await coordinator.async_shutdown()
+    await async_close_adapter(hass, adapter)
+
+
+async def _async_setup_aggregate(
+    hass: HomeAssistant,
+    entry: SmartMeterConfigEntry,
+    coordinator: SmartmeterDataCoordinator,
+    interval: float,
+) -> AggregateCoordinator | None:
+    """Show the building totals, which all meters update with their telegrams.
+
+    The totals are kept when the entry which shows them is unloaded, so a
+    reload does not lose the counters of the meters which are not loaded.
+    Returns None if another entry shows the totals already.
+    """
+    if hass.data[DOMAIN].get(DATA_AGGREGATE_OWNER) is not None:
+        _LOGGER.warning(
+            "Building totals are shown by another smart meter already, "
+            "the publish interval of '%s' is ignored", entry.title)
+        return None
+
+    if (aggregate := hass.data[DOMAIN].get(DATA_AGGREGATE)) is None:
+        aggregate = MeterAggregate()
+        # The meters which are running already add their newest telegram.
+        for other in hass.config_entries.async_entries(DOMAIN):
+            if other.state is not ConfigEntryState.LOADED:
+                continue
+            other_coordinator = other.runtime_data.coordinator
+            if other_coordinator.data is not None:
+                aggregate.update(other.entry_id, other_coordinator.data)
+        hass.data[DOMAIN][DATA_AGGREGATE] = aggregate
+    if coordinator.data is not None:
+        aggregate.update(entry.entry_id, coordinator.data)
+    hass.data[DOMAIN][DATA_AGGREGATE_OWNER] = entry.entry_id
+
+    @callback
+    def _async_release_aggregate() -> None:
+        """Let another entry show the totals."""
+        if hass.data[DOMAIN].get(DATA_AGGREGATE_OWNER) == entry.entry_id:
+            hass.data[DOMAIN].pop(DATA_AGGREGATE_OWNER)
+
+    entry.async_on_unload(_async_release_aggregate)
+
+    aggregate_coordinator = AggregateCoordinator(hass, aggregate, interval)
+    await aggregate_coordinator.async_refresh()
+    return aggregate_coordinator
+
+
+@callback
+def _async_leave_aggregate(hass: HomeAssistant, entry: SmartMeterConfigEntry) -> None:
+    """Remove the values of a meter from the building totals, except its counters.
+
+    The counters are kept while the meter is reloaded, so the energy totals
+    do not drop. They are removed when the entry is disabled or removed.
+    """
+    if (aggregate := hass.data[DOMAIN].get(DATA_AGGREGATE)) is not None:
+        aggregate.leave(entry.entry_id)
+
+
+@callback
+def _async_track_anomalies(
+    hass: HomeAssistant,
+    entry: SmartMeterConfigEntry,
+    coordinator: SmartmeterDataCoordinator,
+    device_number: str,
+) -> None:
+    """Fire an event when an anomaly of the consumption starts."""
+    active: set[str] = set()
+
+    @callback
+    def _async_check_anomaly(anomaly: str) -> None:
+        """Fire the event if the anomaly was not active before."""
+        values = coordinator.derived_values
+        if not values.get(anomaly):
+            active.discard(anomaly)
+            return
+        if anomaly in active:
+            return
+
+        active.add(anomaly)
+        obisdata = coordinator.data
+        hass.bus.async_fire(
+            EVENT_ANOMALY,
+            {
+                "device_number": device_number,
+                "type": anomaly,
+                "power": None if obisdata is None else obisdata.RealPowerIn.value,
+                "baseline": values.get(
+                    CONSUMPTION_BASELINE if anomaly == CONSUMPTION_ANOMALY else BASE_LOAD
+                ),
+            },
+        )
+
+    # The listeners are called only if the value of their anomaly changed.
+    for anomaly in ANOMALIES:
+        entry.async_on_unload(coordinator.async_add_listener(
+            partial(_async_check_anomaly, anomaly), anomaly))
+
+
+def _surplus_parameters(options: Mapping[str, Any]) -> tuple[str, int, float, float]:
+    """Get the filter, the window, the ramp rate and the maximum power of the surplus controller."""
+    return (
+        options[OPT_SURPLUS_FILTER],
+        options.get(OPT_SURPLUS_WINDOW, SURPLUS_WINDOW),
+        options.get(OPT_SURPLUS_RAMP_RATE, SURPLUS_RAMP_RATE),
+        options.get(OPT_SURPLUS_MAX_POWER, SURPLUS_MAX_POWER),
+    )
+
+
+async def _async_create_cost_calculator(
+    hass: HomeAssistant, entry: SmartMeterConfigEntry, clock: TelegramClock
+) -> CostCalculator:
+    """Create the cost calculation of the configured tariff."""
+    schedule, export_price = await _async_create_tariff(hass, entry.options)
+    return CostCalculator(schedule, export_price, now=clock)
+
+
+async def _async_create_tariff(
+    hass: HomeAssistant, options: Mapping[str, Any]
+) -> tuple[TariffSchedule, float]:
+    """Create the schedule and the export price of the configured tariff."""
+    dynamic_prices = None
+    if price_file := options.get(OPT_TARIFF_PRICE_FILE):
+        dynamic_prices = await hass.async_add_executor_job(
+            load_dynamic_prices, hass.config.path(price_file))
+
+    schedule = TariffSchedule(
+        options[OPT_TARIFF_IMPORT_PRICE],
+        options.get(OPT_TARIFF_PEAK_PRICE),
+        options.get(OPT_TARIFF_PEAK_HOURS) or "",
+        dynamic_prices,
+    )
+    return schedule, options.get(OPT_TARIFF_EXPORT_PRICE) or 0.0
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: SmartMeterConfigEntry) -> bool:
     """Handle removal of an entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+    # The read threads are released with the last entry.
+    if unloaded and not any(
+        other.state is ConfigEntryState.LOADED
+        for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id
+    ):
+        async_shutdown_read_executor(hass)
+
+    return unloaded
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: SmartMeterConfigEntry) -> None:
+    """Remove the stored state of a removed entry."""
+    await async_remove_pipeline_state(hass, entry.entry_id)
 
 
 async def async_options_update_listener(
     hass: HomeAssistant, config_entry: SmartMeterConfigEntry
 ) -> None:
-    """Handle options update."""
-    await hass.config_entries.async_reload(config_entry.entry_id)
+    """Handle options update.
+
+    The interval and the prices are applied to the running entry, the serial
+    session and the entities are kept. Other changes reload the entry.
+    """
+    data: SmartMeterData | None = getattr(config_entry, "runtime_data", None)
+    if data is None or not await _async_apply_options(hass, config_entry, data):
+        await hass.config_entries.async_reload(config_entry.entry_id)
+
+
+async def _async_apply_options(
+    hass: HomeAssistant, entry: SmartMeterConfigEntry, data: SmartMeterData
+) -> bool:
+    """Apply the changed options without a reload.
+
+    Returns False if a changed option needs a reload.
+    """
+    old_options = data.options
+    new_options = entry.options
+    changed = {
+        key
+        for key in old_options.keys() | new_options.keys()
+        if old_options.get(key) != new_options.get(key)
+    }
+    if not changed:
+        return True
+    if not changed <= LIVE_OPTIONS:
+        return False
+
+    coordinator = data.coordinator
+    cost_calculator = next(
+        (stage for stage in coordinator.pipeline.stages
+         if isinstance(stage, CostCalculator)),
+        None,
+    )
+    # Switching the tariff on or off adds or removes the cost sensors.
+    if (cost_calculator is None) != (new_options.get(OPT_TARIFF_IMPORT_PRICE) is None):
+        return False
+
+    surplus_controller = next(
+        (stage for stage in coordinator.pipeline.stages
+         if isinstance(stage, SurplusController)),
+        None,
+    )
+    # Switching the surplus controller on or off adds or removes its sensors.
+    if (surplus_controller is None) == bool(new_options.get(OPT_SURPLUS_FILTER)):
+        return False
+
+    if surplus_controller is not None and changed & SURPLUS_OPTIONS:
+        try:
+            surplus_controller.configure(*_surplus_parameters(new_options))
+        except ValueError as err:
+            _LOGGER.warning("Surplus controller cannot be configured. %s", err)
+
+    if cost_calculator is not None and changed & TARIFF_OPTIONS:
+        try:
+            cost_calculator.set_tariff(
+                *await _async_create_tariff(hass, new_options))
+        except (OSError, ValueError) as err:
+            _LOGGER.warning("Tariff cannot be loaded. %s", err)
+
+    if OPT_ENERGY_ROLLUP_STATES in changed:
+        coordinator.rollup_states = new_options.get(OPT_ENERGY_ROLLUP_STATES, False)
+
+    if OPT_DATA_INTERVAL in changed:
+        coordinator.async_set_update_interval(timedelta(
+            seconds=new_options.get(OPT_DATA_INTERVAL, OPT_DATA_INTERVAL_VALUE)))
+
+    data.options = new_options
+    _LOGGER.debug("Options of '%s' applied: %s", data.device_number, sorted(changed))
+    return True
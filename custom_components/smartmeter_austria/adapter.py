@@ -0,0 +1,183 @@
+"""Creates and reads the smart meter adapter matching the configured port."""
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+from smartmeter_austria_energy.exceptions import SmartmeterTimeoutException
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.smartmeter import Smartmeter
+from smartmeter_austria_energy.supplier import Supplier
+
+from .const import (
+    DATA_MULTIPLEXERS,
+    DATA_READ_EXECUTOR,
+    DATA_READ_EXECUTOR_STOP,
+    DOMAIN,
+)
+from .executor import ReadExecutor
+from .multiplexer import MultiplexedSmartmeter, PortMultiplexer
+from .network import NetworkSmartmeter, StreamSmartmeter, is_network_port, is_serial_url
+from .serial_protocol import SerialSmartmeter, supports_event_loop_reads
+
+type SmartmeterAdapter = Smartmeter | MultiplexedSmartmeter | StreamSmartmeter
+
+
+def async_get_multiplexer(hass: HomeAssistant, port: str) -> PortMultiplexer:
+    """Get the multiplexer of a port, it is created on first use."""
+    multiplexers: dict[str, PortMultiplexer] = hass.data.setdefault(
+        DOMAIN, {}
+    ).setdefault(DATA_MULTIPLEXERS, {})
+
+    if (multiplexer := multiplexers.get(port)) is None:
+        multiplexer = PortMultiplexer(port)
+        multiplexers[port] = multiplexer
+    return multiplexer
+
+
+def async_get_read_executor(hass: HomeAssistant) -> ReadExecutor:
+    """Get the thread pool of the blocking reads, it is created on first use."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if (executor := data.get(DATA_READ_EXECUTOR)) is None:
+        executor = ReadExecutor()
+        data[DATA_READ_EXECUTOR] = executor
+
+        @callback
+        def _async_shutdown(event: Event) -> None:
+            """Shut down the pool with Home Assistant."""
+            # The listener is removed by firing.
+            data.pop(DATA_READ_EXECUTOR_STOP, None)
+            async_shutdown_read_executor(hass)
+
+        data[DATA_READ_EXECUTOR_STOP] = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, _async_shutdown
+        )
+    return executor
+
+
+@callback
+def async_shutdown_read_executor(hass: HomeAssistant) -> None:
+    """Shut down the thread pool of the blocking reads, if it was created."""
+    data = hass.data.get(DOMAIN, {})
+    if (unsub_stop := data.pop(DATA_READ_EXECUTOR_STOP, None)) is not None:
+        unsub_stop()
+    if (executor := data.pop(DATA_READ_EXECUTOR, None)) is not None:
+        executor.shutdown()
+
+
+def async_create_adapter(
+    hass: HomeAssistant,
+    supplier: Supplier,
+    port: str,
+    key_hex: str,
+    shared_port: bool = False,
+) -> SmartmeterAdapter:
+    """Create the adapter for a local device path or a network bridge URL.
+
+    A local port is read on the event loop, the blocking read of the
+    library is the fallback of platforms which cannot watch the port.
+    """
+    if is_network_port(port):
+        return NetworkSmartmeter(supplier, port, key_hex)
+
+    if shared_port or is_serial_url(port):
+        # The multiplexer keeps the port open, which also avoids a new
+        # RFC2217 negotiation for every telegram.
+        adapter: SmartmeterAdapter = MultiplexedSmartmeter(
+            async_get_multiplexer(hass, port), supplier, key_hex)
+    elif supports_event_loop_reads():
+        return SerialSmartmeter(
+            supplier, port, key_hex, executor=async_get_read_executor(hass))
+    else:
+        adapter = Smartmeter(supplier, port, key_hex)
+
+    # Every blocking adapter gets a thread of the read executor.
+    async_get_read_executor(hass).add_reader(adapter)
+    return adapter
+
+
+async def async_read_adapter(hass: HomeAssistant, adapter: SmartmeterAdapter) -> ObisData:
+    """Read the next telegram, blocking adapters are read in the read executor.
+
+    The read of the library's Smartmeter cannot be interrupted, it stops
+    after its own timeout of 5 s.
+    """
+    if isinstance(adapter, StreamSmartmeter):
+        return await adapter.async_read()
+
+    interrupt = adapter.interrupt if isinstance(adapter, MultiplexedSmartmeter) else None
+    return await _async_run_read(hass, adapter.read, interrupt)
+
+
+async def async_read_adapter_batch(
+    hass: HomeAssistant, adapter: SmartmeterAdapter
+) -> list[ObisData]:
+    """Read all telegrams received since the last read, oldest first.
+
+    Telegrams which piled up while the event loop or the executor stalled
+    are returned together. The library's Smartmeter reads one telegram.
+    """
+    if isinstance(adapter, StreamSmartmeter):
+        return await adapter.async_read_batch()
+
+    if isinstance(adapter, MultiplexedSmartmeter):
+        return await _async_run_read(hass, adapter.read_batch, adapter.interrupt)
+
+    return [await _async_run_read(hass, adapter.read)]
+
+
+async def _async_run_read[T](
+    hass: HomeAssistant,
+    read: Callable[[], T],
+    interrupt: Callable[[], None] | None = None,
+) -> T:
+    """Run a blocking read in the read executor."""
+    try:
+        return await async_get_read_executor(hass).async_run(read, interrupt)
+    except TimeoutError as exception:
+        raise SmartmeterTimeoutException("The read did not finish in time.") from exception
+
+
+def adapter_port(adapter: SmartmeterAdapter) -> str | None:
+    """Get the local port of an adapter which can be bound to another port.
+
+    None for network bridges and the library's Smartmeter.
+    """
+    if isinstance(adapter, SerialSmartmeter):
+        return adapter.port
+    if isinstance(adapter, MultiplexedSmartmeter) and not is_serial_url(
+        adapter.multiplexer.port
+    ):
+        return adapter.multiplexer.port
+    return None
+
+
+async def async_rebind_adapter(
+    hass: HomeAssistant, adapter: SmartmeterAdapter, port: str
+) -> None:
+    """Read the adapter from another local port.
+
+    The multiplexer of a shared port is bound for all meters of the line.
+    """
+    if isinstance(adapter, SerialSmartmeter):
+        adapter.rebind(port)
+    elif isinstance(adapter, MultiplexedSmartmeter):
+        multiplexer = adapter.multiplexer
+        multiplexers = hass.data.get(DOMAIN, {}).get(DATA_MULTIPLEXERS, {})
+        if multiplexers.get(multiplexer.port) is multiplexer:
+            multiplexers.pop(multiplexer.port)
+        await hass.async_add_executor_job(multiplexer.rebind, port)
+        multiplexers.setdefault(port, multiplexer)
+
+
+async def async_close_adapter(hass: HomeAssistant, adapter: SmartmeterAdapter) -> None:
+    """Release the port and the read thread of the adapter."""
+    if isinstance(adapter, StreamSmartmeter):
+        adapter.close()
+        return
+
+    if (executor := hass.data.get(DOMAIN, {}).get(DATA_READ_EXECUTOR)) is not None:
+        executor.remove_reader(adapter)
+    if isinstance(adapter, MultiplexedSmartmeter):
+        await hass.async_add_executor_job(adapter.close)
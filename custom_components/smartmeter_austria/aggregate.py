@@ -0,0 +1,187 @@
+"""Building totals of all meters of an installation.
+
+Every meter adds the values of its newest telegram, the contribution of its
+previous telegram is subtracted. An update costs the same for one or for many
+meters. The totals of the energy counters are published only when all
+running meters have reported, a missing meter would make them drop.
+This module must not import Home Assistant.
+"""
+from __future__ import annotations
+
+from collections.abc import Hashable, Iterable
+import math
+
+from smartmeter_austria_energy.obisdata import ObisData
+
+AGGREGATE_VALUES = (
+    "RealPowerIn",
+    "RealPowerOut",
+    "RealEnergyIn",
+    "RealEnergyOut",
+    "CurrentL1",
+    "CurrentL2",
+    "CurrentL3",
+)
+
+# Counters whose totals must never drop, they need the values of all meters.
+AGGREGATE_COUNTERS = ("RealEnergyIn", "RealEnergyOut")
+
+# Calculated from the totals when they are read
+AGGREGATE_DELTA = "RealPowerDelta"
+
+# Publish interval of the totals in seconds
+AGGREGATE_INTERVAL = 10
+
+# Updates after which the totals are summed again, the running sums drift.
+AGGREGATE_RESUM_UPDATES = 10000
+
+# Decimals of the published totals
+AGGREGATE_DECIMALS = 3
+
+
+class MeterAggregate:
+    """Sums the values of the newest telegrams of all meters.
+
+    The last telegram of a meter counts until the meter is removed, so a
+    meter which fails to read does not cause a step of the totals. A meter
+    which leaves, e.g. for a reload, keeps its counters. A value which no
+    meter supplies is None, the counters are None until all expected meters
+    have reported.
+    """
+
+    def __init__(
+        self,
+        keys: tuple[str, ...] = AGGREGATE_VALUES,
+        resum_updates: int = AGGREGATE_RESUM_UPDATES,
+        counters: tuple[str, ...] = AGGREGATE_COUNTERS,
+    ) -> None:
+        """Initialize."""
+        self._keys = keys
+        self._resum_updates = resum_updates
+        self._counters = frozenset(counters)
+        self._totals: list[float] = [0.0] * len(keys)
+        self._counts: list[int] = [0] * len(keys)
+        self._contributions: dict[Hashable, list[float | None]] = {}
+        self._expected: frozenset[Hashable] = frozenset()
+        self._updates: int = 0
+
+    @property
+    def meters(self) -> int:
+        """Gets the number of meters which contribute to the totals."""
+        return len(self._contributions)
+
+    @property
+    def complete(self) -> bool:
+        """Gets if all expected meters have reported."""
+        return self._expected <= self._contributions.keys()
+
+    @property
+    def updates(self) -> int:
+        """Gets the number of telegrams which were added."""
+        return self._updates
+
+    def update(self, meter: Hashable, obisdata: ObisData) -> None:
+        """Replace the contribution of a meter by the values of its newest telegram."""
+        contribution: list[float | None] = []
+        for key in self._keys:
+            obis_value = getattr(obisdata, key, None)
+            value = None if obis_value is None else obis_value.value
+            contribution.append(
+                value if isinstance(value, int | float) else None)
+
+        self._subtract(self._contributions.get(meter))
+        self._contributions[meter] = contribution
+        self._add(contribution)
+
+        self._updates += 1
+        if self._updates % self._resum_updates == 0:
+            self._resum()
+
+    def leave(self, meter: Hashable) -> None:
+        """Keep the counters of a meter which stops reading, its other values do not count any longer."""
+        if (contribution := self._contributions.get(meter)) is None:
+            return
+        self._subtract(contribution)
+        contribution = [
+            value if key in self._counters else None
+            for key, value in zip(self._keys, contribution, strict=True)
+        ]
+        self._contributions[meter] = contribution
+        self._add(contribution)
+
+    def remove(self, meter: Hashable) -> None:
+        """Remove the contribution of a meter."""
+        self._subtract(self._contributions.pop(meter, None))
+        if not self._contributions:
+            # Clears the rounding errors of the running sums.
+            self._resum()
+
+    def expect(
+        self,
+        meters: Iterable[Hashable],
+        configured: Iterable[Hashable] | None = None,
+    ) -> None:
+        """Set the meters which have to report before the counters are published.
+
+        The contributions of the meters which are not configured are
+        removed, by default of all meters which are not expected.
+        """
+        self._expected = frozenset(meters)
+        kept = self._expected if configured is None else frozenset(configured)
+        for meter in self._contributions.keys() - kept:
+            self.remove(meter)
+
+    def values(self) -> dict[str, float | None]:
+        """Return the totals and the building's power delta."""
+        complete = self.complete
+        values: dict[str, float | None] = {
+            key: round(total, AGGREGATE_DECIMALS)
+            if count and (complete or key not in self._counters)
+            else None
+            for key, total, count in zip(
+                self._keys, self._totals, self._counts, strict=True)
+        }
+        power_in = values.get("RealPowerIn")
+        power_out = values.get("RealPowerOut")
+        if power_in is not None and power_out is not None:
+            values[AGGREGATE_DELTA] = round(power_in - power_out, AGGREGATE_DECIMALS)
+        return values
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the statistics of the totals."""
+        return {
+            "meters": self.meters,
+            "expected_meters": len(self._expected),
+            "updates": self._updates,
+        }
+
+    def _add(self, contribution: list[float | None]) -> None:
+        """Add the values of a meter to the totals."""
+        totals = self._totals
+        counts = self._counts
+        for index, value in enumerate(contribution):
+            if value is not None:
+                totals[index] += value
+                counts[index] += 1
+
+    def _subtract(self, contribution: list[float | None] | None) -> None:
+        """Subtract the values of a meter from the totals."""
+        if contribution is None:
+            return
+        totals = self._totals
+        counts = self._counts
+        for index, value in enumerate(contribution):
+            if value is not None:
+                totals[index] -= value
+                counts[index] -= 1
+
+    def _resum(self) -> None:
+        """Sum the contributions of all meters again."""
+        for index in range(len(self._keys)):
+            values = [
+                contribution[index]
+                for contribution in self._contributions.values()
+                if contribution[index] is not None
+            ]
+            self._totals[index] = math.fsum(values)
+            self._counts[index] = len(values)
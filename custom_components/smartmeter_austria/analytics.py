@@ -0,0 +1,153 @@
+"""Phase imbalance and voltage quality analytics of the three phases."""
+from __future__ import annotations
+
+from collections import deque
+import math
+
+from smartmeter_austria_energy.obisdata import ObisData
+
+# Nominal voltage and EN 50160 bands
+NOMINAL_VOLTAGE = 230.0
+UNDER_VOLTAGE_SEVERE = 0.85 * NOMINAL_VOLTAGE
+UNDER_VOLTAGE = 0.90 * NOMINAL_VOLTAGE
+OVER_VOLTAGE = 1.10 * NOMINAL_VOLTAGE
+
+# Number of telegrams of the sliding windows
+WINDOW_SIZE = 60
+
+PHASES = (1, 2, 3)
+
+VOLTAGE_IMBALANCE = "voltage_imbalance"
+VOLTAGE_IMBALANCE_AVERAGE = "voltage_imbalance_average"
+UNDER_VOLTAGE_SEVERE_COUNT = "under_voltage_severe_count"
+UNDER_VOLTAGE_COUNT = "under_voltage_count"
+OVER_VOLTAGE_COUNT = "over_voltage_count"
+NEUTRAL_CURRENT = "neutral_current"
+NEUTRAL_CURRENT_AVERAGE = "neutral_current_average"
+LOAD_SHARE = "load_share_l{}"
+
+
+class SlidingWindow:
+    """Keeps the sum of the last values, updates are O(1)."""
+
+    def __init__(self, size: int = WINDOW_SIZE) -> None:
+        """Initialize."""
+        self._values: deque[float] = deque(maxlen=size)
+        self._sum: float = 0.0
+        self._updates: int = 0
+
+    def __len__(self) -> int:
+        """Return the number of values in the window."""
+        return len(self._values)
+
+    def add(self, value: float) -> None:
+        """Add a value, the oldest value drops out of a full window."""
+        if len(self._values) == self._values.maxlen:
+            self._sum -= self._values[0]
+        self._values.append(value)
+        self._sum += value
+
+        # Recalculate the sum once per window to drop accumulated rounding errors.
+        self._updates += 1
+        if self._updates >= len(self._values):
+            self._updates = 0
+            self._sum = math.fsum(self._values)
+
+    @property
+    def sum(self) -> float:
+        """Gets the sum of the values in the window."""
+        return self._sum
+
+    @property
+    def mean(self) -> float | None:
+        """Gets the mean of the values in the window."""
+        if not self._values:
+            return None
+        return self._sum / len(self._values)
+
+
+def voltage_imbalance(voltages: tuple[float, float, float]) -> float:
+    """Get the maximum deviation from the average voltage in percent."""
+    average = sum(voltages) / 3
+    return max(abs(voltage - average) for voltage in voltages) / average * 100
+
+
+def neutral_current(currents: tuple[float, float, float]) -> float:
+    """Estimate the neutral current of 120° shifted phases with equal power factors."""
+    i1, i2, i3 = currents
+    square = i1 * i1 + i2 * i2 + i3 * i3 - i1 * i2 - i2 * i3 - i3 * i1
+    return math.sqrt(max(square, 0.0))
+
+
+class PhaseQualityAnalyzer:
+    """Calculates the power quality values incrementally for every telegram."""
+
+    def __init__(self, window_size: int = WINDOW_SIZE) -> None:
+        """Initialize."""
+        self._imbalance = SlidingWindow(window_size)
+        self._neutral_current = SlidingWindow(window_size)
+        self._under_voltage_severe = SlidingWindow(window_size)
+        self._under_voltage = SlidingWindow(window_size)
+        self._over_voltage = SlidingWindow(window_size)
+        self._load_share = {phase: SlidingWindow(window_size) for phase in PHASES}
+        self._values: dict[str, float | None] = {}
+
+    @property
+    def values(self) -> dict[str, float | None]:
+        """Gets the values calculated from the last telegram."""
+        return self._values
+
+    def update(self, obisdata: ObisData) -> dict[str, float | None]:
+        """Add the voltages and currents of a telegram to the windows."""
+        voltages = _phase_values(obisdata, "VoltageL{}")
+        currents = _phase_values(obisdata, "CurrentL{}")
+        values: dict[str, float | None] = {}
+
+        # Single phase meters report 0 V on L2 and L3.
+        if voltages is not None and all(voltage > 0 for voltage in voltages):
+            imbalance = voltage_imbalance(voltages)
+            self._imbalance.add(imbalance)
+            self._under_voltage_severe.add(
+                sum(voltage < UNDER_VOLTAGE_SEVERE for voltage in voltages))
+            self._under_voltage.add(
+                sum(voltage < UNDER_VOLTAGE for voltage in voltages))
+            self._over_voltage.add(
+                sum(voltage > OVER_VOLTAGE for voltage in voltages))
+            values[VOLTAGE_IMBALANCE] = round(imbalance, 3)
+
+        values[VOLTAGE_IMBALANCE_AVERAGE] = _rounded(self._imbalance.mean)
+        values[UNDER_VOLTAGE_SEVERE_COUNT] = int(self._under_voltage_severe.sum)
+        values[UNDER_VOLTAGE_COUNT] = int(self._under_voltage.sum)
+        values[OVER_VOLTAGE_COUNT] = int(self._over_voltage.sum)
+
+        if currents is not None:
+            neutral = neutral_current(currents)
+            self._neutral_current.add(neutral)
+            values[NEUTRAL_CURRENT] = round(neutral, 3)
+            total_current = sum(currents)
+            if total_current > 0:
+                for phase, current in zip(PHASES, currents, strict=True):
+                    self._load_share[phase].add(current / total_current * 100)
+
+        values[NEUTRAL_CURRENT_AVERAGE] = _rounded(self._neutral_current.mean)
+        for phase in PHASES:
+            values[LOAD_SHARE.format(phase)] = _rounded(self._load_share[phase].mean)
+
+        self._values = values
+        return values
+
+
+def _phase_values(obisdata: ObisData, name: str) -> tuple[float, float, float] | None:
+    """Get the values of the three phases, None if a phase is missing."""
+    values = []
+    for phase in PHASES:
+        obis_value = getattr(obisdata, name.format(phase), None)
+        if obis_value is None:
+            return None
+        values.append(obis_value.value)
+    return tuple(values)
+
+
+def _rounded(value: float | None) -> float | None:
+    """Round a mean value for the state."""
+    return None if value is None else round(value, 3)
@@ -0,0 +1,206 @@
+"""Anomaly detection on a per time-of-day consumption baseline.
+
+Everything is calculated online from the telegrams with a fixed memory per
+meter, no history is queried. The baselines are kept over restarts with
+as_state() and restore(). This module must not import Home Assistant.
+"""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+from datetime import datetime
+import math
+from typing import Any
+
+from smartmeter_austria_energy.obisdata import ObisData
+
+from .pipeline import StageValues
+
+# Weight of a new hour in the baselines, about the last 10 days count.
+BASELINE_ALPHA = 0.1
+
+# Hours which must be seen before a baseline is used.
+MIN_BASELINE_SAMPLES = 3
+
+# Deviation from the baseline in standard deviations which is an anomaly.
+ANOMALY_THRESHOLD = 3.0
+
+# Lower limit of the standard deviation in W, quiet baselines would
+# report every small change otherwise.
+MIN_DEVIATION = 50.0
+
+# Number of telegrams of the short window which is compared with the baselines.
+SHORT_WINDOW_SIZE = 10
+
+NIGHT_HOURS = frozenset(range(0, 5))
+
+CONSUMPTION_BASELINE = "consumption_baseline"
+BASE_LOAD = "base_load"
+CONSUMPTION_ANOMALY = "consumption_anomaly"
+STANDBY_ANOMALY = "standby_anomaly"
+BASE_LOAD_JUMP = "base_load_jump"
+
+ANOMALIES = (CONSUMPTION_ANOMALY, STANDBY_ANOMALY, BASE_LOAD_JUMP)
+
+
+class ExponentialStatistics:
+    """Keeps an exponentially weighted mean and variance, updates are O(1)."""
+
+    __slots__ = ("_alpha", "_count", "_mean", "_variance")
+
+    def __init__(self, alpha: float = BASELINE_ALPHA) -> None:
+        """Initialize."""
+        self._alpha = alpha
+        self._count = 0
+        self._mean = 0.0
+        self._variance = 0.0
+
+    @property
+    def count(self) -> int:
+        """Gets the number of added values."""
+        return self._count
+
+    @property
+    def mean(self) -> float | None:
+        """Gets the weighted mean."""
+        return self._mean if self._count else None
+
+    @property
+    def deviation(self) -> float:
+        """Gets the weighted standard deviation."""
+        return math.sqrt(self._variance)
+
+    def add(self, value: float) -> None:
+        """Add a value, older values lose weight."""
+        if not self._count:
+            self._mean = value
+        else:
+            difference = value - self._mean
+            increment = self._alpha * difference
+            self._mean += increment
+            self._variance = (1 - self._alpha) * (self._variance + difference * increment)
+        self._count += 1
+
+    def as_state(self) -> list[float]:
+        """Return the count, the mean and the variance."""
+        return [self._count, self._mean, self._variance]
+
+    def restore(self, state: list[float]) -> None:
+        """Continue with a stored count, mean and variance."""
+        count, mean, variance = state
+        self._count = int(count)
+        self._mean = float(mean)
+        self._variance = float(variance)
+
+    def exceeded_by(self, value: float, threshold: float = ANOMALY_THRESHOLD) -> bool:
+        """Check if a value is above the mean by more than the threshold."""
+        if self._count < MIN_BASELINE_SAMPLES:
+            return False
+        return value > self._mean + threshold * max(self.deviation, MIN_DEVIATION)
+
+
+class ConsumptionAnomalyDetector:
+    """Learns the consumption per hour of the day and flags the deviations.
+
+    - consumption_anomaly: the power is far above the baseline of this hour,
+      e.g. an appliance was left on.
+    - standby_anomaly: the lowest power at night is far above the night
+      base load, e.g. an unexpected standby load.
+    - base_load_jump: the lowest power of the last hour was far above the
+      base load of all hours.
+    """
+
+    def __init__(
+        self,
+        now: Callable[[], datetime] = lambda: datetime.now().astimezone(),
+    ) -> None:
+        """Initialize."""
+        self._now = now
+        self._hourly = [ExponentialStatistics() for _ in range(24)]
+        self._base_load = ExponentialStatistics()
+        self._night_base_load = ExponentialStatistics()
+        self._window: deque[float] = deque(maxlen=SHORT_WINDOW_SIZE)
+        self._hour: tuple[int, int, int, int] | None = None
+        self._hour_sum = 0.0
+        self._hour_count = 0
+        self._hour_minimum = math.inf
+        self._base_load_jump = False
+
+    def as_state(self) -> dict[str, Any]:
+        """Return the baselines and the running hour, which can be stored as JSON."""
+        return {
+            "hourly": [statistics.as_state() for statistics in self._hourly],
+            "base_load": self._base_load.as_state(),
+            "night_base_load": self._night_base_load.as_state(),
+            "hour": self._hour,
+            "hour_sum": self._hour_sum,
+            "hour_count": self._hour_count,
+            "hour_minimum": None if math.isinf(self._hour_minimum) else self._hour_minimum,
+            "base_load_jump": self._base_load_jump,
+        }
+
+    def restore(self, state: dict[str, Any]) -> None:
+        """Continue with stored baselines, the short window starts empty."""
+        hourly = state["hourly"]
+        if len(hourly) != len(self._hourly):
+            raise ValueError(f"{len(hourly)} hourly baselines were stored.")
+        for statistics, statistics_state in zip(self._hourly, hourly, strict=True):
+            statistics.restore(statistics_state)
+        self._base_load.restore(state["base_load"])
+        self._night_base_load.restore(state["night_base_load"])
+        self._hour = tuple(state["hour"]) if state.get("hour") else None
+        self._hour_sum = state.get("hour_sum", 0.0)
+        self._hour_count = state.get("hour_count", 0)
+        hour_minimum = state.get("hour_minimum")
+        self._hour_minimum = math.inf if hour_minimum is None else hour_minimum
+        self._base_load_jump = state.get("base_load_jump", False)
+
+    def update(self, obisdata: ObisData) -> StageValues:
+        """Add the power of a telegram and check it against the baselines."""
+        moment = self._now()
+        hour = (moment.year, moment.month, moment.day, moment.hour)
+        if self._hour != hour:
+            self._close_hour()
+            self._hour = hour
+
+        power = obisdata.RealPowerIn.value
+        self._window.append(power)
+        self._hour_sum += power
+        self._hour_count += 1
+        self._hour_minimum = min(self._hour_minimum, power)
+
+        baseline = self._hourly[moment.hour]
+        window_mean = sum(self._window) / len(self._window)
+        window_minimum = min(self._window)
+        full_window = len(self._window) == SHORT_WINDOW_SIZE
+
+        return {
+            CONSUMPTION_BASELINE: _rounded(baseline.mean),
+            BASE_LOAD: _rounded(self._base_load.mean),
+            CONSUMPTION_ANOMALY: full_window and baseline.exceeded_by(window_mean),
+            STANDBY_ANOMALY: full_window
+            and moment.hour in NIGHT_HOURS
+            and self._night_base_load.exceeded_by(window_minimum),
+            BASE_LOAD_JUMP: self._base_load_jump,
+        }
+
+    def _close_hour(self) -> None:
+        """Add the mean and the minimum of the finished hour to the baselines."""
+        if self._hour is None or not self._hour_count:
+            return
+
+        hour = self._hour[3]
+        self._base_load_jump = self._base_load.exceeded_by(self._hour_minimum)
+        self._hourly[hour].add(self._hour_sum / self._hour_count)
+        self._base_load.add(self._hour_minimum)
+        if hour in NIGHT_HOURS:
+            self._night_base_load.add(self._hour_minimum)
+
+        self._hour_sum = 0.0
+        self._hour_count = 0
+        self._hour_minimum = math.inf
+
+
+def _rounded(value: float | None) -> float | None:
+    """Round a baseline for the state."""
+    return None if value is None else round(value, 1)
@@ -0,0 +1,165 @@
+"""Backfills the hourly energy statistics missed while Home Assistant was down."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import logging
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.history import get_last_state_changes
+from homeassistant.components.recorder.models import StatisticData
+from homeassistant.components.recorder.statistics import (
+    async_import_statistics,
+    get_metadata,
+    statistics_during_period,
+)
+from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# The meter counters, which are continued over a downtime.
+BACKFILL_SENSORS = ("RealEnergyIn", "RealEnergyOut")
+
+# Longer gaps are not filled, the meter may have been replaced meanwhile.
+MAX_BACKFILL_HOURS = 24 * 31
+
+HOUR = timedelta(hours=1)
+
+
+def interpolate_statistics(
+    base_state: float,
+    base_sum: float,
+    last_time: datetime,
+    last_state: float,
+    now: datetime,
+    state: float,
+) -> list[StatisticData]:
+    """Interpolate the hourly statistics between the last reading and now.
+
+    The base values are the statistics of the hour before the last reading.
+    The energy of the gap is spread evenly over the missed hours, the sum
+    at the end of the gap is exact.
+    """
+    first_hour = dt_util.as_utc(last_time).replace(minute=0, second=0, microsecond=0)
+    current_hour = dt_util.as_utc(now).replace(minute=0, second=0, microsecond=0)
+    hours = int((current_hour - first_hour) / HOUR)
+
+    if hours <= 0 or hours > MAX_BACKFILL_HOURS or state < last_state:
+        return []
+
+    rate = (state - last_state) / (now - last_time).total_seconds()
+    statistics: list[StatisticData] = []
+    for hour in range(hours):
+        start = first_hour + hour * HOUR
+        end = start + HOUR
+        hour_state = last_state + rate * (end - last_time).total_seconds()
+        statistics.append(
+            StatisticData(
+                start=start,
+                state=hour_state,
+                sum=base_sum + hour_state - base_state,
+            )
+        )
+    return statistics
+
+
+async def async_backfill_statistics(
+    hass: HomeAssistant, device_number: str, started: datetime
+) -> None:
+    """Import the hourly energy statistics missed before the integration started."""
+    instance = get_instance(hass)
+    if not await instance.async_db_ready:
+        return
+
+    registry = er.async_get(hass)
+    for sensor_id in BACKFILL_SENSORS:
+        entity_id = registry.async_get_entity_id(
+            SENSOR_DOMAIN, DOMAIN, f"{DOMAIN}_{device_number}_{sensor_id}"
+        )
+        if entity_id is None:
+            continue
+
+        try:
+            await _async_backfill_entity(hass, entity_id, started)
+        except Exception as exception:
+            _LOGGER.warning(
+                "Statistics of %s cannot be backfilled. %s", entity_id, exception
+            )
+
+
+async def _async_backfill_entity(
+    hass: HomeAssistant, entity_id: str, started: datetime
+) -> None:
+    """Import the missed statistics of one energy sensor."""
+    instance = get_instance(hass)
+
+    current = hass.states.get(entity_id)
+    if current is None or not _is_number(current.state):
+        return
+
+    # The last state recorded before the integration was started
+    states = await instance.async_add_executor_job(
+        get_last_state_changes, hass, 2, entity_id
+    )
+    previous = [
+        state
+        for state in states.get(entity_id, [])
+        if state.last_updated < started and _is_number(state.state)
+    ]
+    if not previous:
+        return
+    last = previous[-1]
+    last_time = max(last.last_updated, last.last_reported)
+
+    unit = current.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+    metadata = await instance.async_add_executor_job(
+        lambda: get_metadata(hass, statistic_ids={entity_id})
+    )
+    if entity_id not in metadata:
+        return
+    _, statistic_metadata = metadata[entity_id]
+    if statistic_metadata["unit_of_measurement"] != unit:
+        return
+
+    first_hour = last_time.replace(minute=0, second=0, microsecond=0)
+    base = await instance.async_add_executor_job(
+        statistics_during_period,
+        hass,
+        first_hour - HOUR,
+        first_hour,
+        {entity_id},
+        "hour",
+        None,
+        {"state", "sum"},
+    )
+    if not base.get(entity_id):
+        return
+    base_row = base[entity_id][-1]
+
+    statistics = interpolate_statistics(
+        base_row["state"],
+        base_row["sum"],
+        last_time,
+        float(last.state),
+        dt_util.utcnow(),
+        float(current.state),
+    )
+    if statistics:
+        _LOGGER.info(
+            "Backfill %s hourly statistics of %s", len(statistics), entity_id
+        )
+        async_import_statistics(hass, statistic_metadata, statistics)
+
+
+def _is_number(state: str) -> bool:
+    """Check the state is a number."""
+    try:
+        float(state)
+    except ValueError:
+        return False
+    return True
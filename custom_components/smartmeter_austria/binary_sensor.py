@@ -0,0 +1,67 @@
+"""Binary sensor platform for Smartmeter Austria Energy."""
+import logging
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .anomaly import ConsumptionAnomalyDetector
+from .const import DOMAIN
+from .coordinator import SmartmeterDataCoordinator
+from .sensor_descriptions import ANOMALY_BINARY_SENSOR_DESCRIPTIONS
+from .smartmeter_data import SmartMeterData, SmartMeterConfigEntry
+
+_LOGGER = logging.getLogger(__name__)
+
+PARALLEL_UPDATES = 1
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: SmartMeterConfigEntry, async_add_entities: AddEntitiesCallback):
+    """Do a setup of the binary sensor platform."""
+
+    smartmeter_data: SmartMeterData = entry.runtime_data
+    coordinator: SmartmeterDataCoordinator = smartmeter_data.coordinator
+
+    device_info: DeviceInfo = smartmeter_data.device_info
+    device_number: str = smartmeter_data.device_number
+
+    entities = []
+
+    # Anomalies of the consumption
+    if any(isinstance(stage, ConsumptionAnomalyDetector) for stage in coordinator.pipeline.stages):
+        for key in ANOMALY_BINARY_SENSOR_DESCRIPTIONS:
+            entities.append(SmartmeterDerivedBinarySensor(
+                coordinator, device_info, device_number, key))
+
+    async_add_entities(entities)
+
+
+class SmartmeterDerivedBinarySensor(CoordinatorEntity, BinarySensorEntity):
+    """Entity representing a condition calculated from the telegrams."""
+
+    def __init__(
+        self,
+        coordinator: SmartmeterDataCoordinator,
+        device_info: DeviceInfo,
+        device_number: str,
+        key: str,
+        descriptions: dict[str, BinarySensorEntityDescription] = ANOMALY_BINARY_SENSOR_DESCRIPTIONS,
+    ) -> None:
+        """Initialize a binary sensor."""
+        super().__init__(coordinator, context=key)
+
+        self._attr_unique_id = f"{DOMAIN}_{device_number}_{key}"
+        self._attr_device_info = device_info
+        self.entity_description = descriptions[key]
+        self._key = key
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return the calculated condition, None before the first telegram."""
+        value = self.coordinator.derived_values.get(self._key)
+        return None if value is None else bool(value)
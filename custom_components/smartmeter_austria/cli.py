@@ -0,0 +1,178 @@
+"""Headless reader, runs the telegram pipeline of the integration without Home Assistant.
+
+Start it with scripts/reader, which loads this package without its Home
+Assistant setup module:
+
+    scripts/reader --port /dev/ttyUSB0 --supplier EVN --key <key>
+
+Every telegram is written as one JSON line to stdout and optionally sent
+to an UDP target and a MQTT broker (needs paho-mqtt).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import sys
+from typing import Any, TextIO
+
+from smartmeter_austria_energy.exceptions import SmartmeterException
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.supplier import SUPPLIERS, Supplier
+
+from .analytics import PhaseQualityAnalyzer
+from .multiplexer import MultiplexedSmartmeter, PortMultiplexer
+from .network import NetworkSmartmeter, StreamSmartmeter, is_network_port, is_serial_url
+from .pipeline import (
+    TelegramPipeline,
+    async_open_udp_sender,
+    parse_udp_target,
+    telegram_message,
+)
+from .serial_protocol import SerialSmartmeter, supports_event_loop_reads
+
+_LOGGER = logging.getLogger(__name__)
+
+# Wait time after a failed read, like the coordinator of the integration.
+RETRY_DELAY = 10.0
+
+MQTT_PORT = 1883
+MQTT_TOPIC = "smartmeter_austria/{device}"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the parser of the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="reader",
+        description="Reads and decodes the telegrams of an Austrian smart meter.",
+    )
+    parser.add_argument(
+        "--port",
+        required=True,
+        help="serial port, socket://host:port or rfc2217://host:port",
+    )
+    parser.add_argument("--supplier", required=True, choices=sorted(SUPPLIERS))
+    parser.add_argument("--key", required=True, help="key of the meter (hex)")
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=0,
+        help="number of telegrams to read, 0 reads until interrupted",
+    )
+    parser.add_argument(
+        "--quiet", action="store_true", help="do not write the telegrams to stdout"
+    )
+    parser.add_argument("--udp", help="UDP (multicast) target host:port")
+    parser.add_argument("--mqtt-host", help="MQTT broker")
+    parser.add_argument("--mqtt-port", type=int, default=MQTT_PORT)
+    parser.add_argument(
+        "--mqtt-topic",
+        default=MQTT_TOPIC,
+        help="MQTT topic, {device} is replaced by the device number",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+class MeterReader:
+    """Reads the telegrams of a meter from a serial port or a network bridge.
+
+    Local ports are read on the event loop like in the integration. RFC2217
+    URLs and the ports of platforms which cannot watch them are read in a
+    thread.
+    """
+
+    def __init__(self, supplier: Supplier, port: str, key_hex: str) -> None:
+        """Initialize."""
+        self._meter: StreamSmartmeter | MultiplexedSmartmeter
+        if is_network_port(port):
+            self._meter = NetworkSmartmeter(supplier, port, key_hex)
+        elif supports_event_loop_reads() and not is_serial_url(port):
+            self._meter = SerialSmartmeter(supplier, port, key_hex)
+        else:
+            # Keeps the port open between the telegrams.
+            self._meter = MultiplexedSmartmeter(
+                PortMultiplexer(port), supplier, key_hex)
+
+    async def async_read(self) -> ObisData:
+        """Read the data of the next telegram."""
+        if isinstance(self._meter, StreamSmartmeter):
+            return await self._meter.async_read()
+        return await asyncio.to_thread(self._meter.read)
+
+    def close(self) -> None:
+        """Release the port."""
+        self._meter.close()
+
+
+def _connect_mqtt(host: str, port: int) -> Any:
+    """Connect to the MQTT broker, paho-mqtt is only needed for MQTT."""
+    try:
+        from paho.mqtt import client as mqtt
+    except ImportError as exception:
+        raise SystemExit("Publishing to MQTT needs the paho-mqtt package.") from exception
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.connect(host, port)
+    client.loop_start()
+    return client
+
+
+async def async_run(args: argparse.Namespace, output: TextIO = sys.stdout) -> int:
+    """Read, decode and publish the telegrams."""
+    reader = MeterReader(SUPPLIERS[args.supplier], args.port, args.key)
+    pipeline = TelegramPipeline([PhaseQualityAnalyzer()])
+    udp_transport = None
+    mqtt_client = None
+
+    try:
+        if args.udp:
+            udp_transport = await async_open_udp_sender(parse_udp_target(args.udp))
+        if args.mqtt_host:
+            mqtt_client = _connect_mqtt(args.mqtt_host, args.mqtt_port)
+
+        read = 0
+        while args.count <= 0 or read < args.count:
+            try:
+                obisdata = await reader.async_read()
+            except SmartmeterException as exception:
+                _LOGGER.warning("Reading '%s' failed. %s", args.port, exception)
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            read += 1
+
+            device_number = obisdata.DeviceNumber.value
+            payload = json.dumps(
+                telegram_message(obisdata, device_number, pipeline.process(obisdata)),
+                separators=(",", ":"),
+            )
+            if not args.quiet:
+                output.write(payload + "\n")
+                output.flush()
+            if udp_transport is not None:
+                udp_transport.sendto(payload.encode())
+            if mqtt_client is not None:
+                mqtt_client.publish(args.mqtt_topic.format(device=device_number), payload)
+    finally:
+        reader.close()
+        if udp_transport is not None:
+            udp_transport.close()
+        if mqtt_client is not None:
+            mqtt_client.loop_stop()
+            mqtt_client.disconnect()
+
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the reader until the count is reached or it is interrupted."""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        return asyncio.run(async_run(args))
+    return 0
@@ -6,7 +6,7 @@ import logging
 from typing import Any
 
 from homeassistant.config_entries import ConfigEntry, ConfigFlow, ConfigFlowResult, OptionsFlow
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.selector import (
     SelectSelector,
@@ -15,35 +15,56 @@ from homeassistant.helpers.selector import (
 )
 import serial.tools.list_ports
 from smartmeter_austria_energy.exceptions import SmartmeterException
-from smartmeter_austria_energy.smartmeter import Smartmeter
 from smartmeter_austria_energy.supplier import SUPPLIERS
 import voluptuous as vol
 
+from .adapter import (
+    SmartmeterAdapter,
+    async_close_adapter,
+    async_create_adapter,
+    async_get_read_executor,
+    async_read_adapter,
+)
 from .const import (
     CONF_COM_PORT,
     CONF_KEY_HEX,
     CONF_SERIAL_NO,
+    CONF_SHARED_PORT,
     CONF_SUPPLIER_NAME,
     DOMAIN,
+    OPT_AGGREGATE_INTERVAL,
     OPT_DATA_INTERVAL,
     OPT_DATA_INTERVAL_VALUE,
+    OPT_ENERGY_ROLLUP_STATES,
+    OPT_PUBLISH_MQTT_TOPIC,
+    OPT_PUBLISH_UDP_TARGET,
+    OPT_SURPLUS_FILTER,
+    OPT_SURPLUS_MAX_POWER,
+    OPT_SURPLUS_RAMP_RATE,
+    OPT_SURPLUS_WINDOW,
+    OPT_TARIFF_EXPORT_PRICE,
+    OPT_TARIFF_IMPORT_PRICE,
+    OPT_TARIFF_PEAK_HOURS,
+    OPT_TARIFF_PEAK_PRICE,
+    OPT_TARIFF_PRICE_FILE,
 )
+from .pipeline import parse_udp_target
+from .surplus import SURPLUS_FILTERS, SURPLUS_MAX_POWER, SURPLUS_RAMP_RATE, SURPLUS_WINDOW
+from .tariff import parse_peak_hours
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def validate_and_connect(data: Mapping[str, Any]) -> dict[str, str]:
+async def async_validate_and_connect(
+    hass: HomeAssistant, data: Mapping[str, Any], adapter: SmartmeterAdapter
+) -> dict[str, str]:
     """Validate the user input allows us to connect."""
     com_port = data[CONF_COM_PORT]
-    supplier_name = data[CONF_SUPPLIER_NAME]
-    key_hex = data[CONF_KEY_HEX]
 
     _LOGGER.debug("Initialising com port=%s", com_port)
     ret = {}
     try:
-        supplier = SUPPLIERS.get(supplier_name)
-        adapter = Smartmeter(supplier, com_port, key_hex)
-        obisdata = adapter.read()
+        obisdata = await async_read_adapter(hass, adapter)
 
         device_number = obisdata.DeviceNumber.value
         ret["title"] = f"Smart Meter '{device_number}'"
@@ -57,6 +78,24 @@ def validate_and_connect(data: Mapping[str, Any]) -> dict[str, str]:
     return ret
 
 
+def _is_valid_udp_target(udp_target: str) -> bool:
+    """Check the UDP publish target has the format 'host:port'."""
+    try:
+        parse_udp_target(udp_target)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_valid_peak_hours(peak_hours: str) -> bool:
+    """Check the peak hours have the format 'mon-fri 06:00-22:00; sat 08:00-12:00'."""
+    try:
+        parse_peak_hours(peak_hours)
+    except ValueError:
+        return False
+    return True
+
+
 def scan_comports() -> tuple[list[str] | None, str | None]:
     """Find and store available com ports for the GUI dropdown."""
     com_ports = serial.tools.list_ports.comports(include_links=True)
@@ -90,36 +129,51 @@ class SmartmeterConfigFlow(ConfigFlow, domain=DOMAIN):
 
         errors = {}
         if self._com_ports_list is None:
-            result = await self.hass.async_add_executor_job(scan_comports)
+            result = await async_get_read_executor(self.hass).async_run(scan_comports)
             self._com_ports_list, self._default_com_port = result
-            if self._default_com_port is None:
-                return self.async_abort(reason="no_serial_ports")
+            if self._com_ports_list is None:
+                # Network bridges can still be entered as URL.
+                self._com_ports_list = []
 
         # Handle the initial step.
         if user_input is not None:
             try:
-                info = await self.hass.async_add_executor_job(
-                    validate_and_connect, user_input
+                adapter = async_create_adapter(
+                    self.hass,
+                    SUPPLIERS.get(user_input[CONF_SUPPLIER_NAME]),
+                    user_input[CONF_COM_PORT],
+                    user_input[CONF_KEY_HEX],
+                    user_input.get(CONF_SHARED_PORT, False),
                 )
-
-            except SmartmeterException:
-                return self.async_abort(reason="cannot_connect")
+            except ValueError:
+                errors["base"] = "invalid_serial_port"
             else:
-                info.update(user_input)
-
-                device_unique_id = info["device_number"]
-                await self.async_set_unique_id(device_unique_id)
-                self._abort_if_unique_id_configured()
-
-                return self.async_create_entry(
-                    title=info["title"],
-                    data={
-                        CONF_SUPPLIER_NAME: user_input[CONF_SUPPLIER_NAME],
-                        CONF_COM_PORT: user_input[CONF_COM_PORT],
-                        CONF_KEY_HEX: user_input[CONF_KEY_HEX],
-                        CONF_SERIAL_NO: device_unique_id,
-                    },
-                )
+                try:
+                    info = await async_validate_and_connect(
+                        self.hass, user_input, adapter
+                    )
+
+                except SmartmeterException:
+                    return self.async_abort(reason="cannot_connect")
+                else:
+                    info.update(user_input)
+
+                    device_unique_id = info["device_number"]
+                    await self.async_set_unique_id(device_unique_id)
+                    self._abort_if_unique_id_configured()
+
+                    return self.async_create_entry(
+                        title=info["title"],
+                        data={
+                            CONF_SUPPLIER_NAME: user_input[CONF_SUPPLIER_NAME],
+                            CONF_COM_PORT: user_input[CONF_COM_PORT],
+                            CONF_KEY_HEX: user_input[CONF_KEY_HEX],
+                            CONF_SHARED_PORT: user_input.get(CONF_SHARED_PORT, False),
+                            CONF_SERIAL_NO: device_unique_id,
+                        },
+                    )
+                finally:
+                    await async_close_adapter(self.hass, adapter)
 
         # If no user input, must be first pass through the config.  Show  initial form.
         suppliers = list(SUPPLIERS.keys())
@@ -133,10 +187,13 @@ class SmartmeterConfigFlow(ConfigFlow, domain=DOMAIN):
             ),
             vol.Required(CONF_COM_PORT, default=self._default_com_port): SelectSelector(
                 SelectSelectorConfig(
-                    options=self._com_ports_list, mode=SelectSelectorMode.DROPDOWN
+                    options=self._com_ports_list,
+                    mode=SelectSelectorMode.DROPDOWN,
+                    custom_value=True,
                 )
             ),
             vol.Required(CONF_KEY_HEX): str,
+            vol.Optional(CONF_SHARED_PORT, default=False): bool,
         }
         schema = vol.Schema(config_options)
 
@@ -158,6 +215,10 @@ class SmartMeterOptionsFlowHandler(OptionsFlow):
 
         if user_input is not None:
             new_data_interval = user_input[OPT_DATA_INTERVAL]
+            new_udp_target = user_input.get(OPT_PUBLISH_UDP_TARGET)
+            new_peak_hours = user_input.get(OPT_TARIFF_PEAK_HOURS)
+            new_surplus_window = user_input.get(OPT_SURPLUS_WINDOW)
+            new_aggregate_interval = user_input.get(OPT_AGGREGATE_INTERVAL)
             _LOGGER.debug("New data interval was set to %s", new_data_interval)
 
             if new_data_interval is None:
@@ -168,6 +229,25 @@ class SmartMeterOptionsFlowHandler(OptionsFlow):
                 _LOGGER.debug("New data interval is wrong (out of limits)")
                 _errors["base"] = "data_interval_wrong"
 
+            elif new_udp_target and not _is_valid_udp_target(new_udp_target):
+                _LOGGER.debug("New UDP target is wrong")
+                _errors["base"] = "publish_udp_target_wrong"
+
+            elif new_peak_hours and not _is_valid_peak_hours(new_peak_hours):
+                _LOGGER.debug("New peak hours are wrong")
+                _errors["base"] = "tariff_peak_hours_wrong"
+
+            elif new_surplus_window is not None and not 1 <= new_surplus_window <= 60:
+                _LOGGER.debug("New surplus window is wrong (out of limits)")
+                _errors["base"] = "surplus_window_wrong"
+
+            elif (
+                new_aggregate_interval is not None
+                and not 1 <= new_aggregate_interval <= 3600
+            ):
+                _LOGGER.debug("New aggregate interval is wrong (out of limits)")
+                _errors["base"] = "aggregate_interval_wrong"
+
             else:
                 return self.async_create_entry(title="", data=user_input)
 
@@ -181,6 +261,113 @@ class SmartMeterOptionsFlowHandler(OptionsFlow):
                             OPT_DATA_INTERVAL, OPT_DATA_INTERVAL_VALUE
                         ),
                     ): int,
+                    vol.Optional(
+                        OPT_PUBLISH_MQTT_TOPIC,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_PUBLISH_MQTT_TOPIC
+                            )
+                        },
+                    ): str,
+                    vol.Optional(
+                        OPT_PUBLISH_UDP_TARGET,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_PUBLISH_UDP_TARGET
+                            )
+                        },
+                    ): str,
+                    vol.Optional(
+                        OPT_TARIFF_IMPORT_PRICE,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_TARIFF_IMPORT_PRICE
+                            )
+                        },
+                    ): vol.Coerce(float),
+                    vol.Optional(
+                        OPT_TARIFF_PEAK_PRICE,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_TARIFF_PEAK_PRICE
+                            )
+                        },
+                    ): vol.Coerce(float),
+                    vol.Optional(
+                        OPT_TARIFF_PEAK_HOURS,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_TARIFF_PEAK_HOURS
+                            )
+                        },
+                    ): str,
+                    vol.Optional(
+                        OPT_TARIFF_EXPORT_PRICE,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_TARIFF_EXPORT_PRICE
+                            )
+                        },
+                    ): vol.Coerce(float),
+                    vol.Optional(
+                        OPT_TARIFF_PRICE_FILE,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_TARIFF_PRICE_FILE
+                            )
+                        },
+                    ): str,
+                    vol.Optional(
+                        OPT_SURPLUS_FILTER,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_SURPLUS_FILTER
+                            )
+                        },
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=list(SURPLUS_FILTERS),
+                            mode=SelectSelectorMode.DROPDOWN,
+                        )
+                    ),
+                    vol.Optional(
+                        OPT_SURPLUS_WINDOW,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_SURPLUS_WINDOW, SURPLUS_WINDOW
+                            )
+                        },
+                    ): int,
+                    vol.Optional(
+                        OPT_SURPLUS_RAMP_RATE,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_SURPLUS_RAMP_RATE, SURPLUS_RAMP_RATE
+                            )
+                        },
+                    ): vol.Coerce(float),
+                    vol.Optional(
+                        OPT_SURPLUS_MAX_POWER,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_SURPLUS_MAX_POWER, SURPLUS_MAX_POWER
+                            )
+                        },
+                    ): vol.Coerce(float),
+                    vol.Optional(
+                        OPT_AGGREGATE_INTERVAL,
+                        description={
+                            "suggested_value": self.config_entry.options.get(
+                                OPT_AGGREGATE_INTERVAL
+                            )
+                        },
+                    ): int,
+                    vol.Optional(
+                        OPT_ENERGY_ROLLUP_STATES,
+                        default=self.config_entry.options.get(
+                            OPT_ENERGY_ROLLUP_STATES, False
+                        ),
+                    ): bool,
                 }
             ),
             errors=_errors,
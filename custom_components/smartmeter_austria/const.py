@@ -12,13 +12,47 @@ CONF_SUPPLIER_NAME = "supplier"
 CONF_SERIAL_NO = "smartmeter_aut_serial_number"
 CONF_COM_PORT = "com_port"
 CONF_KEY_HEX = "key_hex"
+CONF_SHARED_PORT = "shared_port"
 
 OPT_DATA_INTERVAL = "smartmeter_aut_data_interval"
 OPT_DATA_INTERVAL_VALUE: int = 30
 
+OPT_PUBLISH_MQTT_TOPIC = "smartmeter_aut_publish_mqtt_topic"
+OPT_PUBLISH_UDP_TARGET = "smartmeter_aut_publish_udp_target"
+
+OPT_TARIFF_IMPORT_PRICE = "smartmeter_aut_tariff_import_price"
+OPT_TARIFF_PEAK_PRICE = "smartmeter_aut_tariff_peak_price"
+OPT_TARIFF_PEAK_HOURS = "smartmeter_aut_tariff_peak_hours"
+OPT_TARIFF_EXPORT_PRICE = "smartmeter_aut_tariff_export_price"
+OPT_TARIFF_PRICE_FILE = "smartmeter_aut_tariff_price_file"
+
+OPT_SURPLUS_FILTER = "smartmeter_aut_surplus_filter"
+OPT_SURPLUS_WINDOW = "smartmeter_aut_surplus_window"
+OPT_SURPLUS_RAMP_RATE = "smartmeter_aut_surplus_ramp_rate"
+OPT_SURPLUS_MAX_POWER = "smartmeter_aut_surplus_max_power"
+
+# Set on one entry, which then shows the building totals of all meters
+OPT_AGGREGATE_INTERVAL = "smartmeter_aut_aggregate_interval"
+
+# The energy counters are written when a 5 minute rollup is finished
+OPT_ENERGY_ROLLUP_STATES = "smartmeter_aut_energy_rollup_states"
+
+# Fired when an anomaly of the consumption is detected
+EVENT_ANOMALY = f"{DOMAIN}_anomaly"
+
+# hass.data keys
+DATA_MULTIPLEXERS = "multiplexers"
+DATA_READ_EXECUTOR = "read_executor"
+DATA_READ_EXECUTOR_STOP = "read_executor_stop"
+DATA_AGGREGATE = "aggregate"
+DATA_AGGREGATE_OWNER = "aggregate_owner"
+
+# Identifier of the device of the building totals
+AGGREGATE_DEVICE = "building"
+
 
 """List of platforms that are supported."""
-PLATFORMS = [Platform.SENSOR]
+PLATFORMS = [Platform.BINARY_SENSOR, Platform.SENSOR]
 
 # Additional
 """The actual version of the integration."""
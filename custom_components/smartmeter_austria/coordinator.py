@@ -2,30 +2,104 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import Coroutine
+import contextlib
 from datetime import timedelta
 import logging
+from typing import TYPE_CHECKING, Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+import homeassistant.util.dt as dt_util
 from smartmeter_austria_energy.exceptions import (
     SmartmeterException,
     SmartmeterSerialException,
     SmartmeterTimeoutException,
 )
 from smartmeter_austria_energy.obisdata import ObisData
-from smartmeter_austria_energy.smartmeter import Smartmeter
 
-from .const import DOMAIN, OPT_DATA_INTERVAL_VALUE
+from .adapter import (
+    SmartmeterAdapter,
+    adapter_port,
+    async_read_adapter_batch,
+    async_rebind_adapter,
+)
+from .aggregate import AGGREGATE_INTERVAL, MeterAggregate
+from .analytics import PhaseQualityAnalyzer
+from .anomaly import ConsumptionAnomalyDetector
+from .const import CONF_COM_PORT, DATA_AGGREGATE, DOMAIN, OPT_DATA_INTERVAL_VALUE
+from .multiplexer import MultiplexedSmartmeter
+from .network import StreamSmartmeter
+from .pipeline import StageValues, TelegramClock, TelegramPipeline
+from .profiler import UpdateProfiler
+from .publisher import TelegramPublisher
+from .rollup import ROLLUP_VALUES, EnergyRollups
+from .stage_store import PipelineStore
+from .surplus import SURPLUS_VALUES
+from .watchdog import TelegramWatchdog, find_port
+
+if TYPE_CHECKING:
+    from .energy_statistics import RollupStatisticsPublisher
 
 _LOGGER = logging.getLogger(__name__)
 
+# Reads which are repeated right away after a corrupt telegram
+BAD_TELEGRAM_RETRIES = 2
+
+# Seconds the shutdown waits for a cancelled read or backoff to finish
+SHUTDOWN_TIMEOUT = 2.0
+
 
 class SmartmeterDataCoordinator(DataUpdateCoordinator[ObisData]):
     """Fetches the data from the serial device."""
 
-    def __init__(self, hass: HomeAssistant, adapter: Smartmeter) -> None:
+    def __init__(self, hass: HomeAssistant, adapter: SmartmeterAdapter) -> None:
         """Initialize."""
-        self.adapter: Smartmeter = adapter
+        self.adapter: SmartmeterAdapter = adapter
+        self.publisher: TelegramPublisher | None = None
+        # The stages get the time of the telegram, older in a catch-up batch.
+        clock = TelegramClock(dt_util.now)
+        self.pipeline = TelegramPipeline(
+            [PhaseQualityAnalyzer(), ConsumptionAnomalyDetector(now=clock)], clock)
+
+        # Values calculated from the telegrams, used by the derived sensors.
+        self.derived_values: StageValues = self.pipeline.values
+
+        # Keeps the state of the stages over restarts, set by the setup.
+        self.pipeline_store: PipelineStore | None = None
+
+        # Values of the entity contexts at the last listener update, used to
+        # write only the states which were changed by a telegram.
+        self._written_values: dict[str, Any] = {}
+        self._written_available: bool | None = None
+        self._changed_contexts: set[str] | None = None
+
+        # Number of corrupt telegrams, which were skipped or failed an update.
+        self.bad_telegrams: int = 0
+
+        # Number of older telegrams, which were read together with the newest
+        # one after a stall and were processed by the pipeline only.
+        self.caught_up_telegrams: int = 0
+
+        # Rollups of the energy counters, the hourly ones are published as
+        # statistics if the recorder is loaded.
+        self.rollups = EnergyRollups()
+        self.statistics_publisher: RollupStatisticsPublisher | None = None
+
+        # The energy counters are written when a 5 minute rollup is finished only.
+        self.rollup_states: bool = False
+        self._rollup_finished: bool = True
+
+        # Finds the USB adapter again if it gets a new port, set for local ports.
+        self.watchdog: TelegramWatchdog | None = None
+
+        # Profiler of the next update cycles, set by the profile service.
+        self.profiler: UpdateProfiler | None = None
+        self.profile_summary: dict[str, Any] | None = None
+
+        # Task of the running read or backoff, it is cancelled by the shutdown.
+        self._read_task: asyncio.Task[Any] | None = None
 
         super().__init__(
             # update_inverval is set in async_setup_entry()
@@ -35,18 +109,99 @@ class SmartmeterDataCoordinator(DataUpdateCoordinator[ObisData]):
             update_interval=timedelta(seconds=OPT_DATA_INTERVAL_VALUE),
         )
 
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh the data, the cycle is profiled if a profile was requested.
+
+        A cycle covers the read, the pipeline and the updates of the entities,
+        and all other tasks which run while it waits for the telegram.
+        """
+        profiler = self.profiler
+        if profiler is None:
+            await super()._async_refresh(*args, **kwargs)
+            return
+
+        await self.hass.async_add_executor_job(profiler.start_memory)
+        try:
+            profiler.start()
+        except ValueError as exception:
+            self.logger.warning("Profile cannot be started. %s", exception)
+            self.profiler = None
+            await self.hass.async_add_executor_job(profiler.stop_memory)
+            await super()._async_refresh(*args, **kwargs)
+            return
+
+        try:
+            await super()._async_refresh(*args, **kwargs)
+        finally:
+            profiler.stop()
+
+        if profiler.finished:
+            self.profiler = None
+            await self.hass.async_add_executor_job(profiler.stop_memory)
+            self.profile_summary = profiler.summary()
+            try:
+                await self.hass.async_add_executor_job(profiler.write)
+            except OSError as exception:
+                self.logger.warning("Profile cannot be written. %s", exception)
+            else:
+                self.logger.info("Profile written to %s", profiler.path)
+
+    async def async_shutdown(self) -> None:
+        """Stop the updates, a running read or backoff is cancelled.
+
+        It waits up to SHUTDOWN_TIMEOUT for the cancelled task, so an
+        unload or a stop does not wait for the next telegram. The task
+        which requested the update, e.g. the setup or a service call, is
+        not cancelled, its update fails.
+        """
+        await super().async_shutdown()
+        task = self._read_task
+        if task is None or task.done():
+            return
+        task.cancel()
+        _, pending = await asyncio.wait((task,), timeout=SHUTDOWN_TIMEOUT)
+        if pending:
+            self.logger.warning("Update did not stop within %s s", SHUTDOWN_TIMEOUT)
+
+    async def _async_run_cancellable[T](self, target: Coroutine[Any, Any, T]) -> T:
+        """Run a read or a backoff in a task of the coordinator.
+
+        Raises UpdateFailed if the shutdown cancelled the task.
+        """
+        task = self.hass.async_create_background_task(target, f"{DOMAIN} read")
+        self._read_task = task
+        try:
+            return await task
+        except asyncio.CancelledError:
+            # The task which waits for the read was cancelled itself.
+            if (current := asyncio.current_task()) is not None and current.cancelling():
+                raise
+            raise UpdateFailed("The update was cancelled by the shutdown.") from None
+        finally:
+            if self._read_task is task:
+                self._read_task = None
+
     async def _async_update_data(self) -> ObisData:
         """Update data over the USB device."""
         try:
             self.last_update_success = True
-            obisdata = await self.hass.async_add_executor_job(self.adapter.read)
-            return obisdata
+            self._changed_contexts = None
+            await self._async_recover_port()
+            batch = await self._async_read()
+            if not batch:
+                return None
+            await self._async_process(batch)
+            return batch[-1]
+        except UpdateFailed:
+            self.last_update_success = False
+            raise
+
         except SmartmeterTimeoutException as exception:
             self.logger.warning(
                 "smartmeter.read() timeout error. %s", exception, exc_info=True
             )
             self.last_update_success = False
-            await asyncio.sleep(10)
+            await self._async_backoff(10)
             raise UpdateFailed() from exception
 
         except SmartmeterSerialException as exception:
@@ -54,7 +209,7 @@ class SmartmeterDataCoordinator(DataUpdateCoordinator[ObisData]):
                 "smartmeter.read() serial exception. %s", exception, exc_info=True
             )
             self.last_update_success = False
-            await asyncio.sleep(10)
+            await self._async_backoff(10)
             raise UpdateFailed() from exception
 
         except SmartmeterException as exception:
@@ -62,7 +217,7 @@ class SmartmeterDataCoordinator(DataUpdateCoordinator[ObisData]):
                 "smartmeter.read() smartmeter exception. %s", exception, exc_info=True
             )
             self.last_update_success = False
-            await asyncio.sleep(10)
+            await self._async_backoff(10)
             raise UpdateFailed() from exception
 
         except Exception as exception:
@@ -70,5 +225,201 @@ class SmartmeterDataCoordinator(DataUpdateCoordinator[ObisData]):
                 "smartmeter.read() exception. %s", exception, exc_info=True
             )
             self.last_update_success = False
-            await asyncio.sleep(30)
+            await self._async_backoff(30)
             raise UpdateFailed() from exception
+
+    async def _async_process(self, batch: list[ObisData]) -> None:
+        """Run the telegrams of a read through the pipeline, oldest first.
+
+        The entities show the newest telegram only, but every telegram is
+        published with the values of its own step.
+        """
+        obisdata = batch[-1]
+        if self.watchdog is not None:
+            self.watchdog.telegram_received()
+        steps = self.pipeline.process_batch(batch)
+        if self.pipeline_store is not None:
+            self.pipeline_store.async_schedule_save()
+        self.caught_up_telegrams += len(batch) - 1
+        self._update_totals(obisdata)
+        self._changed_contexts = self._changed_values(obisdata)
+
+        if self.publisher is not None:
+            for telegram, values in zip(batch, steps, strict=True):
+                await self.publisher.async_publish(telegram, {
+                    key: values[key] for key in SURPLUS_VALUES if key in values
+                })
+
+    def _update_totals(self, obisdata: ObisData) -> None:
+        """Add the newest telegram to the building totals and the energy rollups."""
+        # The building totals, if an entry shows them.
+        aggregate = self.hass.data.get(DOMAIN, {}).get(DATA_AGGREGATE)
+        if aggregate is not None:
+            aggregate.update(self.config_entry.entry_id, obisdata)
+        self._rollup_finished = self.rollups.update(dt_util.utcnow(), obisdata)
+        if self.statistics_publisher is not None and (
+            finished := self.rollups.pop_finished()
+        ):
+            self.statistics_publisher.async_publish(finished)
+
+    async def _async_backoff(self, seconds: float) -> None:
+        """Wait before the next read after a failed read, not while shutting down."""
+        if not self._shutdown_requested:
+            with contextlib.suppress(UpdateFailed):
+                await self._async_run_cancellable(asyncio.sleep(seconds))
+
+    async def _async_recover_port(self) -> None:
+        """Bind the adapter to the new port of its USB adapter, if the telegrams are stale.
+
+        The new port is stored in the config entry, so it is used after a
+        restart too.
+        """
+        watchdog = self.watchdog
+        if watchdog is None or not watchdog.rescan_due(
+            self.update_interval.total_seconds()
+        ):
+            return
+
+        port = await self.hass.async_add_executor_job(find_port, watchdog.identity)
+        if port is None:
+            self.logger.debug("USB adapter of '%s' was not found", watchdog.port)
+            return
+
+        # The multiplexer of a shared port might be bound by another meter already.
+        if port != adapter_port(self.adapter):
+            await async_rebind_adapter(self.hass, self.adapter, port)
+        if port != watchdog.port:
+            self.logger.warning(
+                "USB adapter of '%s' was found on '%s'", watchdog.port, port)
+            watchdog.port_rebound(port)
+
+        entry = self.config_entry
+        if entry is not None and entry.data.get(CONF_COM_PORT) != port:
+            self.hass.config_entries.async_update_entry(
+                entry, data={**entry.data, CONF_COM_PORT: port})
+
+    async def _async_read(self) -> list[ObisData]:
+        """Read the telegrams since the last read, a corrupt read is repeated right away.
+
+        Serial errors and timeouts are raised at once, as an immediate
+        retry would fail again.
+        """
+        retries = 0
+        while True:
+            try:
+                batch = await self._async_run_cancellable(
+                    async_read_adapter_batch(self.hass, self.adapter))
+            except (SmartmeterSerialException, SmartmeterTimeoutException):
+                raise
+            except SmartmeterException as exception:
+                # The library wraps its serial errors and timeouts.
+                if isinstance(
+                    exception.__cause__,
+                    SmartmeterSerialException | SmartmeterTimeoutException,
+                ):
+                    raise
+                self.bad_telegrams += 1
+                if retries >= BAD_TELEGRAM_RETRIES:
+                    raise
+                retries += 1
+                self.logger.debug("Corrupt telegram was skipped. %s", exception)
+                continue
+
+            # Corrupt telegrams between good ones of the batch were skipped.
+            if isinstance(self.adapter, StreamSmartmeter | MultiplexedSmartmeter):
+                self.bad_telegrams += self.adapter.decode_cache.pop_skipped()
+            return batch
+
+    @callback
+    def async_set_update_interval(self, update_interval: timedelta) -> None:
+        """Change the interval, the next read is rescheduled right away."""
+        self.update_interval = update_interval
+        if self._unsub_refresh is not None:
+            self._schedule_refresh()
+
+    def _changed_values(self, obisdata: ObisData) -> set[str] | None:
+        """Get the entity contexts whose values were changed by a telegram.
+
+        None means all entities have to be updated.
+        """
+        try:
+            values: dict[str, Any] = {}
+            for context in self.async_contexts():
+                if context in self.derived_values:
+                    values[context] = self.derived_values[context]
+                else:
+                    obis_value = getattr(obisdata, context, None)
+                    values[context] = None if obis_value is None else obis_value.value
+        except Exception as exception:
+            self.logger.debug(
+                "Changed values cannot be determined. %s", exception, exc_info=True
+            )
+            return None
+
+        written_values = self._written_values
+        if self.rollup_states and not self._rollup_finished:
+            # The counters are held back until the next 5 minute rollup.
+            for context in ROLLUP_VALUES:
+                if context in values and context in written_values:
+                    values[context] = written_values[context]
+        self._written_values = values
+        return {
+            context
+            for context, value in values.items()
+            if context not in written_values or written_values[context] != value
+        }
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the entities whose values were changed in one pass.
+
+        All entities are updated if the availability changed or the changed
+        values are not known, e.g. after an error.
+        """
+        changed_contexts = self._changed_contexts
+        self._changed_contexts = None
+        if self._written_available != self.last_update_success:
+            self._written_available = self.last_update_success
+            changed_contexts = None
+
+        for update_callback, context in list(self._listeners.values()):
+            if changed_contexts is None or context is None or context in changed_contexts:
+                update_callback()
+
+
+class AggregateCoordinator(DataUpdateCoordinator[dict[str, float | None]]):
+    """Publishes the building totals of all meters at a fixed interval.
+
+    The meters update the totals with every telegram, the states are
+    written at the interval of this coordinator and only if a total changed.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        aggregate: MeterAggregate,
+        interval: float = AGGREGATE_INTERVAL,
+    ) -> None:
+        """Initialize."""
+        self.aggregate = aggregate
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_aggregate",
+            update_interval=timedelta(seconds=interval),
+            always_update=False,
+        )
+
+    async def _async_update_data(self) -> dict[str, float | None]:
+        """Get the current totals, the counters need the values of all loaded entries.
+
+        An entry which is reloaded or waits for a retry keeps its counters,
+        but the others do not wait for it.
+        """
+        entries = self.hass.config_entries.async_entries(
+            DOMAIN, include_ignore=False, include_disabled=False)
+        self.aggregate.expect(
+            (entry.entry_id for entry in entries if entry.state is ConfigEntryState.LOADED),
+            (entry.entry_id for entry in entries),
+        )
+        return self.aggregate.values()
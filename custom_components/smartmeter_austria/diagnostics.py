@@ -0,0 +1,147 @@
+"""Diagnostics support for Smartmeter Austria Energy."""
+from __future__ import annotations
+
+from collections import deque
+import sys
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from .const import CONF_KEY_HEX, DATA_AGGREGATE, DATA_READ_EXECUTOR, DOMAIN
+from .multiplexer import MultiplexedSmartmeter
+from .network import StreamSmartmeter
+from .smartmeter_data import SmartMeterConfigEntry
+
+TO_REDACT = {CONF_KEY_HEX}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: SmartMeterConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data.coordinator
+    adapter = coordinator.adapter
+
+    diagnostics: dict[str, Any] = {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "derived_values": dict(coordinator.derived_values),
+            "bad_telegrams": coordinator.bad_telegrams,
+            "caught_up_telegrams": coordinator.caught_up_telegrams,
+        },
+        "adapter": type(adapter).__name__,
+    }
+
+    if isinstance(adapter, MultiplexedSmartmeter | StreamSmartmeter):
+        diagnostics["decode_cache"] = adapter.decode_cache.as_dict()
+
+    if (read_executor := hass.data.get(DOMAIN, {}).get(DATA_READ_EXECUTOR)) is not None:
+        diagnostics["read_executor"] = read_executor.as_dict()
+
+    if (aggregate := hass.data.get(DOMAIN, {}).get(DATA_AGGREGATE)) is not None:
+        diagnostics["aggregate"] = aggregate.as_dict()
+
+    if isinstance(adapter, StreamSmartmeter):
+        diagnostics["frames"] = adapter.reader.as_dict()
+
+    if isinstance(adapter, MultiplexedSmartmeter):
+        diagnostics["frames"] = adapter.multiplexer.reader.as_dict()
+        multiplexer = adapter.multiplexer
+        diagnostics["multiplexer"] = {
+            "meters": len(multiplexer.meters),
+            "unknown_telegrams": multiplexer.unknown_telegrams,
+        }
+
+    if (watchdog := coordinator.watchdog) is not None:
+        diagnostics["watchdog"] = {
+            **watchdog.as_dict(),
+            "identity": {
+                "by_id": watchdog.identity.by_id,
+                "vid": watchdog.identity.vid,
+                "pid": watchdog.identity.pid,
+                "location": watchdog.identity.location,
+            },
+        }
+
+    diagnostics["rollups"] = coordinator.rollups.as_dict()
+    if (statistics_publisher := coordinator.statistics_publisher) is not None:
+        diagnostics["rollup_statistics"] = {
+            "published": statistics_publisher.published,
+        }
+
+    if (profile_summary := coordinator.profile_summary) is not None:
+        diagnostics["profile"] = profile_summary
+
+    if (publisher := coordinator.publisher) is not None:
+        diagnostics["publisher"] = {
+            "published": publisher.published,
+            "failed": publisher.failed,
+        }
+
+    measured: dict[str, Any] = {
+        "telegram": coordinator.data,
+        "derived_values": coordinator.derived_values,
+        "pipeline": coordinator.pipeline,
+    }
+    if "decode_cache" in diagnostics:
+        measured["decode_cache"] = adapter.decode_cache
+    diagnostics["memory"] = {
+        "entities": len(
+            er.async_entries_for_config_entry(er.async_get(hass), entry.entry_id)
+        ),
+        # Walking the object graphs takes a while, it must not block the event loop.
+        **await hass.async_add_executor_job(_memory_sizes, measured),
+    }
+
+    return diagnostics
+
+
+def _memory_sizes(measured: dict[str, Any]) -> dict[str, int | None]:
+    """Get the deep sizes of the objects, None if one changed while it was measured."""
+    sizes: dict[str, int | None] = {}
+    for name, obj in measured.items():
+        try:
+            sizes[name] = deep_getsizeof(obj)
+        except RuntimeError:
+            sizes[name] = None
+    return sizes
+
+
+def deep_getsizeof(obj: Any) -> int:
+    """Get the size in bytes of an object and all objects referenced by it.
+
+    Containers, instance dictionaries and slots are followed, objects
+    referenced more than once are counted once.
+    """
+    seen: set[int] = set()
+    pending = [obj]
+    size = 0
+
+    while pending:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, type):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, list | tuple | set | frozenset | deque):
+            pending.extend(item)
+        else:
+            if hasattr(item, "__dict__"):
+                pending.append(item.__dict__)
+            for cls in type(item).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    if hasattr(item, slot):
+                        pending.append(getattr(item, slot))
+
+    return size
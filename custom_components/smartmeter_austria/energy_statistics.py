@@ -0,0 +1,144 @@
+"""Publishes the hourly rollups of the energy counters as external statistics."""
+from __future__ import annotations
+
+from collections import deque
+import logging
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .obis_registry import OBIS_FIELDS
+from .rollup import ROLLUP_HISTORY, ROLLUP_VALUES, EnergyRollups, RollupPeriod
+
+try:
+    from homeassistant.components.recorder.models import StatisticMeanType
+except ImportError:
+    # Older cores have no mean type, has_mean is enough there.
+    StatisticMeanType = None
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def rollup_statistic_id(device_number: str, key: str) -> str:
+    """Get the id of the external statistic of a counter, e.g. smartmeter_austria:123_real_energy_in."""
+    return f"{DOMAIN}:{slugify(f'{device_number}_{OBIS_FIELDS[key].name}')}"
+
+
+class RollupStatisticsPublisher:
+    """Adds the finished hourly periods of the rollups to the external statistics.
+
+    The sums continue the last statistics of the recorder, so they do not
+    start at zero after a restart. Periods which are finished before the
+    last statistics were loaded are added afterwards.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, device_number: str, rollups: EnergyRollups
+    ) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._device_number = device_number
+        self._rollups = rollups
+        # Start, state and sum of the last statistics, None until they were loaded.
+        self._last: dict[str, tuple[float, float, float] | None] | None = None
+        self._offsets: dict[str, float] = {}
+        self._pending: dict[str, deque[RollupPeriod]] = {
+            key: deque(maxlen=ROLLUP_HISTORY) for key in ROLLUP_VALUES
+        }
+        self._published: int = 0
+
+    @property
+    def published(self) -> int:
+        """Gets the number of published hourly statistics."""
+        return self._published
+
+    async def async_load(self) -> None:
+        """Load the last statistics and add the periods finished meanwhile."""
+        instance = get_instance(self._hass)
+        if not await instance.async_db_ready:
+            return
+
+        last: dict[str, tuple[float, float, float] | None] = {}
+        for key in ROLLUP_VALUES:
+            statistic_id = rollup_statistic_id(self._device_number, key)
+            rows = await instance.async_add_executor_job(
+                get_last_statistics, self._hass, 1, statistic_id, False, {"state", "sum"}
+            )
+            row = rows[statistic_id][0] if rows.get(statistic_id) else None
+            last[key] = None if row is None else (row["start"], row["state"], row["sum"])
+        self._last = last
+
+        pending = {key: list(periods) for key, periods in self._pending.items() if periods}
+        for periods in self._pending.values():
+            periods.clear()
+        self.async_publish(pending)
+
+    @callback
+    def async_publish(self, finished: dict[str, list[RollupPeriod]]) -> None:
+        """Add the finished hourly periods of the counters to the statistics."""
+        if self._last is None:
+            for key, periods in finished.items():
+                self._pending[key].extend(periods)
+            return
+
+        for key, periods in finished.items():
+            last = self._last.get(key)
+            statistics = [
+                StatisticData(
+                    start=period.start,
+                    state=period.state,
+                    sum=self._offset(key) + period.sum,
+                )
+                for period in periods
+                if last is None or period.start.timestamp() > last[0]
+            ]
+            if not statistics:
+                continue
+            try:
+                async_add_external_statistics(
+                    self._hass, self._metadata(key), statistics)
+            except HomeAssistantError as exception:
+                _LOGGER.warning(
+                    "Statistics of %s cannot be added. %s", key, exception)
+                continue
+            self._published += len(statistics)
+
+    def _offset(self, key: str) -> float:
+        """Get the sum of the last statistics up to the first telegram of the rollup."""
+        if (offset := self._offsets.get(key)) is not None:
+            return offset
+
+        offset = 0.0
+        last = self._last.get(key) if self._last is not None else None
+        first_state = self._rollups.long[key].first_state
+        if last is not None and first_state is not None:
+            _, last_state, last_sum = last
+            # A counter which went backwards was reset.
+            increase = first_state - last_state if first_state >= last_state else first_state
+            offset = last_sum + increase
+        self._offsets[key] = offset
+        return offset
+
+    def _metadata(self, key: str) -> StatisticMetaData:
+        """Get the metadata of the statistic of a counter."""
+        obis_field = OBIS_FIELDS[key]
+        metadata = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"Smart Meter '{self._device_number}' {obis_field.name}",
+            source=DOMAIN,
+            statistic_id=rollup_statistic_id(self._device_number, key),
+            unit_of_measurement=obis_field.unit,
+        )
+        if StatisticMeanType is not None:
+            metadata["mean_type"] = StatisticMeanType.NONE
+        return metadata
+
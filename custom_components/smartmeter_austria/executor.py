@@ -0,0 +1,173 @@
+"""Dedicated thread pool for the blocking reads of the serial ports.
+
+This module must not import Home Assistant.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# Minimum number of threads of the pool
+READ_WORKERS = 4
+
+# Threads for the opens and the scans of the ports, besides one for each reader
+SPARE_WORKERS = 2
+
+# Upper limit of a read in seconds, the readers have shorter timeouts of their own.
+READ_TIMEOUT = 30.0
+
+
+class ReadExecutor:
+    """Runs the blocking reads in a bounded thread pool.
+
+    A slow or stuck port takes threads of this pool only, never of the
+    executor shared by all integrations. A read which does not finish in
+    time is interrupted, so it gives its thread back.
+
+    The pool has a thread for every meter whose reads block, so a meter
+    never waits for the reads of the others.
+    """
+
+    def __init__(
+        self, max_workers: int = READ_WORKERS, timeout: float = READ_TIMEOUT
+    ) -> None:
+        """Initialize."""
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="smartmeter_austria_read"
+        )
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._readers: set[object] = set()
+        self._lock = threading.Lock()
+        self._queued: int = 0
+        self._running: int = 0
+        self._completed: int = 0
+        self._timeouts: int = 0
+
+    @property
+    def max_workers(self) -> int:
+        """Gets the number of threads of the pool."""
+        return self._max_workers
+
+    @property
+    def readers(self) -> int:
+        """Gets the number of meters whose reads block."""
+        return len(self._readers)
+
+    @property
+    def queued(self) -> int:
+        """Gets the number of reads which wait for a thread."""
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        """Gets the number of reads which are running."""
+        return self._running
+
+    @property
+    def completed(self) -> int:
+        """Gets the number of finished reads."""
+        return self._completed
+
+    @property
+    def timeouts(self) -> int:
+        """Gets the number of reads which did not finish in time."""
+        return self._timeouts
+
+    async def async_run[T](
+        self,
+        func: Callable[[], T],
+        interrupt: Callable[[], None] | None = None,
+        timeout: float | None = None,
+    ) -> T:
+        """Run a blocking function in the pool.
+
+        If the read takes too long or is cancelled, a waiting read is dropped
+        and a running read is interrupted with the interrupt function, which
+        is called on the event loop and must not block.
+        Raises TimeoutError if the function does not finish in time.
+        """
+        with self._lock:
+            self._queued += 1
+        future = self._executor.submit(self._run, func)
+        future.add_done_callback(self._dropped)
+
+        try:
+            async with asyncio.timeout(timeout or self._timeout):
+                return await asyncio.wrap_future(future)
+        except TimeoutError:
+            self._timeouts += 1
+            self._interrupt(future, interrupt)
+            raise
+        except asyncio.CancelledError:
+            self._interrupt(future, interrupt)
+            raise
+
+    def add_reader(self, reader: object) -> None:
+        """Add a meter whose reads block, the pool is grown if needed.
+
+        The reads submitted to the smaller pool finish there.
+        """
+        self._readers.add(reader)
+        max_workers = len(self._readers) + SPARE_WORKERS
+        if max_workers <= self._max_workers:
+            return
+        previous = self._executor
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="smartmeter_austria_read"
+        )
+        self._max_workers = max_workers
+        previous.shutdown(wait=False)
+
+    def remove_reader(self, reader: object) -> None:
+        """Remove a meter whose reads block, the idle threads are kept."""
+        self._readers.discard(reader)
+
+    def shutdown(self) -> None:
+        """Drop the waiting reads, the running reads finish in the background."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the statistics of the pool."""
+        return {
+            "max_workers": self._max_workers,
+            "readers": len(self._readers),
+            "queued": self._queued,
+            "running": self._running,
+            "completed": self._completed,
+            "timeouts": self._timeouts,
+        }
+
+    def _run[T](self, func: Callable[[], T]) -> T:
+        """Run the function in a thread of the pool."""
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return func()
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    def _dropped(self, future: Future[Any]) -> None:
+        """Count a waiting read which was dropped, also by the shutdown."""
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def _interrupt(
+        self, future: Future[Any], interrupt: Callable[[], None] | None
+    ) -> None:
+        """Drop a waiting read or interrupt a running read."""
+        if future.cancel():
+            return
+        if interrupt is not None and not future.done():
+            _LOGGER.debug("Interrupting a read which did not finish in time")
+            interrupt()
@@ -0,0 +1,332 @@
+"""Shares one serial line between several smart meters (M-BUS master or splitter)."""
+from __future__ import annotations
+
+from collections import deque
+import logging
+import threading
+import time
+
+import serial
+from smartmeter_austria_energy.exceptions import (
+    SmartmeterException,
+    SmartmeterSerialException,
+    SmartmeterTimeoutException,
+)
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.supplier import Supplier
+
+from .network import is_serial_url
+from .telegram import TELEGRAM_BACKLOG, Telegram, TelegramDecodeCache, TelegramReader
+
+_LOGGER = logging.getLogger(__name__)
+
+SERIAL_BAUDRATE = 2400
+SERIAL_READ_TIMEOUT = 1.0
+
+# Maximum time a read waits for the next telegram of its meter.
+# The meters push a telegram every 5 s.
+READ_TIMEOUT = 15.0
+
+
+class MultiplexedSmartmeter:
+    """Reads the telegrams of one meter from a shared serial line.
+
+    It can be used in place of smartmeter_austria_energy's Smartmeter.
+    """
+
+    def __init__(
+        self, multiplexer: PortMultiplexer, supplier: Supplier, key_hex: str
+    ) -> None:
+        """Initialize."""
+        self._multiplexer = multiplexer
+        self._supplier = supplier
+        self._key_hex = key_hex
+        self._decode_cache = TelegramDecodeCache()
+        self._system_title: bytes | None = None
+        self._telegrams: deque[Telegram] = deque(maxlen=TELEGRAM_BACKLOG)
+        self._interrupted = threading.Event()
+        multiplexer.register(self)
+
+    @property
+    def supplier(self) -> Supplier:
+        """Gets the supplier."""
+        return self._supplier
+
+    @property
+    def decode_cache(self) -> TelegramDecodeCache:
+        """Gets the cache of decoded telegrams."""
+        return self._decode_cache
+
+    @property
+    def multiplexer(self) -> PortMultiplexer:
+        """Gets the multiplexer of the shared line."""
+        return self._multiplexer
+
+    @property
+    def system_title(self) -> bytes | None:
+        """Gets the system title of the meter, once it is known."""
+        return self._system_title
+
+    @property
+    def interrupted(self) -> bool:
+        """Gets if the running read was interrupted."""
+        return self._interrupted.is_set()
+
+    def pop_interrupted(self) -> bool:
+        """Take the interrupt of the read, it is cleared once it was observed.
+
+        An interrupt which arrives before the read starts stops this read.
+        """
+        if not self._interrupted.is_set():
+            return False
+        self._interrupted.clear()
+        return True
+
+    def read(self) -> ObisData:
+        """Read the data of the newest telegram of this meter."""
+        telegram = self._multiplexer.read_telegram(self)
+        try:
+            return self._decode_cache.decode(self._supplier, telegram, self._key_hex)
+        except Exception as exception:
+            raise SmartmeterException() from exception
+
+    def read_batch(self) -> list[ObisData]:
+        """Read the data of all telegrams received since the last read, oldest first."""
+        telegrams = self._multiplexer.read_telegrams(self)
+        try:
+            return self._decode_cache.decode_batch(
+                self._supplier, telegrams, self._key_hex
+            )
+        except Exception as exception:
+            raise SmartmeterException() from exception
+
+    def interrupt(self) -> None:
+        """Stop a running read right away, it can be called from any thread.
+
+        The serial read of the line is woken, the reads of other meters
+        read again.
+        """
+        self._interrupted.set()
+        self._multiplexer.cancel_read()
+
+    def close(self) -> None:
+        """Stop receiving telegrams from the shared line, a running read is interrupted."""
+        self.interrupt()
+        self._multiplexer.unregister(self)
+
+    def try_bind(self, telegram: Telegram) -> bool:
+        """Bind to the meter sending the telegram, if it can be decoded with our key."""
+        try:
+            # The cache avoids a second decryption when the telegram is read.
+            obisdata = self._decode_cache.decode(self._supplier, telegram, self._key_hex)
+            device_number = obisdata.DeviceNumber.value
+        except Exception:
+            return False
+
+        if not device_number or obisdata.RealEnergyIn is None:
+            return False
+
+        self._system_title = telegram.system_title
+        _LOGGER.debug(
+            "Meter '%s' was found on the shared line. System title: %s",
+            device_number,
+            telegram.system_title.hex(),
+        )
+        return True
+
+    def put_telegram(self, telegram: Telegram) -> None:
+        """Store a telegram routed to this meter."""
+        self._telegrams.append(telegram)
+
+    def pop_telegrams(self) -> list[Telegram]:
+        """Take all routed telegrams, oldest first."""
+        telegrams: list[Telegram] = []
+        # popleft is atomic, the telegrams are routed by other threads.
+        while True:
+            try:
+                telegrams.append(self._telegrams.popleft())
+            except IndexError:
+                return telegrams
+
+
+class PortMultiplexer:
+    """Reads a shared serial line once and routes the telegrams by system title."""
+
+    def __init__(self, port: str, read_timeout: float = READ_TIMEOUT) -> None:
+        """Initialize."""
+        self._port = port
+        self._read_timeout = read_timeout
+        self._lock = threading.Lock()
+        self._serial: serial.Serial | None = None
+        # Guards the port against a cancel of the read while it is closed.
+        self._serial_lock = threading.Lock()
+        self._reader = TelegramReader()
+        self._meters: list[MultiplexedSmartmeter] = []
+        self._routes: dict[bytes, MultiplexedSmartmeter] = {}
+        self._unknown_telegrams: int = 0
+
+    @property
+    def port(self) -> str:
+        """Gets the serial port."""
+        return self._port
+
+    @property
+    def meters(self) -> list[MultiplexedSmartmeter]:
+        """Gets the registered meters."""
+        return self._meters
+
+    @property
+    def reader(self) -> TelegramReader:
+        """Gets the reader which assembles and checks the frames of the line."""
+        return self._reader
+
+    @property
+    def unknown_telegrams(self) -> int:
+        """Gets the number of telegrams no registered meter could decode."""
+        return self._unknown_telegrams
+
+    def register(self, meter: MultiplexedSmartmeter) -> None:
+        """Register a meter on the shared line.
+
+        A running read of the line is woken, so the lock is released soon.
+        """
+        self.cancel_read()
+        with self._lock:
+            self._meters.append(meter)
+
+    def unregister(self, meter: MultiplexedSmartmeter) -> None:
+        """Unregister a meter, the port is closed with the last one."""
+        with self._lock:
+            if meter in self._meters:
+                self._meters.remove(meter)
+            self._routes = {
+                title: routed
+                for title, routed in self._routes.items()
+                if routed is not meter
+            }
+            if not self._meters:
+                self._close_serial()
+
+    def rebind(self, port: str) -> None:
+        """Read from another port, e.g. after the adapter was enumerated again.
+
+        It waits for a running read of the line.
+        """
+        with self._lock:
+            self._close_serial()
+            self._port = port
+
+    def cancel_read(self) -> None:
+        """Wake a blocking read of the line, it can be called from any thread.
+
+        Network URLs cannot be woken, their reads return within the serial
+        read timeout.
+        """
+        with self._serial_lock:
+            if (cancel_read := getattr(self._serial, "cancel_read", None)) is not None:
+                cancel_read()
+
+    def read_telegram(self, meter: MultiplexedSmartmeter) -> Telegram:
+        """Read the newest telegram of the meter, older ones are dropped."""
+        return self.read_telegrams(meter)[-1]
+
+    def read_telegrams(self, meter: MultiplexedSmartmeter) -> list[Telegram]:
+        """Read the line until a telegram of the meter was received.
+
+        All telegrams of the meter since its last read are returned, oldest
+        first. Telegrams of other meters which are read meanwhile are routed
+        to them, so every byte on the line is read only once.
+        """
+        deadline = time.monotonic() + self._read_timeout
+        while True:
+            if telegrams := meter.pop_telegrams():
+                return telegrams
+
+            if meter.pop_interrupted():
+                raise SmartmeterTimeoutException(
+                    f"Reading '{self._port}' was interrupted."
+                )
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SmartmeterTimeoutException(
+                    f"No telegram received on '{self._port}'."
+                )
+
+            if not self._lock.acquire(timeout=remaining):
+                continue
+            try:
+                # Another reader might have routed a telegram to us meanwhile.
+                if telegrams := meter.pop_telegrams():
+                    return telegrams
+                if meter.interrupted:
+                    continue
+                self._read_chunk()
+            finally:
+                self._lock.release()
+
+    def _read_chunk(self) -> None:
+        """Read the available bytes and route the completed telegrams."""
+        try:
+            if self._serial is None:
+                self._open_serial()
+            chunk = self._serial.read(max(1, self._serial.in_waiting))
+        except serial.SerialException as exception:
+            self._close_serial()
+            raise SmartmeterSerialException(
+                f"'{self._port}' cannot be read."
+            ) from exception
+
+        for telegram in self._reader.feed(chunk):
+            self._route(telegram)
+
+    def _route(self, telegram: Telegram) -> None:
+        """Hand over a telegram to the meter which sent it."""
+        meter = self._routes.get(telegram.system_title)
+        if meter is None:
+            meter = next(
+                (
+                    unbound
+                    for unbound in self._meters
+                    if unbound.system_title is None and unbound.try_bind(telegram)
+                ),
+                None,
+            )
+            if meter is None:
+                self._unknown_telegrams += 1
+                return
+            self._routes[telegram.system_title] = meter
+
+        meter.put_telegram(telegram)
+
+    def _open_serial(self) -> None:
+        """Open the shared port, it stays open while meters are registered."""
+        self._reader.reset()
+        if is_serial_url(self._port):
+            # Network ports like rfc2217://host:port
+            self._serial = serial.serial_for_url(
+                self._port,
+                baudrate=SERIAL_BAUDRATE,
+                timeout=SERIAL_READ_TIMEOUT,
+            )
+            return
+
+        self._serial = serial.Serial(
+            port=self._port,
+            baudrate=SERIAL_BAUDRATE,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            bytesize=serial.EIGHTBITS,
+            timeout=SERIAL_READ_TIMEOUT,
+        )
+
+    def _close_serial(self) -> None:
+        """Close the shared port."""
+        with self._serial_lock:
+            if self._serial is not None:
+                try:
+                    self._serial.close()
+                except serial.SerialException:
+                    _LOGGER.debug("Closing port '%s' failed.", self._port)
+                self._serial = None
+
@@ -0,0 +1,239 @@
+"""Reads a smart meter over a network serial bridge (ser2net, ESP bridges)."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import asyncio
+from collections import deque
+from functools import partial
+import logging
+import socket
+from urllib.parse import urlsplit
+
+from smartmeter_austria_energy.exceptions import (
+    SmartmeterException,
+    SmartmeterSerialException,
+    SmartmeterTimeoutException,
+)
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.supplier import Supplier
+
+from .telegram import TELEGRAM_BACKLOG, Telegram, TelegramDecodeCache, TelegramReader
+
+_LOGGER = logging.getLogger(__name__)
+
+# Raw TCP bridges, handled with asyncio.
+NETWORK_SCHEMES = ("socket", "tcp")
+
+# Handled by pyserial's serial_for_url.
+SERIAL_URL_SCHEMES = ("rfc2217",)
+
+# Maximum time a read waits for the next telegram.
+# The meters push a telegram every 5 s.
+READ_TIMEOUT = 15.0
+
+KEEPALIVE_IDLE = 10
+KEEPALIVE_INTERVAL = 5
+KEEPALIVE_COUNT = 3
+
+
+def is_network_port(port: str) -> bool:
+    """Check the port is an URL of a raw TCP serial bridge."""
+    return urlsplit(port).scheme in NETWORK_SCHEMES
+
+
+def is_serial_url(port: str) -> bool:
+    """Check the port is an URL which is opened by pyserial (e.g. rfc2217://)."""
+    return urlsplit(port).scheme in SERIAL_URL_SCHEMES
+
+
+def parse_network_port(port: str) -> tuple[str, int]:
+    """Get host and port of a network bridge URL.
+
+    Raises ValueError if the URL is not valid.
+    """
+    url = urlsplit(port)
+    if url.scheme not in NETWORK_SCHEMES + SERIAL_URL_SCHEMES or not url.hostname:
+        raise ValueError(f"'{port}' is not a valid network port.")
+    if url.port is None:
+        raise ValueError(f"'{port}' has no TCP port.")
+    return url.hostname, url.port
+
+
+def _enable_keepalive(sock: socket.socket) -> None:
+    """Detect dead bridges on otherwise idle connections."""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+    if hasattr(socket, "TCP_KEEPCNT"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT)
+
+
+class TelegramProtocol(asyncio.Protocol):
+    """Assembles telegrams from the received byte stream on the event loop.
+
+    The reader parses every received chunk right away, so a telegram is
+    complete as soon as its last byte was received.
+    """
+
+    def __init__(self, reader: TelegramReader | None = None) -> None:
+        """Initialize."""
+        self._reader = reader or TelegramReader()
+        self._telegrams: deque[Telegram] = deque(maxlen=TELEGRAM_BACKLOG)
+        self._received = asyncio.Event()
+        self._error: Exception | None = None
+        self.transport: asyncio.Transport | None = None
+
+    @property
+    def is_connected(self) -> bool:
+        """Gets if the connection is open."""
+        return self.transport is not None and self._error is None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Handle a new connection."""
+        self.transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        """Handle received bytes, the telegrams are kept until they are read."""
+        if telegrams := self._reader.feed(data):
+            self._telegrams.extend(telegrams)
+            self._received.set()
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Handle a closed connection."""
+        self._error = exc or ConnectionResetError("Connection closed.")
+        self._received.set()
+
+    async def async_next_telegrams(self) -> list[Telegram]:
+        """Get the telegrams which were not returned yet, oldest first, or wait for them."""
+        while True:
+            if self._error is not None:
+                raise self._error
+            if self._telegrams:
+                telegrams = list(self._telegrams)
+                self._telegrams.clear()
+                self._received.clear()
+                return telegrams
+            self._received.clear()
+            await self._received.wait()
+
+
+class StreamSmartmeter(ABC):
+    """Reads the telegrams of a meter from a byte stream on the event loop.
+
+    It can be used in place of smartmeter_austria_energy's Smartmeter, but is
+    read with async_read() on the event loop instead of an executor thread.
+    The subclasses open the stream.
+    """
+
+    def __init__(
+        self,
+        supplier: Supplier,
+        port: str,
+        key_hex: str,
+        read_timeout: float = READ_TIMEOUT,
+    ) -> None:
+        """Initialize."""
+        self._supplier = supplier
+        self._port = port
+        self._key_hex = key_hex
+        self._decode_cache = TelegramDecodeCache()
+        # Kept over reconnects, so the frame statistics are not lost.
+        self._reader = TelegramReader()
+        self._read_timeout = read_timeout
+        self._protocol: TelegramProtocol | None = None
+
+    @property
+    def supplier(self) -> Supplier:
+        """Gets the supplier."""
+        return self._supplier
+
+    @property
+    def decode_cache(self) -> TelegramDecodeCache:
+        """Gets the cache of decoded telegrams."""
+        return self._decode_cache
+
+    @property
+    def reader(self) -> TelegramReader:
+        """Gets the reader which assembles and checks the frames."""
+        return self._reader
+
+    @property
+    def port(self) -> str:
+        """Gets the port or the URL of the bridge."""
+        return self._port
+
+    async def async_read(self) -> ObisData:
+        """Read the data of the newest telegram."""
+        telegram = (await self._async_receive())[-1]
+        try:
+            return self._decode_cache.decode(self._supplier, telegram, self._key_hex)
+        except Exception as exception:
+            raise SmartmeterException() from exception
+
+    async def async_read_batch(self) -> list[ObisData]:
+        """Read the data of all telegrams received since the last read, oldest first."""
+        telegrams = await self._async_receive()
+        try:
+            return self._decode_cache.decode_batch(
+                self._supplier, telegrams, self._key_hex
+            )
+        except Exception as exception:
+            raise SmartmeterException() from exception
+
+    async def _async_receive(self) -> list[Telegram]:
+        """Wait for the telegrams received since the last read."""
+        try:
+            async with asyncio.timeout(self._read_timeout):
+                if self._protocol is None or not self._protocol.is_connected:
+                    await self._async_connect()
+                return await self._protocol.async_next_telegrams()
+        except TimeoutError as exception:
+            raise SmartmeterTimeoutException(
+                f"'{self._port}' has a timeout."
+            ) from exception
+        except OSError as exception:
+            self.close()
+            raise SmartmeterSerialException(
+                f"'{self._port}' cannot be read."
+            ) from exception
+
+    def close(self) -> None:
+        """Close the stream."""
+        if self._protocol is not None:
+            if self._protocol.transport is not None:
+                self._protocol.transport.close()
+            self._protocol = None
+
+    @abstractmethod
+    async def _async_connect(self) -> None:
+        """Open the stream and set the protocol receiving it."""
+
+
+class NetworkSmartmeter(StreamSmartmeter):
+    """Reads the telegrams of a meter from a raw TCP serial bridge."""
+
+    def __init__(
+        self,
+        supplier: Supplier,
+        port: str,
+        key_hex: str,
+        read_timeout: float = READ_TIMEOUT,
+    ) -> None:
+        """Initialize."""
+        self._host, self._tcp_port = parse_network_port(port)
+        super().__init__(supplier, port, key_hex, read_timeout)
+
+    async def _async_connect(self) -> None:
+        """Connect to the bridge."""
+        self.close()
+        loop = asyncio.get_running_loop()
+        self._reader.reset()
+        transport, protocol = await loop.create_connection(
+            partial(TelegramProtocol, self._reader), self._host, self._tcp_port
+        )
+        if (sock := transport.get_extra_info("socket")) is not None:
+            _enable_keepalive(sock)
+        self._protocol = protocol
+        _LOGGER.debug("Connected to '%s'", self._port)
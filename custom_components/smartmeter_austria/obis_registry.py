@@ -0,0 +1,137 @@
+"""Declares the OBIS values which can be shown as sensors.
+
+The sensors of a meter are the values its supplier sends, in the order of
+this registry. A value which is added to a supplier's supplied_values shows
+up as sensor if it is declared here. This module must not import Home Assistant.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.supplier import SUPPLIERS, Supplier
+
+
+@dataclass(frozen=True, slots=True)
+class ObisField:
+    """Defines a value of the telegrams and how it is shown.
+
+    The device class, the state class and the unit are the values of
+    Home Assistant's enums. The scaler of the telegram is applied by the
+    decoder already.
+    """
+
+    sensor_id: str
+    name: str
+    icon: str
+    state_class: str
+    unit: str | None = None
+    device_class: str | None = None
+    # Reduced OBIS code A.B.C.D.E.F, None for calculated values.
+    obis_code: str | None = None
+    # Values a calculated value is calculated from.
+    sources: tuple[str, ...] = ()
+    # OBIS code as it is sent in the telegram.
+    obis_bytes: bytes | None = field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        """Convert the OBIS code once."""
+        if self.obis_code is not None:
+            object.__setattr__(
+                self,
+                "obis_bytes",
+                bytes(int(group) for group in self.obis_code.split(".")),
+            )
+
+    @property
+    def library(self) -> bool:
+        """Gets if the value is kept by the library's ObisData.
+
+        Other values are only decoded by the readers of this integration.
+        """
+        return isinstance(getattr(ObisData, self.sensor_id, None), property)
+
+
+OBIS_REGISTRY: tuple[ObisField, ...] = (
+    ObisField("VoltageL1", "Voltage L1", "mdi:flash-triangle-outline",
+              "measurement", "V", "voltage", "1.0.32.7.0.255"),
+    ObisField("VoltageL2", "Voltage L2", "mdi:flash-triangle-outline",
+              "measurement", "V", "voltage", "1.0.52.7.0.255"),
+    ObisField("VoltageL3", "Voltage L3", "mdi:flash-triangle-outline",
+              "measurement", "V", "voltage", "1.0.72.7.0.255"),
+    ObisField("CurrentL1", "Current L1", "mdi:current-ac",
+              "measurement", "A", "current", "1.0.31.7.0.255"),
+    ObisField("CurrentL2", "Current L2", "mdi:current-ac",
+              "measurement", "A", "current", "1.0.51.7.0.255"),
+    ObisField("CurrentL3", "Current L3", "mdi:current-ac",
+              "measurement", "A", "current", "1.0.71.7.0.255"),
+    ObisField("RealPowerIn", "Real power in", "mdi:transmission-tower-export",
+              "measurement", "W", "power", "1.0.1.7.0.255"),
+    ObisField("RealPowerOut", "Real power out", "mdi:transmission-tower-import",
+              "measurement", "W", "power", "1.0.2.7.0.255"),
+    ObisField("RealPowerDelta", "Real power delta", "mdi:transmission-tower",
+              "measurement", "W", "power",
+              sources=("RealPowerIn", "RealPowerOut")),
+    ObisField("RealEnergyIn", "Real energy in", "mdi:transmission-tower-export",
+              "total_increasing", "Wh", "energy", "1.0.1.8.0.255"),
+    ObisField("RealEnergyOut", "Real energy out", "mdi:transmission-tower-import",
+              "total_increasing", "Wh", "energy", "1.0.2.8.0.255"),
+    ObisField("ReactiveEnergyIn", "Reactive energy in", "mdi:transmission-tower-export",
+              "total_increasing", "varh", None, "1.0.3.8.0.255"),
+    ObisField("ReactiveEnergyOut", "Reactive energy out", "mdi:transmission-tower-import",
+              "total_increasing", "varh", None, "1.0.4.8.0.255"),
+    ObisField("Factor", "Power factor", "mdi:angle-acute",
+              "measurement", None, "power_factor", "1.0.13.7.0.255"),
+    ObisField("Frequency", "Frequency", "mdi:sine-wave",
+              "measurement", "Hz", "frequency", "1.0.14.7.0.255"),
+)
+
+OBIS_FIELDS: dict[str, ObisField] = {
+    obis_field.sensor_id: obis_field for obis_field in OBIS_REGISTRY
+}
+
+
+def build_catalogue(supplied_values: list[str]) -> tuple[ObisField, ...]:
+    """Get the fields of the supplied values and the values calculated from them."""
+    supplied = set(supplied_values)
+    return tuple(
+        obis_field
+        for obis_field in OBIS_REGISTRY
+        if (obis_field.sensor_id in supplied if not obis_field.sources
+            else supplied.issuperset(obis_field.sources))
+    )
+
+
+# Built once, the sensor setup of every meter looks its supplier up.
+SUPPLIER_CATALOGUES: dict[str, tuple[ObisField, ...]] = {
+    name: build_catalogue(supplier.supplied_values)
+    for name, supplier in SUPPLIERS.items()
+}
+
+# Supplied values which are decoded by the readers of this integration only.
+SUPPLIER_EXTRA_FIELDS: dict[str, tuple[ObisField, ...]] = {
+    name: tuple(
+        obis_field
+        for obis_field in catalogue
+        if obis_field.obis_code and not obis_field.library
+    )
+    for name, catalogue in SUPPLIER_CATALOGUES.items()
+}
+
+
+def supplier_catalogue(supplier: Supplier) -> tuple[ObisField, ...]:
+    """Get the fields shown for the meters of a supplier."""
+    if (catalogue := SUPPLIER_CATALOGUES.get(supplier.name)) is not None:
+        return catalogue
+    return build_catalogue(supplier.supplied_values or [])
+
+
+def supplier_extra_fields(supplier: Supplier) -> tuple[ObisField, ...]:
+    """Get the supplied values which the library's ObisData does not keep."""
+    if (fields := SUPPLIER_EXTRA_FIELDS.get(supplier.name)) is not None:
+        return fields
+    return tuple(
+        obis_field
+        for obis_field in supplier_catalogue(supplier)
+        if obis_field.obis_code and not obis_field.library
+    )
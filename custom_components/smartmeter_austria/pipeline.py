@@ -0,0 +1,232 @@
+"""Processes decoded telegrams, shared by the integration and the headless reader.
+
+This module and the modules it uses must not import Home Assistant.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from datetime import datetime, timedelta
+import json
+import logging
+import socket
+import time
+from typing import Any, Protocol, runtime_checkable
+
+from smartmeter_austria_energy.obisdata import ObisData
+
+from .watchdog import PUSH_PERIOD
+
+_LOGGER = logging.getLogger(__name__)
+
+# Values which are sent for every telegram. The keys are kept short to keep
+# the message small, as consumers receive one message per telegram.
+PUBLISHED_VALUES = {
+    "VoltageL1": "u1",
+    "VoltageL2": "u2",
+    "VoltageL3": "u3",
+    "CurrentL1": "i1",
+    "CurrentL2": "i2",
+    "CurrentL3": "i3",
+    "RealPowerIn": "p_in",
+    "RealPowerOut": "p_out",
+    "RealPowerDelta": "p_delta",
+    "RealEnergyIn": "e_in",
+    "RealEnergyOut": "e_out",
+    "ReactiveEnergyIn": "q_in",
+    "ReactiveEnergyOut": "q_out",
+}
+
+
+# Values calculated by the stages, the anomaly detection adds flags.
+type StageValues = dict[str, float | bool | None]
+
+
+class TelegramStage(Protocol):
+    """Calculates values from every decoded telegram."""
+
+    def update(self, obisdata: ObisData) -> StageValues:
+        """Add a telegram and return the calculated values."""
+
+
+@runtime_checkable
+class PersistentStage(TelegramStage, Protocol):
+    """A stage whose state is kept over restarts and reloads."""
+
+    def as_state(self) -> dict[str, Any]:
+        """Return the state, which can be stored as JSON."""
+
+    def restore(self, state: dict[str, Any]) -> None:
+        """Continue with a stored state."""
+
+
+class TelegramClock:
+    """Gets the time of the telegram which is processed, the stages use it as their now function.
+
+    The telegrams of a batch which piled up during a stall were pushed one
+    push period apart, the newest one now.
+    """
+
+    def __init__(
+        self,
+        now: Callable[[], datetime] = lambda: datetime.now().astimezone(),
+        push_period: float = PUSH_PERIOD,
+    ) -> None:
+        """Initialize."""
+        self._now = now
+        self._push_period = push_period
+        self._backlog: int = 0
+
+    def __call__(self) -> datetime:
+        """Get the time of the telegram."""
+        moment = self._now()
+        if self._backlog:
+            moment -= timedelta(seconds=self._backlog * self._push_period)
+        return moment
+
+    def set_backlog(self, backlog: int) -> None:
+        """Set the number of newer telegrams of the batch, 0 for the newest telegram."""
+        self._backlog = backlog
+
+
+class TelegramPipeline:
+    """Runs the stages for every decoded telegram and keeps their values."""
+
+    def __init__(
+        self,
+        stages: list[TelegramStage] | None = None,
+        clock: TelegramClock | None = None,
+    ) -> None:
+        """Initialize."""
+        self._stages: list[TelegramStage] = list(stages or [])
+        self._clock = clock or TelegramClock()
+        self._values: StageValues = {}
+
+    @property
+    def stages(self) -> list[TelegramStage]:
+        """Gets the stages."""
+        return self._stages
+
+    @property
+    def clock(self) -> TelegramClock:
+        """Gets the clock of the telegram which is processed."""
+        return self._clock
+
+    @property
+    def values(self) -> StageValues:
+        """Gets the values calculated by all stages."""
+        return self._values
+
+    def process(self, obisdata: ObisData, backlog: int = 0) -> StageValues:
+        """Run all stages for a telegram, which has backlog newer telegrams in its batch.
+
+        Errors of a stage are logged only, the other stages still run.
+        """
+        self._clock.set_backlog(backlog)
+        for stage in self._stages:
+            try:
+                self._values.update(stage.update(obisdata))
+            except Exception as exception:
+                _LOGGER.debug(
+                    "%s cannot calculate its values. %s",
+                    type(stage).__name__,
+                    exception,
+                    exc_info=True,
+                )
+        self._clock.set_backlog(0)
+        return self._values
+
+    def process_batch(self, batch: list[ObisData]) -> list[StageValues]:
+        """Run all stages for several telegrams, oldest first.
+
+        Each stage gets the whole batch in one pass, the values of the
+        newest telegram are kept. Returns the values calculated for each
+        telegram. Errors are handled like in process().
+        """
+        steps: list[StageValues] = [{} for _ in batch]
+        for stage in self._stages:
+            for index, obisdata in enumerate(batch):
+                self._clock.set_backlog(len(batch) - 1 - index)
+                try:
+                    steps[index].update(stage.update(obisdata))
+                except Exception as exception:
+                    _LOGGER.debug(
+                        "%s cannot calculate its values. %s",
+                        type(stage).__name__,
+                        exception,
+                        exc_info=True,
+                    )
+        self._clock.set_backlog(0)
+        for values in steps:
+            self._values.update(values)
+        return steps
+
+
+def parse_udp_target(udp_target: str) -> tuple[str, int]:
+    """Split a 'host:port' string into host and port.
+
+    Raises ValueError if the target is not valid.
+    """
+    host, separator, port = udp_target.strip().rpartition(":")
+    host = host.strip("[]")
+    if not separator or not host:
+        raise ValueError(f"'{udp_target}' is not a valid 'host:port' target.")
+
+    port_number = int(port)
+    if not 0 < port_number < 65536:
+        raise ValueError(f"Port of '{udp_target}' is out of range.")
+
+    return host, port_number
+
+
+def telegram_message(
+    obisdata: ObisData,
+    device_number: str,
+    values: StageValues | None = None,
+) -> dict[str, str | float | None]:
+    """Get the message of a decoded telegram and optional calculated values."""
+    message: dict[str, str | float | None] = {
+        "dev": device_number,
+        "ts": round(time.time(), 3),
+    }
+    for sensor_id, key in PUBLISHED_VALUES.items():
+        obis_value = getattr(obisdata, sensor_id, None)
+        message[key] = None if obis_value is None else obis_value.value
+
+    if values:
+        message.update(values)
+    return message
+
+
+def encode_telegram(
+    obisdata: ObisData,
+    device_number: str,
+    values: StageValues | None = None,
+) -> bytes:
+    """Encode a decoded telegram and optional calculated values as compact JSON message."""
+    return json.dumps(
+        telegram_message(obisdata, device_number, values), separators=(",", ":")
+    ).encode()
+
+
+class _UdpSenderProtocol(asyncio.DatagramProtocol):
+    """Logs errors of the UDP transport, nothing is received."""
+
+    def error_received(self, exc: Exception) -> None:
+        """Handle an error of a previous send operation."""
+        _LOGGER.debug("UDP publish failed. %s", exc)
+
+
+async def async_open_udp_sender(
+    udp_target: tuple[str, int],
+) -> asyncio.DatagramTransport:
+    """Open an UDP socket which sends to the target."""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        _UdpSenderProtocol, remote_addr=udp_target
+    )
+    sock = transport.get_extra_info("socket")
+    if sock is not None and sock.family == socket.AF_INET:
+        # Keep multicast messages on the local network.
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+    return transport
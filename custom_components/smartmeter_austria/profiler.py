@@ -0,0 +1,146 @@
+"""Profiles the update cycles of a meter with cProfile and tracemalloc.
+
+This module must not import Home Assistant.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from typing import Any
+
+PROFILE_CYCLES = 5
+
+# Number of functions and allocation sites in the report and the summary
+REPORT_LINES = 40
+SUMMARY_LINES = 10
+
+
+class UpdateProfiler:
+    """Collects the CPU time and the allocations of the next update cycles.
+
+    A cycle is profiled from the start of the read to the last state
+    write. The profiler stays enabled while the cycle waits for the
+    telegram and covers all threads, so the reads in the read executor are
+    included, but also everything else Home Assistant runs meanwhile.
+
+    The snapshots of the allocations block for a while, start_memory()
+    and stop_memory() are run in an executor.
+    """
+
+    def __init__(
+        self, path: str, cycles: int = PROFILE_CYCLES, memory: bool = True
+    ) -> None:
+        """Initialize."""
+        self._path = path
+        self._cycles = cycles
+        self._memory = memory
+        self._profile = cProfile.Profile()
+        self._cycles_done: int = 0
+        self._started: float | None = None
+        self._duration: float = 0.0
+        self._started_tracemalloc = False
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._memory_stats: list[tracemalloc.StatisticDiff] = []
+
+    @property
+    def path(self) -> str:
+        """Gets the path of the report file."""
+        return self._path
+
+    @property
+    def cycles_done(self) -> int:
+        """Gets the number of profiled cycles."""
+        return self._cycles_done
+
+    @property
+    def finished(self) -> bool:
+        """Gets if all cycles were profiled."""
+        return self._cycles_done >= self._cycles
+
+    def start_memory(self) -> None:
+        """Start tracing the allocations before the first cycle."""
+        if self._cycles_done > 0 or not self._memory or self._snapshot is not None:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._snapshot = tracemalloc.take_snapshot()
+
+    def start(self) -> None:
+        """Start profiling a cycle.
+
+        Raises ValueError if another profiler is active.
+        """
+        self._profile.enable()
+        self._started = time.perf_counter()
+
+    def stop(self) -> None:
+        """Stop profiling a cycle."""
+        self._profile.disable()
+        if self._started is not None:
+            self._duration += time.perf_counter() - self._started
+            self._started = None
+        self._cycles_done += 1
+
+    def stop_memory(self) -> None:
+        """Stop tracing the allocations and compare them to the first snapshot."""
+        if self._snapshot is not None and tracemalloc.is_tracing():
+            self._memory_stats = tracemalloc.take_snapshot().compare_to(
+                self._snapshot, "lineno"
+            )
+        self._snapshot = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def summary(self) -> dict[str, Any]:
+        """Return the most expensive functions and allocation sites."""
+        stats = pstats.Stats(self._profile)
+        functions = sorted(
+            stats.stats.items(),  # type: ignore[attr-defined]
+            key=lambda item: item[1][3],
+            reverse=True,
+        )
+        return {
+            "path": self._path,
+            "cycles": self._cycles_done,
+            "duration": round(self._duration, 6),
+            "functions": [
+                {
+                    "function": pstats.func_std_string(function),
+                    "calls": calls,
+                    "total_time": round(total_time, 6),
+                    "cumulative_time": round(cumulative_time, 6),
+                }
+                for function, (_, calls, total_time, cumulative_time, _) in functions[
+                    :SUMMARY_LINES
+                ]
+            ],
+            "memory": [
+                {"location": str(stat.traceback), "size_diff": stat.size_diff}
+                for stat in self._memory_stats[:SUMMARY_LINES]
+            ],
+        }
+
+    def report(self) -> str:
+        """Return the report of the profiled cycles as text."""
+        output = io.StringIO()
+        output.write(
+            f"{self._cycles_done} update cycles, {self._duration:.6f} s profiled\n\n"
+        )
+        pstats.Stats(self._profile, stream=output).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(
+            REPORT_LINES
+        )
+        if self._memory_stats:
+            output.write("Allocations since the first cycle\n\n")
+            for stat in self._memory_stats[:REPORT_LINES]:
+                output.write(f"{stat}\n")
+        return output.getvalue()
+
+    def write(self) -> None:
+        """Write the report to the file."""
+        with open(self._path, "w", encoding="utf-8") as report_file:
+            report_file.write(self.report())
@@ -0,0 +1,77 @@
+"""Publishes decoded telegrams to local consumers (MQTT and UDP)."""
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from smartmeter_austria_energy.obisdata import ObisData
+
+from .pipeline import async_open_udp_sender, encode_telegram, parse_udp_target
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TelegramPublisher:
+    """Sends every decoded telegram once to MQTT and/or an UDP (multicast) group."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        device_number: str,
+        mqtt_topic: str | None = None,
+        udp_target: str | None = None,
+    ) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._device_number = device_number
+        self._mqtt_topic = mqtt_topic or None
+        self._udp_target = parse_udp_target(udp_target) if udp_target else None
+        self._udp_transport: asyncio.DatagramTransport | None = None
+        self._published: int = 0
+        self._failed: int = 0
+
+    @property
+    def published(self) -> int:
+        """Gets the number of published telegrams."""
+        return self._published
+
+    @property
+    def failed(self) -> int:
+        """Gets the number of telegrams which could not be published."""
+        return self._failed
+
+    async def async_start(self) -> None:
+        """Open the UDP socket, if an UDP target is configured."""
+        if self._udp_target is None or self._udp_transport is not None:
+            return
+
+        self._udp_transport = await async_open_udp_sender(self._udp_target)
+
+    @callback
+    def stop(self) -> None:
+        """Close the UDP socket."""
+        if self._udp_transport is not None:
+            self._udp_transport.close()
+            self._udp_transport = None
+
+    async def async_publish(
+        self, obisdata: ObisData, values: dict[str, float | None] | None = None
+    ) -> None:
+        """Publish the telegram and the values. Errors are logged and never raised."""
+        payload = encode_telegram(obisdata, self._device_number, values)
+
+        try:
+            if self._udp_transport is not None:
+                self._udp_transport.sendto(payload)
+
+            if self._mqtt_topic is not None and "mqtt" in self._hass.config.components:
+                from homeassistant.components import mqtt
+
+                await mqtt.async_publish(self._hass, self._mqtt_topic, payload)
+        except Exception as exception:
+            self._failed += 1
+            _LOGGER.debug("Telegram publish failed. %s", exception)
+            return
+
+        self._published += 1
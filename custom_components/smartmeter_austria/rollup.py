@@ -0,0 +1,184 @@
+"""Rolls the energy counters of a meter up into 5 minute and hourly periods.
+
+The rollups are updated with every telegram in O(1), so the hourly
+statistics can be published without a scan of the states of the hour.
+This module must not import Home Assistant.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from smartmeter_austria_energy.obisdata import ObisData
+
+# The counters which are rolled up
+ROLLUP_VALUES = ("RealEnergyIn", "RealEnergyOut", "ReactiveEnergyIn", "ReactiveEnergyOut")
+
+# Length of the periods in seconds
+SHORT_PERIOD = 300
+LONG_PERIOD = 3600
+
+# Finished periods kept per counter
+ROLLUP_HISTORY = 12
+
+
+@dataclass(slots=True)
+class RollupPeriod:
+    """Defines the counter of a period.
+
+    The sum is the increase of the counter since the rollup was started,
+    like the sum of Home Assistant's statistics.
+    """
+
+    start: datetime
+    state: float
+    sum: float
+    # Sum at the start of the period
+    start_sum: float
+
+    @property
+    def increase(self) -> float:
+        """Gets the increase of the counter in the period."""
+        return self.sum - self.start_sum
+
+
+def period_start(now: datetime, period: int) -> datetime:
+    """Get the start of the period containing the time, in UTC."""
+    timestamp = now.timestamp()
+    return datetime.fromtimestamp(timestamp - timestamp % period, UTC)
+
+
+class CounterRollup:
+    """Rolls a counter up into periods of a fixed length.
+
+    A counter which goes backwards was reset, e.g. the meter was replaced,
+    its new value is the increase.
+    """
+
+    def __init__(self, period: int, history: int = ROLLUP_HISTORY) -> None:
+        """Initialize."""
+        self._period = period
+        self._first_state: float | None = None
+        self._state: float | None = None
+        self._sum: float = 0.0
+        self._current: RollupPeriod | None = None
+        self._finished: deque[RollupPeriod] = deque(maxlen=history)
+
+    @property
+    def period(self) -> int:
+        """Gets the length of the periods in seconds."""
+        return self._period
+
+    @property
+    def first_state(self) -> float | None:
+        """Gets the counter at the first telegram, the sum starts there."""
+        return self._first_state
+
+    @property
+    def current(self) -> RollupPeriod | None:
+        """Gets the running period."""
+        return self._current
+
+    @property
+    def finished(self) -> deque[RollupPeriod]:
+        """Gets the last finished periods, oldest first."""
+        return self._finished
+
+    def update(self, now: datetime, value: float) -> RollupPeriod | None:
+        """Add a counter value, return the period which was finished by it."""
+        if self._state is None:
+            self._first_state = value
+            increase = 0.0
+        else:
+            increase = value - self._state if value >= self._state else value
+        self._state = value
+        self._sum += increase
+
+        start = period_start(now, self._period)
+        current = self._current
+        if current is not None and start <= current.start:
+            current.state = value
+            current.sum = self._sum
+            return None
+
+        # The increase since the last telegram of the finished period counts
+        # to the new period.
+        self._current = RollupPeriod(start, value, self._sum, self._sum - increase)
+        if current is not None:
+            self._finished.append(current)
+        return current
+
+
+class EnergyRollups:
+    """Keeps the 5 minute and the hourly rollups of the energy counters of a meter.
+
+    The finished hourly periods are kept until they are taken for the
+    statistics, at most ROLLUP_HISTORY per counter.
+    """
+
+    def __init__(
+        self,
+        keys: tuple[str, ...] = ROLLUP_VALUES,
+        short_period: int = SHORT_PERIOD,
+        long_period: int = LONG_PERIOD,
+        history: int = ROLLUP_HISTORY,
+    ) -> None:
+        """Initialize."""
+        self._short = {key: CounterRollup(short_period, history) for key in keys}
+        self._long = {key: CounterRollup(long_period, history) for key in keys}
+        self._unpublished: dict[str, deque[RollupPeriod]] = {
+            key: deque(maxlen=history) for key in keys
+        }
+
+    @property
+    def short(self) -> dict[str, CounterRollup]:
+        """Gets the 5 minute rollups by counter."""
+        return self._short
+
+    @property
+    def long(self) -> dict[str, CounterRollup]:
+        """Gets the hourly rollups by counter."""
+        return self._long
+
+    def update(self, now: datetime, obisdata: ObisData) -> bool:
+        """Add a telegram, return if it finished a 5 minute period."""
+        short_finished = False
+        for key, short in self._short.items():
+            obis_value = getattr(obisdata, key, None)
+            if obis_value is None or obis_value.value is None:
+                continue
+            value = float(obis_value.value)
+            if short.update(now, value) is not None:
+                short_finished = True
+            if (finished := self._long[key].update(now, value)) is not None:
+                self._unpublished[key].append(finished)
+        return short_finished
+
+    def pop_finished(self) -> dict[str, list[RollupPeriod]]:
+        """Take the hourly periods which were finished since the last call, oldest first."""
+        finished: dict[str, list[RollupPeriod]] = {}
+        for key, periods in self._unpublished.items():
+            if periods:
+                finished[key] = list(periods)
+                periods.clear()
+        return finished
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the running periods and the last finished periods."""
+        return {
+            key: {
+                f"{rollup.period}s": [
+                    {
+                        "start": period.start.isoformat(),
+                        "state": period.state,
+                        "increase": round(period.increase, 3),
+                    }
+                    for period in (*rollup.finished, rollup.current)
+                    if period is not None
+                ][-3:]
+                for rollup in (self._short[key], self._long[key])
+            }
+            for key in self._short
+        }
@@ -1,7 +1,8 @@
 """Sensor platform for Smartmeter Austria Energy."""
+from datetime import datetime
 import logging
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
 from homeassistant.core import HomeAssistant
 
 from homeassistant.exceptions import ConfigEntryNotReady
@@ -11,10 +12,24 @@ from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from smartmeter_austria_energy.exceptions import SmartmeterException
 from smartmeter_austria_energy.obisdata import ObisData, ObisValueFloat, ObisValueBytes
 
-from .const import DOMAIN
-from .coordinator import SmartmeterDataCoordinator
-from .sensor_descriptions import DEFAULT_SENSOR, SENSOR_DESCRIPTIONS
+from .anomaly import ConsumptionAnomalyDetector
+from .const import AGGREGATE_DEVICE, DOMAIN
+from .coordinator import AggregateCoordinator, SmartmeterDataCoordinator
+from .multiplexer import MultiplexedSmartmeter
+from .network import StreamSmartmeter
+from .obis_registry import supplier_catalogue
+from .sensor_descriptions import (
+    AGGREGATE_SENSOR_DESCRIPTIONS,
+    ANOMALY_SENSOR_DESCRIPTIONS,
+    COST_SENSOR_DESCRIPTIONS,
+    DEFAULT_SENSOR,
+    DERIVED_SENSOR_DESCRIPTIONS,
+    SENSOR_DESCRIPTIONS,
+    SURPLUS_SENSOR_DESCRIPTIONS,
+)
 from .smartmeter_data import SmartMeterData, SmartMeterConfigEntry
+from .surplus import SurplusController
+from .tariff import CostCalculator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,33 +42,59 @@ async def async_setup_entry(hass: HomeAssistant, entry: SmartMeterConfigEntry, a
     smartmeter_data: SmartMeterData = entry.runtime_data
     coordinator: SmartmeterDataCoordinator = smartmeter_data.coordinator
 
-    all_sensors = (
-        Sensor("VoltageL1"),
-        Sensor("VoltageL2"),
-        Sensor("VoltageL3"),
-        Sensor("CurrentL1"),
-        Sensor("CurrentL2"),
-        Sensor("CurrentL3"),
-        Sensor("RealPowerIn"),
-        Sensor("RealPowerOut"),
-        Sensor("RealPowerDelta"),
-        Sensor("RealEnergyIn"),
-        Sensor("RealEnergyOut"),
-        Sensor("ReactiveEnergyIn"),
-        Sensor("ReactiveEnergyOut"),
-    )
-
     device_info: DeviceInfo = smartmeter_data.device_info
     device_number: str = smartmeter_data.device_number
 
     entities = []
 
-    # Individual inverter sensors entities
-    for sensor in all_sensors:
-        if any(sensor.sensor_id in x for x in coordinator.adapter.supplier.supplied_values):
-            mySensor = SmartmeterSensor(
-                coordinator, device_info, device_number, sensor)
-            entities.append(mySensor)
+    # Sensors of the values sent by the supplier's meters
+    # The values which the library's ObisData does not keep are decoded by
+    # the readers of this integration only.
+    adapter = coordinator.adapter
+    decodes_all = isinstance(adapter, MultiplexedSmartmeter | StreamSmartmeter)
+    for obis_field in supplier_catalogue(adapter.supplier):
+        if obis_field.library or decodes_all:
+            entities.append(SmartmeterSensor(
+                coordinator, device_info, device_number, Sensor(obis_field.sensor_id)))
+
+    # Power quality sensors of three phase meters
+    supplied_values = coordinator.adapter.supplier.supplied_values
+    if all(f"VoltageL{phase}" in supplied_values for phase in (1, 2, 3)):
+        for key in DERIVED_SENSOR_DESCRIPTIONS:
+            entities.append(SmartmeterDerivedSensor(
+                coordinator, device_info, device_number, key))
+
+    # Baselines of the anomaly detection
+    if any(isinstance(stage, ConsumptionAnomalyDetector) for stage in coordinator.pipeline.stages):
+        for key in ANOMALY_SENSOR_DESCRIPTIONS:
+            entities.append(SmartmeterDerivedSensor(
+                coordinator, device_info, device_number, key, ANOMALY_SENSOR_DESCRIPTIONS))
+
+    # Cost sensors, if a tariff is configured
+    cost_calculator = next(
+        (stage for stage in coordinator.pipeline.stages if isinstance(stage, CostCalculator)),
+        None,
+    )
+    if cost_calculator is not None:
+        for key in COST_SENSOR_DESCRIPTIONS:
+            entities.append(SmartmeterCostSensor(
+                coordinator, device_info, device_number, key, cost_calculator))
+
+    # Surplus sensors, if the surplus controller is configured
+    if any(isinstance(stage, SurplusController) for stage in coordinator.pipeline.stages):
+        for key in SURPLUS_SENSOR_DESCRIPTIONS:
+            entities.append(SmartmeterDerivedSensor(
+                coordinator, device_info, device_number, key, SURPLUS_SENSOR_DESCRIPTIONS))
+
+    # Building totals of all meters, if this entry shows them
+    if (aggregate_coordinator := smartmeter_data.aggregate_coordinator) is not None:
+        aggregate_device_info = DeviceInfo(
+            identifiers={(DOMAIN, AGGREGATE_DEVICE)},
+            name="Smart Meter building totals",
+        )
+        for key in AGGREGATE_SENSOR_DESCRIPTIONS:
+            entities.append(SmartmeterAggregateSensor(
+                aggregate_coordinator, aggregate_device_info, key))
 
     async_add_entities(entities)
 
@@ -61,6 +102,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: SmartMeterConfigEntry, a
 class Sensor:
     """Defines a sensor of the smartmeter."""
 
+    __slots__ = ("_sensor_id",)
+
     def __init__(self, sensor_id: str) -> None:
         """Initialize."""
         self._sensor_id = sensor_id
@@ -72,7 +115,11 @@ class Sensor:
 
 
 class SmartmeterSensor(CoordinatorEntity, SensorEntity):
-    """Entity representing a smartmeter sensor."""
+    """Entity representing a smartmeter sensor.
+
+    The entity keeps no reference to the telegram data, the value is read
+    from the coordinator when the state is written.
+    """
 
     def __init__(
         self,
@@ -82,35 +129,31 @@ class SmartmeterSensor(CoordinatorEntity, SensorEntity):
         sensor: Sensor,
     ) -> None:
         """Initialize a sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=sensor.sensor_id)
 
         self._attr_unique_id = f"{DOMAIN}_{device_number}_{sensor.sensor_id}"
         self._attr_device_info = device_info
         self.entity_description = SENSOR_DESCRIPTIONS.get(
             sensor.sensor_id, DEFAULT_SENSOR
         )
-        self._sensor = sensor
-        self._previous_value = None
-        self.my_coordinator = coordinator
+        self._sensor_id = sensor.sensor_id
 
     @property
     def native_value(self):
         """Return the value reported by the sensor."""
-        obisdata: ObisData = self.my_coordinator.data
+        obisdata: ObisData = self.coordinator.data
         if obisdata is None:
             raise ConfigEntryNotReady
 
         try:
             obis_value: ObisValueFloat | ObisValueBytes = getattr(
-                obisdata, self._sensor.sensor_id
+                obisdata, self._sensor_id
             )
             if obis_value is None:
                 _LOGGER.debug("obisdata is None.")
                 raise ConfigEntryNotReady()
 
-            new_value = obis_value.value
-            self._previous_value = new_value
-            return new_value
+            return obis_value.value
         except SmartmeterException as exception:
             _LOGGER.debug("native_value has an error. %s",
                           exception, exc_info=True)
@@ -125,3 +168,80 @@ class SmartmeterSensor(CoordinatorEntity, SensorEntity):
     def entity_registry_enabled_default(self) -> bool:
         """Return if the entity should be enabled when first added to the entity registry."""
         return self.entity_description.entity_category != EntityCategory.DIAGNOSTIC
+
+
+class SmartmeterDerivedSensor(CoordinatorEntity, SensorEntity):
+    """Entity representing a value calculated from the telegrams."""
+
+    def __init__(
+        self,
+        coordinator: SmartmeterDataCoordinator,
+        device_info: DeviceInfo,
+        device_number: str,
+        key: str,
+        descriptions: dict[str, SensorEntityDescription] = DERIVED_SENSOR_DESCRIPTIONS,
+    ) -> None:
+        """Initialize a sensor."""
+        super().__init__(coordinator, context=key)
+
+        self._attr_unique_id = f"{DOMAIN}_{device_number}_{key}"
+        self._attr_device_info = device_info
+        self.entity_description = descriptions[key]
+        self._key = key
+
+    @property
+    def native_value(self):
+        """Return the calculated value, None until enough telegrams were received."""
+        return self.coordinator.derived_values.get(self._key)
+
+    @property
+    def entity_registry_enabled_default(self) -> bool:
+        """Return if the entity should be enabled when first added to the entity registry."""
+        return self.entity_description.entity_category != EntityCategory.DIAGNOSTIC
+
+
+class SmartmeterCostSensor(SmartmeterDerivedSensor):
+    """Entity representing a price or a cost total of the configured tariff."""
+
+    def __init__(
+        self,
+        coordinator: SmartmeterDataCoordinator,
+        device_info: DeviceInfo,
+        device_number: str,
+        key: str,
+        cost_calculator: CostCalculator,
+    ) -> None:
+        """Initialize a sensor."""
+        super().__init__(
+            coordinator, device_info, device_number, key, COST_SENSOR_DESCRIPTIONS)
+        self._cost_calculator = cost_calculator
+
+    @property
+    def last_reset(self) -> datetime | None:
+        """Return the start of the day or the month of a total."""
+        return self._cost_calculator.last_reset(self._key)
+
+
+class SmartmeterAggregateSensor(CoordinatorEntity, SensorEntity):
+    """Entity representing a building total of all meters."""
+
+    def __init__(
+        self,
+        coordinator: AggregateCoordinator,
+        device_info: DeviceInfo,
+        key: str,
+    ) -> None:
+        """Initialize a sensor."""
+        super().__init__(coordinator, context=key)
+
+        self._attr_unique_id = f"{DOMAIN}_{AGGREGATE_DEVICE}_{key}"
+        self._attr_device_info = device_info
+        self.entity_description = AGGREGATE_SENSOR_DESCRIPTIONS[key]
+        self._key = key
+
+    @property
+    def native_value(self):
+        """Return the total, None if no meter supplies the value."""
+        if self.coordinator.data is None:
+            return None
+        return self.coordinator.data.get(self._key)
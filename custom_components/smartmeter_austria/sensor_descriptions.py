@@ -1,153 +1,282 @@
 """Description of all sensors."""
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntityDescription,
+)
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntityDescription,
     SensorStateClass,
 )
 from homeassistant.const import (
+    CURRENCY_EURO,
+    PERCENTAGE,
     UnitOfElectricCurrent,
-    UnitOfElectricPotential,
     UnitOfEnergy,
     UnitOfPower,
 )
 from homeassistant.helpers.entity import EntityCategory
 
+from .aggregate import AGGREGATE_DELTA, AGGREGATE_VALUES
+from .obis_registry import OBIS_REGISTRY, ObisField
+
+
+def _obis_description(obis_field: ObisField) -> SensorEntityDescription:
+    """Create the description of a value of the OBIS registry."""
+    return SensorEntityDescription(
+        key=obis_field.sensor_id.lower(),
+        device_class=(
+            SensorDeviceClass(obis_field.device_class)
+            if obis_field.device_class
+            else None
+        ),
+        state_class=SensorStateClass(obis_field.state_class),
+        native_unit_of_measurement=obis_field.unit,
+        name=obis_field.name,
+        icon=obis_field.icon,
+        entity_category=None,
+        has_entity_name=True,
+    )
+
+
+# Generated once from the OBIS registry, keyed by the sensor ID.
 SENSOR_DESCRIPTIONS = {
-    "VoltageL1": SensorEntityDescription(
-        key="voltagel1",
-        device_class=SensorDeviceClass.VOLTAGE,
+    obis_field.sensor_id: _obis_description(obis_field)
+    for obis_field in OBIS_REGISTRY
+}
+
+# Building totals of all meters, shown like the values of a meter.
+AGGREGATE_SENSOR_DESCRIPTIONS = {
+    key: SENSOR_DESCRIPTIONS[key] for key in (*AGGREGATE_VALUES, AGGREGATE_DELTA)
+}
+
+
+# Sensors of values which are calculated from the telegrams.
+# Voltage quality values are calculated over the last 60 telegrams.
+DERIVED_SENSOR_DESCRIPTIONS = {
+    "voltage_imbalance": SensorEntityDescription(
+        key="voltage_imbalance",
         state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        name="Voltage L1",
-        icon="mdi:flash-triangle-outline",
-        entity_category=None,
+        native_unit_of_measurement=PERCENTAGE,
+        name="Voltage imbalance",
+        icon="mdi:scale-unbalanced",
+        entity_category=EntityCategory.DIAGNOSTIC,
         has_entity_name=True,
     ),
-    "VoltageL2": SensorEntityDescription(
-        key="voltagel2",
-        device_class=SensorDeviceClass.VOLTAGE,
+    "voltage_imbalance_average": SensorEntityDescription(
+        key="voltage_imbalance_average",
         state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        name="Voltage L2",
-        icon="mdi:flash-triangle-outline",
-        entity_category=None,
+        native_unit_of_measurement=PERCENTAGE,
+        name="Voltage imbalance average",
+        icon="mdi:scale-unbalanced",
+        entity_category=EntityCategory.DIAGNOSTIC,
         has_entity_name=True,
     ),
-    "VoltageL3": SensorEntityDescription(
-        key="voltagel3",
-        device_class=SensorDeviceClass.VOLTAGE,
+    "under_voltage_severe_count": SensorEntityDescription(
+        key="under_voltage_severe_count",
         state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        name="Voltage L3",
-        icon="mdi:flash-triangle-outline",
-        entity_category=None,
+        name="Severe under-voltage count",
+        icon="mdi:flash-alert-outline",
+        entity_category=EntityCategory.DIAGNOSTIC,
         has_entity_name=True,
     ),
-    "CurrentL1": SensorEntityDescription(
-        key="currentl1",
-        device_class=SensorDeviceClass.CURRENT,
+    "under_voltage_count": SensorEntityDescription(
+        key="under_voltage_count",
         state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-        name="Current L1",
-        icon="mdi:current-ac",
-        entity_category=None,
+        name="Under-voltage count",
+        icon="mdi:flash-alert-outline",
+        entity_category=EntityCategory.DIAGNOSTIC,
         has_entity_name=True,
     ),
-    "CurrentL2": SensorEntityDescription(
-        key="currentl2",
+    "over_voltage_count": SensorEntityDescription(
+        key="over_voltage_count",
+        state_class=SensorStateClass.MEASUREMENT,
+        name="Over-voltage count",
+        icon="mdi:flash-alert",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        has_entity_name=True,
+    ),
+    "neutral_current": SensorEntityDescription(
+        key="neutral_current",
         device_class=SensorDeviceClass.CURRENT,
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-        name="Current L2",
+        name="Neutral current estimate",
         icon="mdi:current-ac",
-        entity_category=None,
+        entity_category=EntityCategory.DIAGNOSTIC,
         has_entity_name=True,
     ),
-    "CurrentL3": SensorEntityDescription(
-        key="currentl3",
+    "neutral_current_average": SensorEntityDescription(
+        key="neutral_current_average",
         device_class=SensorDeviceClass.CURRENT,
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-        name="Current L3",
+        name="Neutral current estimate average",
         icon="mdi:current-ac",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        has_entity_name=True,
+    ),
+    "load_share_l1": SensorEntityDescription(
+        key="load_share_l1",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        name="Load share L1",
+        icon="mdi:chart-pie",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        has_entity_name=True,
+    ),
+    "load_share_l2": SensorEntityDescription(
+        key="load_share_l2",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        name="Load share L2",
+        icon="mdi:chart-pie",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        has_entity_name=True,
+    ),
+    "load_share_l3": SensorEntityDescription(
+        key="load_share_l3",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        name="Load share L3",
+        icon="mdi:chart-pie",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        has_entity_name=True,
+    ),
+}
+
+
+DEFAULT_SENSOR = SensorEntityDescription(
+    key="_",
+    state_class=SensorStateClass.MEASUREMENT,
+    entity_category=EntityCategory.DIAGNOSTIC,
+)
+
+# The daily and monthly totals are reset in place, so they are not used
+# for long-term statistics.
+COST_SENSOR_DESCRIPTIONS = {
+    "current_import_price": SensorEntityDescription(
+        key="current_import_price",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=f"{CURRENCY_EURO}/{UnitOfEnergy.KILO_WATT_HOUR}",
+        name="Current import price",
+        icon="mdi:cash-clock",
+        entity_category=None,
+        has_entity_name=True,
+    ),
+    "import_cost_today": SensorEntityDescription(
+        key="import_cost_today",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement=CURRENCY_EURO,
+        name="Import cost today",
+        icon="mdi:cash-minus",
+        entity_category=None,
+        has_entity_name=True,
+    ),
+    "import_cost_month": SensorEntityDescription(
+        key="import_cost_month",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement=CURRENCY_EURO,
+        name="Import cost this month",
+        icon="mdi:cash-minus",
+        entity_category=None,
+        has_entity_name=True,
+    ),
+    "export_revenue_today": SensorEntityDescription(
+        key="export_revenue_today",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement=CURRENCY_EURO,
+        name="Export revenue today",
+        icon="mdi:cash-plus",
+        entity_category=None,
+        has_entity_name=True,
+    ),
+    "export_revenue_month": SensorEntityDescription(
+        key="export_revenue_month",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement=CURRENCY_EURO,
+        name="Export revenue this month",
+        icon="mdi:cash-plus",
         entity_category=None,
         has_entity_name=True,
     ),
-    "RealPowerIn": SensorEntityDescription(
-        key="realpowerin",
+}
+
+# Baselines of the anomaly detection, learned per hour of the day.
+ANOMALY_SENSOR_DESCRIPTIONS = {
+    "consumption_baseline": SensorEntityDescription(
+        key="consumption_baseline",
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=UnitOfPower.WATT,
-        name="Real power in",
-        icon="mdi:transmission-tower-export",
-        entity_category=None,
+        name="Consumption baseline",
+        icon="mdi:chart-bell-curve",
+        entity_category=EntityCategory.DIAGNOSTIC,
         has_entity_name=True,
     ),
-    "RealPowerOut": SensorEntityDescription(
-        key="realpowerout",
+    "base_load": SensorEntityDescription(
+        key="base_load",
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=UnitOfPower.WATT,
-        name="Real power out",
-        icon="mdi:transmission-tower-import",
-        entity_category=None,
+        name="Base load",
+        icon="mdi:chart-bell-curve",
+        entity_category=EntityCategory.DIAGNOSTIC,
         has_entity_name=True,
     ),
-    "RealPowerDelta": SensorEntityDescription(
-        key="realpowerdelta",
+}
+
+# Values of the surplus controller, updated with every telegram.
+SURPLUS_SENSOR_DESCRIPTIONS = {
+    "surplus_power": SensorEntityDescription(
+        key="surplus_power",
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=UnitOfPower.WATT,
-        name="Real power delta",
-        icon="mdi:transmission-tower",
+        name="Surplus power",
+        icon="mdi:solar-power-variant",
         entity_category=None,
         has_entity_name=True,
     ),
-    "RealEnergyIn": SensorEntityDescription(
-        key="realenergyin",
-        device_class=SensorDeviceClass.ENERGY,
-        state_class=SensorStateClass.TOTAL_INCREASING,
-        native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
-        name="Real energy in",
-        icon="mdi:transmission-tower-export",
+    "surplus_setpoint": SensorEntityDescription(
+        key="surplus_setpoint",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        name="Surplus setpoint",
+        icon="mdi:ev-station",
         entity_category=None,
         has_entity_name=True,
     ),
-    "RealEnergyOut": SensorEntityDescription(
-        key="realenergyout",
-        device_class=SensorDeviceClass.ENERGY,
-        state_class=SensorStateClass.TOTAL_INCREASING,
-        native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
-        name="Real energy out",
-        icon="mdi:transmission-tower-import",
+}
+
+ANOMALY_BINARY_SENSOR_DESCRIPTIONS = {
+    "consumption_anomaly": BinarySensorEntityDescription(
+        key="consumption_anomaly",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        name="Consumption anomaly",
+        icon="mdi:home-lightning-bolt",
         entity_category=None,
         has_entity_name=True,
     ),
-    "ReactiveEnergyIn": SensorEntityDescription(
-        key="reactiveenergyin",
-        # device_class=SensorDeviceClass.ENERGY,
-        state_class=SensorStateClass.TOTAL_INCREASING,
-        native_unit_of_measurement="varh",  # UnitOfEnergy.WATT_HOUR
-        name="Reactive energy in",
-        icon="mdi:transmission-tower-export",
+    "standby_anomaly": BinarySensorEntityDescription(
+        key="standby_anomaly",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        name="Standby load at night",
+        icon="mdi:power-sleep",
         entity_category=None,
         has_entity_name=True,
     ),
-    "ReactiveEnergyOut": SensorEntityDescription(
-        key="reactiveenergyout",
-        # device_class=SensorDeviceClass.ENERGY,
-        state_class=SensorStateClass.TOTAL_INCREASING,
-        native_unit_of_measurement="varh",  # UnitOfEnergy.WATT_HOUR
-        name="Reactive energy out",
-        icon="mdi:transmission-tower-import",
+    "base_load_jump": BinarySensorEntityDescription(
+        key="base_load_jump",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        name="Base load jump",
+        icon="mdi:stairs-up",
         entity_category=None,
         has_entity_name=True,
     ),
 }
-
-
-DEFAULT_SENSOR = SensorEntityDescription(
-    key="_",
-    state_class=SensorStateClass.MEASUREMENT,
-    entity_category=EntityCategory.DIAGNOSTIC,
-)
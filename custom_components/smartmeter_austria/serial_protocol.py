@@ -0,0 +1,193 @@
+"""Reads a smart meter on a local serial port on the event loop.
+
+The event loop watches the port, the received chunks are assembled to
+telegrams by the protocol and a read waits for the next telegram without
+blocking a thread. This module must not import Home Assistant.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+
+import serial
+from smartmeter_austria_energy.supplier import Supplier
+
+from .executor import ReadExecutor
+from .multiplexer import SERIAL_BAUDRATE
+from .network import READ_TIMEOUT, StreamSmartmeter, TelegramProtocol
+
+_LOGGER = logging.getLogger(__name__)
+
+# Poll interval in seconds of ports which have no file descriptor
+POLL_INTERVAL = 0.05
+
+
+def supports_event_loop_reads() -> bool:
+    """Check the serial ports can be read on the event loop of this platform.
+
+    The proactor event loop of Windows cannot watch serial ports, the
+    blocking read of the library is used there.
+    """
+    return sys.platform != "win32"
+
+
+class SerialTransport(asyncio.ReadTransport):
+    """Passes the bytes received on a serial port to a protocol.
+
+    The file descriptor of the port is watched by the event loop. Ports
+    without a file descriptor are polled.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        protocol: asyncio.Protocol,
+        serial_instance: serial.Serial,
+    ) -> None:
+        """Initialize."""
+        super().__init__(extra={"serial": serial_instance})
+        self._loop = loop
+        self._protocol = protocol
+        self._serial = serial_instance
+        self._closing = False
+        self._fileno: int | None = None
+        self._poll_handle: asyncio.TimerHandle | None = None
+
+        protocol.connection_made(self)
+        try:
+            fileno = serial_instance.fileno()
+            loop.add_reader(fileno, self._read_ready)
+        except (AttributeError, NotImplementedError, OSError):
+            self._poll()
+        else:
+            self._fileno = fileno
+
+    @property
+    def serial(self) -> serial.Serial:
+        """Gets the serial port."""
+        return self._serial
+
+    def is_closing(self) -> bool:
+        """Return if the transport is closing or closed."""
+        return self._closing
+
+    def close(self) -> None:
+        """Stop reading and close the port, the protocol is told on the next loop run."""
+        self._close(None)
+
+    def _read_ready(self) -> None:
+        """Read the received bytes without waiting."""
+        try:
+            data = self._serial.read(max(1, self._serial.in_waiting))
+        except serial.SerialException as exception:
+            # E.g. the USB adapter was unplugged.
+            self._close(exception)
+            return
+        if data:
+            self._protocol.data_received(data)
+
+    def _poll(self) -> None:
+        """Read the received bytes of a port without a file descriptor."""
+        self._poll_handle = None
+        try:
+            waiting = self._serial.in_waiting
+        except serial.SerialException as exception:
+            self._close(exception)
+            return
+        if waiting:
+            self._read_ready()
+        if not self._closing:
+            self._poll_handle = self._loop.call_later(POLL_INTERVAL, self._poll)
+
+    def _close(self, exception: Exception | None) -> None:
+        """Close the port and tell the protocol."""
+        if self._closing:
+            return
+        self._closing = True
+        if self._fileno is not None:
+            self._loop.remove_reader(self._fileno)
+            self._fileno = None
+        if self._poll_handle is not None:
+            self._poll_handle.cancel()
+            self._poll_handle = None
+        try:
+            self._serial.close()
+        except serial.SerialException:
+            _LOGGER.debug("Closing port '%s' failed.", self._serial.port)
+        self._loop.call_soon(self._protocol.connection_lost, exception)
+
+
+class SerialSmartmeter(StreamSmartmeter):
+    """Reads the telegrams of a meter from a local serial port.
+
+    The port is opened with the first read and stays open, the bytes are
+    received on the event loop in the meantime. Unloading cancels a read
+    right away, no thread has to finish a blocking read. The open runs in
+    the read executor, so a hanging port does not take a thread of the
+    executor shared by all integrations.
+    """
+
+    def __init__(
+        self,
+        supplier: Supplier,
+        port: str,
+        key_hex: str,
+        read_timeout: float = READ_TIMEOUT,
+        executor: ReadExecutor | None = None,
+    ) -> None:
+        """Initialize."""
+        super().__init__(supplier, port, key_hex, read_timeout)
+        self._executor = executor
+
+    def rebind(self, port: str) -> None:
+        """Read from another port from the next read on, e.g. after the adapter was enumerated again."""
+        self.close()
+        self._port = port
+
+    async def _async_connect(self) -> None:
+        """Open the port, the open itself can block and runs in the read executor.
+
+        Without a read executor, the default executor of the loop is used.
+        """
+        self.close()
+        loop = asyncio.get_running_loop()
+        self._reader.reset()
+
+        opening: asyncio.Future[serial.Serial]
+        if self._executor is not None:
+            opening = loop.create_task(self._executor.async_run(self._open_serial))
+        else:
+            opening = loop.run_in_executor(None, self._open_serial)
+        try:
+            serial_instance = await asyncio.shield(opening)
+        except asyncio.CancelledError:
+            # The port is closed once it is open.
+            opening.add_done_callback(_close_opened_serial)
+            raise
+
+        protocol = TelegramProtocol(self._reader)
+        SerialTransport(loop, protocol, serial_instance)
+        self._protocol = protocol
+        _LOGGER.debug("Opened '%s'", self._port)
+
+    def _open_serial(self) -> serial.Serial:
+        """Open the port, reads return the received bytes without waiting."""
+        return serial.Serial(
+            port=self._port,
+            baudrate=SERIAL_BAUDRATE,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            bytesize=serial.EIGHTBITS,
+            timeout=0,
+        )
+
+
+def _close_opened_serial(opening: asyncio.Future[serial.Serial]) -> None:
+    """Close a port whose read was cancelled while it was opened."""
+    if opening.cancelled() or opening.exception() is not None:
+        return
+    try:
+        opening.result().close()
+    except serial.SerialException:
+        _LOGGER.debug("Closing a port which was opened too late failed.")
@@ -0,0 +1,68 @@
+"""Services of the Smart Meter Austria integration."""
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+from .profiler import PROFILE_CYCLES, UpdateProfiler
+
+SERVICE_PROFILE = "profile"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_CYCLES = "cycles"
+ATTR_MEMORY = "memory"
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CYCLES, default=PROFILE_CYCLES): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional(ATTR_MEMORY, default=True): cv.boolean,
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services, they are shared by all entries."""
+
+    async def _async_profile(call: ServiceCall) -> None:
+        """Profile the next update cycles of a meter."""
+        entry = hass.config_entries.async_get_entry(call.data[ATTR_CONFIG_ENTRY_ID])
+        if (
+            entry is None
+            or entry.domain != DOMAIN
+            or entry.state is not ConfigEntryState.LOADED
+        ):
+            raise ServiceValidationError(
+                f"'{call.data[ATTR_CONFIG_ENTRY_ID]}' is no loaded smart meter."
+            )
+
+        # cProfile allows one active profiler per thread only.
+        if any(
+            other.runtime_data.coordinator.profiler is not None
+            for other in hass.config_entries.async_entries(DOMAIN)
+            if other.state is ConfigEntryState.LOADED
+        ):
+            raise HomeAssistantError("A profile of a smart meter is already running.")
+
+        data = entry.runtime_data
+        timestamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+        data.coordinator.profiler = UpdateProfiler(
+            hass.config.path(
+                f"{DOMAIN}_profile_{data.device_number}_{timestamp}.txt"
+            ),
+            call.data[ATTR_CYCLES],
+            call.data[ATTR_MEMORY],
+        )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, _async_profile, schema=PROFILE_SCHEMA
+    )
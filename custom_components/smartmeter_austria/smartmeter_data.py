@@ -1,27 +1,43 @@
 """Defines a config entry data class."""
+from collections.abc import Mapping
 from dataclasses import dataclass
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity import DeviceInfo
 
-from .coordinator import SmartmeterDataCoordinator
+from .coordinator import AggregateCoordinator, SmartmeterDataCoordinator
 
 
 @dataclass
 class SmartMeterData:
     """Defines smart meter Austria data class."""
 
-    def __init__(self, coordinator: SmartmeterDataCoordinator, device_info: DeviceInfo, device_number: str) -> None:
+    def __init__(
+        self,
+        coordinator: SmartmeterDataCoordinator,
+        device_info: DeviceInfo,
+        device_number: str,
+        options: Mapping[str, Any] | None = None,
+        aggregate_coordinator: AggregateCoordinator | None = None,
+    ) -> None:
         """Initialize."""
         self._coordinator = coordinator
+        self._aggregate_coordinator = aggregate_coordinator
         self._device_info = device_info
         self._device_number = device_number
+        self._options = dict(options or {})
 
     @property
     def coordinator(self) -> str:
         """Gets the coordinator."""
         return self._coordinator
 
+    @property
+    def aggregate_coordinator(self) -> AggregateCoordinator | None:
+        """Gets the coordinator of the building totals, if the entry shows them."""
+        return self._aggregate_coordinator
+
     @property
     def device_info(self) -> str:
         """Gets the device info."""
@@ -32,6 +48,16 @@ class SmartMeterData:
         """Gets the device number."""
         return self._device_number
 
+    @property
+    def options(self) -> dict[str, Any]:
+        """Gets the options the running entry was set up with."""
+        return self._options
+
+    @options.setter
+    def options(self, options: Mapping[str, Any]) -> None:
+        """Set the options which were applied to the running entry."""
+        self._options = dict(options)
+
 
 # The type alias needs to be suffixed with 'ConfigEntry'
 type SmartMeterConfigEntry = ConfigEntry[SmartMeterData]
@@ -0,0 +1,81 @@
+"""Keeps the state of the pipeline stages of a meter over restarts and reloads."""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .pipeline import PersistentStage, TelegramPipeline
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Seconds the state is written after a telegram, at most once in this time.
+SAVE_DELAY = 300
+
+
+def _async_create_store(
+    hass: HomeAssistant, entry_id: str
+) -> Store[dict[str, dict[str, Any]]]:
+    """Create the store of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+
+async def async_remove_pipeline_state(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the stored state of a config entry, e.g. when the entry is removed."""
+    await _async_create_store(hass, entry_id).async_remove()
+
+
+class PipelineStore:
+    """Stores the state of the persistent stages, keyed by the config entry.
+
+    The stages are stored by their class name. A stage which is added later,
+    e.g. by an option, starts without a state.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, entry_id: str, pipeline: TelegramPipeline
+    ) -> None:
+        """Initialize."""
+        self._store = _async_create_store(hass, entry_id)
+        self._pipeline = pipeline
+        self._save_scheduled = False
+
+    async def async_restore(self) -> None:
+        """Restore the stored state of the stages."""
+        data = await self._store.async_load() or {}
+        for stage in self._stages():
+            if (state := data.get(type(stage).__name__)) is None:
+                continue
+            try:
+                stage.restore(state)
+            except (KeyError, TypeError, ValueError) as exception:
+                _LOGGER.warning(
+                    "State of %s cannot be restored. %s", type(stage).__name__, exception)
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Write the state after the save delay, unless a write is scheduled already."""
+        if not self._save_scheduled:
+            self._save_scheduled = True
+            self._store.async_delay_save(self._data, SAVE_DELAY)
+
+    async def async_save(self) -> None:
+        """Write the state right away, e.g. when the entry is unloaded."""
+        await self._store.async_save(self._data())
+
+    def _stages(self) -> list[PersistentStage]:
+        """Get the stages whose state is kept."""
+        return [
+            stage for stage in self._pipeline.stages
+            if isinstance(stage, PersistentStage)
+        ]
+
+    def _data(self) -> dict[str, dict[str, Any]]:
+        """Get the state of the stages."""
+        self._save_scheduled = False
+        return {type(stage).__name__: stage.as_state() for stage in self._stages()}
@@ -0,0 +1,118 @@
+"""Solar surplus calculation for the surplus charging of EVs and heat pumps.
+
+The values are calculated for every telegram, so a consumer can follow the
+surplus at the rate of the meter. This module must not import Home Assistant.
+"""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+from datetime import datetime
+import statistics
+
+from smartmeter_austria_energy.obisdata import ObisData
+
+SURPLUS_FILTER_NONE = "none"
+SURPLUS_FILTER_EMA = "ema"
+SURPLUS_FILTER_MEDIAN = "median"
+SURPLUS_FILTERS = (SURPLUS_FILTER_NONE, SURPLUS_FILTER_EMA, SURPLUS_FILTER_MEDIAN)
+
+# Number of telegrams which are smoothed
+SURPLUS_WINDOW = 6
+
+# Change of the setpoint in W per second
+SURPLUS_RAMP_RATE = 100.0
+
+# Upper limit of the setpoint in W, 3 phases at 16 A
+SURPLUS_MAX_POWER = 11000.0
+
+SURPLUS_POWER = "surplus_power"
+SURPLUS_SETPOINT = "surplus_setpoint"
+
+# Sent with every published telegram, consumers follow them without Home Assistant.
+SURPLUS_VALUES = (SURPLUS_POWER, SURPLUS_SETPOINT)
+
+
+class SurplusController:
+    """Smooths the grid export and ramps a setpoint for a flexible consumer.
+
+    The consumer is expected to draw the setpoint, as its power is part of
+    the measured flow. The setpoint is raised by the smoothed surplus and
+    lowered by the smoothed import, but not faster than the ramp rate.
+    The ramp follows the times of the telegrams, so the telegrams of a
+    catch-up batch move the setpoint one push period apart.
+    """
+
+    def __init__(
+        self,
+        surplus_filter: str = SURPLUS_FILTER_EMA,
+        window: int = SURPLUS_WINDOW,
+        ramp_rate: float = SURPLUS_RAMP_RATE,
+        max_power: float = SURPLUS_MAX_POWER,
+        now: Callable[[], datetime] = lambda: datetime.now().astimezone(),
+    ) -> None:
+        """Initialize."""
+        self._now = now
+        self._window: deque[float] = deque(maxlen=max(window, 1))
+        self._average: float | None = None
+        self._setpoint = 0.0
+        self._last_update: datetime | None = None
+        self.configure(surplus_filter, window, ramp_rate, max_power)
+
+    def configure(
+        self,
+        surplus_filter: str = SURPLUS_FILTER_EMA,
+        window: int = SURPLUS_WINDOW,
+        ramp_rate: float = SURPLUS_RAMP_RATE,
+        max_power: float = SURPLUS_MAX_POWER,
+    ) -> None:
+        """Use new parameters from now on, the setpoint is kept.
+
+        Raises ValueError if the filter is not known.
+        """
+        if surplus_filter not in SURPLUS_FILTERS:
+            raise ValueError(f"'{surplus_filter}' is no valid surplus filter.")
+        window = max(window, 1)
+        self._filter = surplus_filter
+        self._alpha = 2 / (window + 1)
+        self._ramp_rate = ramp_rate
+        self._max_power = max_power
+        if self._window.maxlen != window:
+            self._window = deque(self._window, maxlen=window)
+
+    def update(self, obisdata: ObisData) -> dict[str, float | None]:
+        """Add the grid flow of a telegram and move the setpoint."""
+        # Positive values are exported to the grid.
+        flow = obisdata.RealPowerOut.value - obisdata.RealPowerIn.value
+        surplus = self._smooth(flow)
+
+        moment = self._now()
+        elapsed = (
+            0.0
+            if self._last_update is None
+            else max((moment - self._last_update).total_seconds(), 0.0)
+        )
+        self._last_update = moment
+
+        target = min(max(self._setpoint + surplus, 0.0), self._max_power)
+        step = self._ramp_rate * elapsed
+        self._setpoint = min(max(target, self._setpoint - step), self._setpoint + step)
+
+        return {
+            SURPLUS_POWER: round(surplus, 1),
+            SURPLUS_SETPOINT: round(self._setpoint, 1),
+        }
+
+    def _smooth(self, flow: float) -> float:
+        """Filter the grid flow with the configured filter."""
+        self._window.append(flow)
+        self._average = (
+            flow
+            if self._average is None
+            else self._average + self._alpha * (flow - self._average)
+        )
+        if self._filter == SURPLUS_FILTER_MEDIAN:
+            return statistics.median(self._window)
+        if self._filter == SURPLUS_FILTER_EMA:
+            return self._average
+        return flow
@@ -0,0 +1,268 @@
+"""Time-of-use tariff and the energy costs calculated from the telegrams.
+
+This module must not import Home Assistant, it is used by the headless reader too.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.obisvalue import ObisValueFloat
+
+# Prices are looked up in 15 minute slots, like the dynamic tariffs.
+SLOT_MINUTES = 15
+SLOT_SECONDS = SLOT_MINUTES * 60
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# A dynamic price is valid until the next price, but not longer.
+MAX_DYNAMIC_PRICE_DURATION = timedelta(hours=24)
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+CURRENT_IMPORT_PRICE = "current_import_price"
+IMPORT_COST_TODAY = "import_cost_today"
+IMPORT_COST_MONTH = "import_cost_month"
+EXPORT_REVENUE_TODAY = "export_revenue_today"
+EXPORT_REVENUE_MONTH = "export_revenue_month"
+
+DAILY_TOTALS = (IMPORT_COST_TODAY, EXPORT_REVENUE_TODAY)
+MONTHLY_TOTALS = (IMPORT_COST_MONTH, EXPORT_REVENUE_MONTH)
+
+
+def parse_peak_hours(peak_hours: str) -> list[tuple[frozenset[int], int, int]]:
+    """Parse peak hours like 'mon-fri 06:00-22:00; sat 08:00-12:00'.
+
+    The days are optional, a period without days is valid on all days.
+    A period which ends before it starts, like '22:00-06:00', runs past
+    midnight into the next day.
+    Returns the weekdays, the start and the end minute of every period.
+    Raises ValueError if the peak hours are not valid.
+    """
+    periods: list[tuple[frozenset[int], int, int]] = []
+    for period in peak_hours.split(";"):
+        if not (period := period.strip().lower()):
+            continue
+
+        days_text, _, hours_text = period.rpartition(" ")
+        weekdays = _parse_weekdays(days_text.strip()) if days_text else frozenset(range(7))
+
+        start_text, separator, end_text = hours_text.partition("-")
+        if not separator:
+            raise ValueError(f"'{period}' has no time range.")
+        start = _parse_minute(start_text)
+        end = _parse_minute(end_text)
+        if start == end:
+            raise ValueError(f"'{period}' ends when it starts.")
+
+        periods.append((weekdays, start, end))
+    return periods
+
+
+def _parse_weekdays(days_text: str) -> frozenset[int]:
+    """Parse days like 'mon-fri' or 'sat,sun'."""
+    weekdays: set[int] = set()
+    for days in days_text.split(","):
+        first, _, last = days.strip().partition("-")
+        if first not in WEEKDAYS or (last and last not in WEEKDAYS):
+            raise ValueError(f"'{days}' are no valid days.")
+        first_day = WEEKDAYS.index(first)
+        last_day = WEEKDAYS.index(last) if last else first_day
+        if last_day < first_day:
+            raise ValueError(f"'{days}' ends before it starts.")
+        weekdays.update(range(first_day, last_day + 1))
+    return frozenset(weekdays)
+
+
+def _parse_minute(time_text: str) -> int:
+    """Parse a time 'HH:MM' into the minute of the day, '24:00' is the end of the day."""
+    hours, separator, minutes = time_text.strip().partition(":")
+    if not separator:
+        raise ValueError(f"'{time_text}' is no valid time.")
+    minute = int(hours) * 60 + int(minutes)
+    if not 0 <= minute <= 24 * 60 or not 0 <= int(minutes) < 60:
+        raise ValueError(f"'{time_text}' is no valid time.")
+    return minute
+
+
+def load_dynamic_prices(path: str) -> dict[int, float]:
+    """Load a price series from a CSV file with the columns start and price.
+
+    The columns are separated by ',' or ';'. The start is an ISO 8601 time
+    with time zone, the price is per kWh. Every price is valid until the
+    next start. Returns the prices per slot.
+    Raises OSError or ValueError if the file cannot be read.
+    """
+    prices: list[tuple[datetime, float]] = []
+    with open(path, encoding="utf-8") as price_file:
+        for line in price_file:
+            line = line.strip()
+            if not line or line.startswith("#") or line.startswith("start"):
+                continue
+            start_text, _, price_text = line.replace(";", ",").partition(",")
+            start = datetime.fromisoformat(start_text.strip())
+            if start.tzinfo is None:
+                raise ValueError(f"'{start_text}' has no time zone.")
+            prices.append((start, float(price_text)))
+
+    prices.sort()
+    slots: dict[int, float] = {}
+    for index, (start, price) in enumerate(prices):
+        end = start + MAX_DYNAMIC_PRICE_DURATION
+        if index + 1 < len(prices):
+            end = min(end, prices[index + 1][0])
+        for slot in range(
+            _slot(start), _slot(end - timedelta(microseconds=1)) + 1
+        ):
+            slots[slot] = price
+    return slots
+
+
+def _slot(moment: datetime) -> int:
+    """Get the number of the 15 minute slot since the epoch."""
+    return int(moment.timestamp()) // SLOT_SECONDS
+
+
+class TariffSchedule:
+    """Looks up the import price of a moment in a precomputed weekly table."""
+
+    def __init__(
+        self,
+        price: float,
+        peak_price: float | None = None,
+        peak_hours: str = "",
+        dynamic_prices: dict[int, float] | None = None,
+    ) -> None:
+        """Initialize."""
+        self._table = [price] * (7 * SLOTS_PER_DAY)
+        if peak_price is not None:
+            for weekdays, start, end in parse_peak_hours(peak_hours):
+                for weekday in weekdays:
+                    first = weekday * SLOTS_PER_DAY + start // SLOT_MINUTES
+                    last = weekday * SLOTS_PER_DAY + -(-end // SLOT_MINUTES)
+                    if end < start:
+                        # The period runs into the next day, Sunday into Monday.
+                        last += SLOTS_PER_DAY
+                    for slot in range(first, last):
+                        self._table[slot % len(self._table)] = peak_price
+        self._dynamic_prices = dynamic_prices or {}
+
+    def price(self, moment: datetime) -> float:
+        """Get the price per kWh of a moment (local time)."""
+        if self._dynamic_prices and (
+            dynamic_price := self._dynamic_prices.get(_slot(moment))
+        ) is not None:
+            return dynamic_price
+        return self._table[
+            moment.weekday() * SLOTS_PER_DAY
+            + (moment.hour * 60 + moment.minute) // SLOT_MINUTES
+        ]
+
+
+class CostCalculator:
+    """Calculates the import costs and export revenues of the energy deltas.
+
+    The totals and the last energy counters are kept over restarts with
+    as_state() and restore(), so the energy while the integration was not
+    running is counted at the price of the first telegram.
+    """
+
+    def __init__(
+        self,
+        schedule: TariffSchedule,
+        export_price: float = 0.0,
+        now: Callable[[], datetime] = lambda: datetime.now().astimezone(),
+    ) -> None:
+        """Initialize."""
+        self._schedule = schedule
+        self._export_price = export_price
+        self._now = now
+        self._energy_in: float | None = None
+        self._energy_out: float | None = None
+        self._day: tuple[int, int, int] | None = None
+        self._month: tuple[int, int] | None = None
+        self._import_cost_today = 0.0
+        self._import_cost_month = 0.0
+        self._export_revenue_today = 0.0
+        self._export_revenue_month = 0.0
+
+    def set_tariff(self, schedule: TariffSchedule, export_price: float = 0.0) -> None:
+        """Use new prices from now on, the totals are kept."""
+        self._schedule = schedule
+        self._export_price = export_price
+
+    def as_state(self) -> dict[str, Any]:
+        """Return the totals, which can be stored as JSON."""
+        return {
+            "day": self._day,
+            "month": self._month,
+            "energy_in": self._energy_in,
+            "energy_out": self._energy_out,
+            "import_cost_today": self._import_cost_today,
+            "import_cost_month": self._import_cost_month,
+            "export_revenue_today": self._export_revenue_today,
+            "export_revenue_month": self._export_revenue_month,
+        }
+
+    def restore(self, state: dict[str, Any]) -> None:
+        """Continue the totals of a stored state, the next telegram resets outdated totals."""
+        self._day = tuple(state["day"]) if state.get("day") else None
+        self._month = tuple(state["month"]) if state.get("month") else None
+        energy_in = state.get("energy_in")
+        energy_out = state.get("energy_out")
+        self._energy_in = None if energy_in is None else float(energy_in)
+        self._energy_out = None if energy_out is None else float(energy_out)
+        self._import_cost_today = state.get("import_cost_today", 0.0)
+        self._import_cost_month = state.get("import_cost_month", 0.0)
+        self._export_revenue_today = state.get("export_revenue_today", 0.0)
+        self._export_revenue_month = state.get("export_revenue_month", 0.0)
+
+    def last_reset(self, key: str) -> datetime | None:
+        """Get the start of the day or the month of a total, None for other values."""
+        tzinfo = self._now().tzinfo
+        if key in DAILY_TOTALS and self._day is not None:
+            return datetime(*self._day, tzinfo=tzinfo)
+        if key in MONTHLY_TOTALS and self._month is not None:
+            return datetime(*self._month, 1, tzinfo=tzinfo)
+        return None
+
+    def update(self, obisdata: ObisData) -> dict[str, float | None]:
+        """Add the energy since the last telegram at the price of this moment."""
+        moment = self._now()
+        if self._month != (moment.year, moment.month):
+            self._month = (moment.year, moment.month)
+            self._import_cost_month = 0.0
+            self._export_revenue_month = 0.0
+        if self._day != (moment.year, moment.month, moment.day):
+            self._day = (moment.year, moment.month, moment.day)
+            self._import_cost_today = 0.0
+            self._export_revenue_today = 0.0
+
+        price = self._schedule.price(moment)
+
+        imported = _delta_kwh(self._energy_in, obisdata.RealEnergyIn)
+        self._energy_in = obisdata.RealEnergyIn.value
+        self._import_cost_today += imported * price
+        self._import_cost_month += imported * price
+
+        if (real_energy_out := getattr(obisdata, "RealEnergyOut", None)) is not None:
+            exported = _delta_kwh(self._energy_out, real_energy_out)
+            self._energy_out = real_energy_out.value
+            self._export_revenue_today += exported * self._export_price
+            self._export_revenue_month += exported * self._export_price
+
+        return {
+            CURRENT_IMPORT_PRICE: price,
+            IMPORT_COST_TODAY: round(self._import_cost_today, 4),
+            IMPORT_COST_MONTH: round(self._import_cost_month, 4),
+            EXPORT_REVENUE_TODAY: round(self._export_revenue_today, 4),
+            EXPORT_REVENUE_MONTH: round(self._export_revenue_month, 4),
+        }
+
+
+def _delta_kwh(last_energy: float | None, obis_value: ObisValueFloat) -> float:
+    """Get the energy since the last telegram in kWh, the counters are in Wh."""
+    if last_energy is None or obis_value.value < last_energy:
+        return 0.0
+    return (obis_value.value - last_energy) / 1000
@@ -0,0 +1,301 @@
+"""Splits the M-BUS byte stream of a smart meter into telegrams and decodes them."""
+from __future__ import annotations
+
+from collections import OrderedDict
+
+from smartmeter_austria_energy.decrypt import Decrypt
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.supplier import Supplier
+
+from .obis_registry import supplier_extra_fields
+
+MBUS_START_BYTE = 0x68
+MBUS_STOP_BYTE = 0x16
+
+# Every supplier sends a long first frame '68 FA FA 68' followed by a second
+# frame which finishes the telegram.
+FRAME1_LENGTH_FIELD = 0xFA
+
+SYSTEM_TITLE_START_BYTE = 11
+SYSTEM_TITLE_LENGTH = 8
+
+# A long frame has at most 255 data bytes, framed by 4 header and 2 trailer bytes.
+MAX_FRAME_LENGTH = 0xFF + 6
+
+# Size of the preallocated receive buffer of a reader.
+RECEIVE_BUFFER_SIZE = 2048
+
+# Number of decoded telegrams kept by the decode cache.
+DECODE_CACHE_SIZE = 8
+
+# Number of received telegrams kept until the next read, about 2.5 minutes
+# of telegrams at a push period of 5 s.
+TELEGRAM_BACKLOG = 32
+
+
+class Telegram:
+    """Defines a telegram, which consists of two M-BUS long frames."""
+
+    def __init__(self, frame1: bytes, frame2: bytes) -> None:
+        """Initialize."""
+        self._frame1 = frame1
+        self._frame2 = frame2
+
+    @property
+    def frame1(self) -> bytes:
+        """Gets the first frame."""
+        return self._frame1
+
+    @property
+    def frame2(self) -> bytes:
+        """Gets the second frame."""
+        return self._frame2
+
+    @property
+    def system_title(self) -> bytes:
+        """Gets the system title, which identifies the sending meter."""
+        return self._frame1[
+            SYSTEM_TITLE_START_BYTE : SYSTEM_TITLE_START_BYTE + SYSTEM_TITLE_LENGTH
+        ]
+
+
+class TelegramReader:
+    """Assembles telegrams from chunks of the serial byte stream.
+
+    The frames are checked before they are decrypted: the length fields,
+    the start and stop bytes and the checksum. Bytes which do not belong
+    to a valid long frame are skipped and counted, so the reader resyncs
+    to the next frame right away after garbage on the line.
+
+    The bytes are received into a preallocated buffer and parsed in place,
+    a frame is copied once when it is complete.
+    """
+
+    def __init__(self, size: int = RECEIVE_BUFFER_SIZE) -> None:
+        """Initialize."""
+        self._buffer = bytearray(max(size, 2 * MAX_FRAME_LENGTH))
+        self._view = memoryview(self._buffer)
+        # The received bytes which are not parsed yet are _buffer[_start:_end].
+        self._start: int = 0
+        self._end: int = 0
+        self._frame1: bytes | None = None
+        self._telegrams: int = 0
+        self._skipped_bytes: int = 0
+        self._bad_checksums: int = 0
+        self._orphaned_frames: int = 0
+
+    @property
+    def telegrams(self) -> int:
+        """Gets the number of assembled telegrams."""
+        return self._telegrams
+
+    @property
+    def skipped_bytes(self) -> int:
+        """Gets the number of bytes which did not belong to a valid frame."""
+        return self._skipped_bytes
+
+    @property
+    def bad_checksums(self) -> int:
+        """Gets the number of frames which were dropped due to a wrong checksum."""
+        return self._bad_checksums
+
+    @property
+    def orphaned_frames(self) -> int:
+        """Gets the number of frames which were dropped without their partner frame."""
+        return self._orphaned_frames
+
+    def feed(self, data: bytes) -> list[Telegram]:
+        """Add received bytes and return all telegrams completed by them."""
+        telegrams: list[Telegram] = []
+        received = data
+        while received:
+            free = self._make_room()
+            if len(received) <= free:
+                count = len(received)
+                self._buffer[self._end : self._end + count] = received
+            else:
+                # Chunks larger than the buffer are added in parts, without copies.
+                if not isinstance(received, memoryview):
+                    received = memoryview(received)
+                count = free
+                self._view[self._end : self._end + count] = received[:count]
+            self._end += count
+            received = received[count:]
+
+            while (frame := self._next_frame()) is not None:
+                if frame[1] == FRAME1_LENGTH_FIELD:
+                    if self._frame1 is not None:
+                        self._orphaned_frames += 1
+                    self._frame1 = frame
+                elif self._frame1 is not None:
+                    telegrams.append(Telegram(self._frame1, frame))
+                    self._frame1 = None
+                else:
+                    self._orphaned_frames += 1
+
+        self._telegrams += len(telegrams)
+        return telegrams
+
+    def reset(self) -> None:
+        """Drop all buffered bytes, e.g. after the port was reopened."""
+        self._start = 0
+        self._end = 0
+        self._frame1 = None
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the statistics of the reader."""
+        return {
+            "telegrams": self._telegrams,
+            "skipped_bytes": self._skipped_bytes,
+            "bad_checksums": self._bad_checksums,
+            "orphaned_frames": self._orphaned_frames,
+        }
+
+    def _make_room(self) -> int:
+        """Get the free bytes at the end of the buffer.
+
+        The unparsed bytes, at most one incomplete frame, are moved to the
+        start of the buffer when its end is reached.
+        """
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._end == len(self._buffer):
+            pending = self._end - self._start
+            self._view[:pending] = self._view[self._start : self._end]
+            self._start, self._end = 0, pending
+        return len(self._buffer) - self._end
+
+    def _next_frame(self) -> bytes | None:
+        """Cut the next complete and valid long frame from the buffer."""
+        buffer = self._buffer
+        while True:
+            start = buffer.find(MBUS_START_BYTE, self._start, self._end)
+            if start < 0:
+                self._skipped_bytes += self._end - self._start
+                self._start = self._end
+                return None
+            self._skipped_bytes += start - self._start
+            self._start = start
+
+            available = self._end - start
+            if available < 4:
+                return None
+
+            # long frame: 68 L L 68 [L bytes] CS 16
+            length = buffer[start + 1]
+            if buffer[start + 2] != length or buffer[start + 3] != MBUS_START_BYTE:
+                self._skip_start_byte()
+                continue
+
+            frame_length = length + 6
+            if available < frame_length:
+                return None
+
+            end = start + frame_length
+            if buffer[end - 1] != MBUS_STOP_BYTE:
+                self._skip_start_byte()
+                continue
+
+            # The checksum is the sum of the L bytes modulo 256.
+            if sum(self._view[start + 4 : end - 2]) & 0xFF != buffer[end - 2]:
+                self._bad_checksums += 1
+                self._skip_start_byte()
+                continue
+
+            self._start = end
+            return bytes(self._view[start:end])
+
+    def _skip_start_byte(self) -> None:
+        """Drop a start byte which does not start a valid frame."""
+        self._start += 1
+        self._skipped_bytes += 1
+
+
+def decode_telegram(supplier: Supplier, telegram: Telegram, key_hex: str) -> ObisData:
+    """Decrypt and parse a telegram."""
+    dec = Decrypt(supplier, telegram.frame1, telegram.frame2, key_hex)
+    dec.parse_all()
+    obisdata = ObisData(dec, supplier.supplied_values)
+
+    # Supplied values which ObisData does not keep, e.g. the power factor
+    for obis_field in supplier_extra_fields(supplier):
+        setattr(obisdata, obis_field.sensor_id, dec.obis_values.get(obis_field.obis_bytes))
+    return obisdata
+
+
+class TelegramDecodeCache:
+    """Keeps the last decoded telegrams, so duplicates are not decrypted again.
+
+    The cache is keyed by the encrypted frames. A meter never reuses an
+    invocation counter, so equal frames always contain the same data.
+    """
+
+    def __init__(self, size: int = DECODE_CACHE_SIZE) -> None:
+        """Initialize."""
+        self._size = size
+        self._entries: OrderedDict[tuple[bytes, bytes], ObisData] = OrderedDict()
+        self._hits: int = 0
+        self._misses: int = 0
+        self._skipped: int = 0
+
+    @property
+    def hits(self) -> int:
+        """Gets the number of duplicate telegrams, which were not decoded again."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Gets the number of decoded telegrams."""
+        return self._misses
+
+    def decode(self, supplier: Supplier, telegram: Telegram, key_hex: str) -> ObisData:
+        """Decode the telegram, or return the already decoded data of a duplicate."""
+        key = (telegram.frame1, telegram.frame2)
+        if (obisdata := self._entries.get(key)) is not None:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return obisdata
+
+        obisdata = decode_telegram(supplier, telegram, key_hex)
+        self._misses += 1
+        self._entries[key] = obisdata
+        if len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+        return obisdata
+
+    def decode_batch(
+        self, supplier: Supplier, telegrams: list[Telegram], key_hex: str
+    ) -> list[ObisData]:
+        """Decode several telegrams in one pass, oldest first.
+
+        Corrupt telegrams are skipped and counted. Raises the error of the
+        last corrupt telegram if none of them can be decoded.
+        """
+        batch: list[ObisData] = []
+        error: Exception | None = None
+        skipped = 0
+        for telegram in telegrams:
+            try:
+                batch.append(self.decode(supplier, telegram, key_hex))
+            except Exception as exception:
+                error = exception
+                skipped += 1
+
+        if not batch and error is not None:
+            raise error
+        self._skipped += skipped
+        return batch
+
+    def pop_skipped(self) -> int:
+        """Take the number of corrupt telegrams skipped since the last call."""
+        skipped = self._skipped
+        self._skipped = 0
+        return skipped
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the statistics of the cache."""
+        return {
+            "size": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+        }
@@ -0,0 +1,197 @@
+"""Detects a meter without telegrams and finds its USB adapter again.
+
+A USB adapter which is enumerated again gets a new device path, e.g.
+/dev/ttyUSB0 becomes /dev/ttyUSB1. The adapter is found by its stable
+identifiers: the by-id link, VID and PID and the serial number. The
+functions which list the ports block and run in an executor. This module
+must not import Home Assistant.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+import os
+import time
+from typing import Any
+
+from serial.tools import list_ports
+from serial.tools.list_ports_common import ListPortInfo
+
+# The meters push a telegram every 5 s.
+PUSH_PERIOD = 5.0
+
+# Missed push periods after which the telegrams are stale
+STALE_FACTOR = 3
+
+# Minimum time between two scans of the ports in seconds
+RESCAN_INTERVAL = 10.0
+
+BY_ID_DIRECTORY = "/dev/serial/by-id/"
+
+
+@dataclass(frozen=True, slots=True)
+class PortIdentity:
+    """Defines the stable identifiers of an USB serial adapter."""
+
+    by_id: str | None = None
+    vid: int | None = None
+    pid: int | None = None
+    serial_number: str | None = None
+    # USB bus location, e.g. 1-1.2, which tells identical adapters apart.
+    location: str | None = None
+
+    @property
+    def is_usb(self) -> bool:
+        """Gets if the adapter can be found again by its identifiers."""
+        return self.by_id is not None or self.vid is not None
+
+
+def identify_port(
+    port: str, ports: Iterable[ListPortInfo] | None = None
+) -> PortIdentity | None:
+    """Get the identifiers of the adapter of a port, None if it is not present."""
+    if ports is None:
+        ports = list_ports.comports(include_links=True)
+
+    device = os.path.realpath(port)
+    info: ListPortInfo | None = None
+    by_id: str | None = None
+    for port_info in ports:
+        if os.path.realpath(port_info.device) != device:
+            continue
+        if port_info.device.startswith(BY_ID_DIRECTORY):
+            by_id = port_info.device
+        if info is None or port_info.device == device:
+            info = port_info
+
+    if info is None:
+        return None
+    return PortIdentity(
+        by_id, info.vid, info.pid, info.serial_number, info.location)
+
+
+def find_port(
+    identity: PortIdentity, ports: Iterable[ListPortInfo] | None = None
+) -> str | None:
+    """Get the current path of an adapter, None if it is not found for sure.
+
+    The by-id link is preferred, as it stays valid if the adapter is
+    enumerated again. Several adapters with the same VID, PID and serial
+    number are told apart by their USB bus location.
+    """
+    if identity.by_id is not None and os.path.exists(identity.by_id):
+        return identity.by_id
+    if identity.vid is None:
+        return None
+
+    if ports is None:
+        ports = list_ports.comports()
+
+    candidates = [
+        port_info
+        for port_info in ports
+        if not os.path.islink(port_info.device)
+        and (port_info.vid, port_info.pid, port_info.serial_number)
+        == (identity.vid, identity.pid, identity.serial_number)
+    ]
+    if len(candidates) > 1:
+        candidates = [
+            port_info
+            for port_info in candidates
+            if port_info.location == identity.location
+        ]
+    return candidates[0].device if len(candidates) == 1 else None
+
+
+class TelegramWatchdog:
+    """Tracks the age of the telegrams of a meter and the recoveries of its port.
+
+    The telegrams are stale if none was read for the update interval and
+    some missed push periods. The recovery time is the time from the
+    detection to the first telegram read on the new port.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        identity: PortIdentity,
+        push_period: float = PUSH_PERIOD,
+        stale_factor: int = STALE_FACTOR,
+        rescan_interval: float = RESCAN_INTERVAL,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize."""
+        self._port = port
+        self._identity = identity
+        self._push_period = push_period
+        self._stale_factor = stale_factor
+        self._rescan_interval = rescan_interval
+        self._monotonic = monotonic
+        self._last_telegram = monotonic()
+        self._last_scan: float | None = None
+        self._detected: float | None = None
+        self._rebound = False
+        self._recoveries: int = 0
+        self._recovery_time: float | None = None
+
+    @property
+    def port(self) -> str:
+        """Gets the port the meter is read from."""
+        return self._port
+
+    @property
+    def identity(self) -> PortIdentity:
+        """Gets the identifiers of the adapter."""
+        return self._identity
+
+    @property
+    def telegram_age(self) -> float:
+        """Gets the seconds since the last telegram."""
+        return self._monotonic() - self._last_telegram
+
+    @property
+    def recoveries(self) -> int:
+        """Gets the number of times the adapter was found on a new port."""
+        return self._recoveries
+
+    @property
+    def recovery_time(self) -> float | None:
+        """Gets the seconds of the last recovery, None if there was none."""
+        return self._recovery_time
+
+    def telegram_received(self) -> None:
+        """Note a read telegram, a pending recovery is finished."""
+        now = self._monotonic()
+        if self._rebound and self._detected is not None:
+            self._recoveries += 1
+            self._recovery_time = round(now - self._detected, 3)
+        self._last_telegram = now
+        self._detected = None
+        self._rebound = False
+
+    def rescan_due(self, update_interval: float) -> bool:
+        """Check the telegrams are stale and the ports were not scanned lately."""
+        now = self._monotonic()
+        threshold = update_interval + self._push_period * self._stale_factor
+        if now - self._last_telegram <= threshold:
+            return False
+        if self._detected is None:
+            self._detected = now
+        if self._last_scan is not None and now - self._last_scan < self._rescan_interval:
+            return False
+        self._last_scan = now
+        return True
+
+    def port_rebound(self, port: str) -> None:
+        """Note the adapter is read from a new port."""
+        self._port = port
+        self._rebound = True
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state of the watchdog."""
+        return {
+            "port": self._port,
+            "telegram_age": round(self.telegram_age, 3),
+            "recoveries": self._recoveries,
+            "recovery_time": self._recovery_time,
+        }
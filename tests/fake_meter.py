@@ -0,0 +1,161 @@
+"""Creates valid encrypted telegrams of a smart meter for tests."""
+from Crypto.Cipher import AES
+from smartmeter_austria_energy.constants import DataType, PhysicalUnits
+from smartmeter_austria_energy.obis import Obis
+from smartmeter_austria_energy.supplier import Supplier
+
+KEY_HEX = "36C66639E48A8CA4D6BC8B282A793BBB"
+SYSTEM_TITLE = b"KFM\x10\x20\x00\x00\x01"
+DEVICE_NUMBER = "123456789012"
+
+
+def _obis_float(name: str, data_type: int, value: int, scale: int, unit: PhysicalUnits) -> bytes:
+    """Encode an OBIS value with scale and unit."""
+    size = 4 if data_type == DataType.DoubleLongUnsigned else 2
+    return (
+        bytes([DataType.OctetString, 6])
+        + getattr(Obis, name)
+        + bytes([data_type])
+        + value.to_bytes(size, "big")
+        + bytes([0x02, 0x02, 0x0F, scale & 0xFF, 0x16, unit.value])
+    )
+
+
+def _obis_octet(name: str, value: bytes) -> bytes:
+    """Encode an OBIS octet string."""
+    return (
+        bytes([DataType.OctetString, 6])
+        + getattr(Obis, name)
+        + bytes([DataType.OctetString, len(value)])
+        + value
+        + b"\x00\x00"
+    )
+
+
+def plaintext(
+    supplier: Supplier,
+    device_number: str = DEVICE_NUMBER,
+    power_in: int = 1500,
+    power_out: int = 200,
+    energy_in: int = 1_000_000,
+    energy_out: int = 500_000,
+    voltages: tuple[int, int, int] = (2301, 2312, 2298),
+    currents: tuple[int, int, int] = (512, 301, 99),
+    power_factor: int = 998,
+) -> bytes:
+    """Encode the unencrypted data of a telegram."""
+    data = b"\x0f\x00\x00\x00\x01\x0c\x07\xe8\x01\x01\x01\x00\x00\x00\x00\x00\x00\x00"
+    for phase, voltage in enumerate(voltages, 1):
+        data += _obis_float(f"VoltageL{phase}", DataType.LongUnsigned, voltage, -1, PhysicalUnits.V)
+    for phase, current in enumerate(currents, 1):
+        data += _obis_float(f"CurrentL{phase}", DataType.LongUnsigned, current, -2, PhysicalUnits.A)
+    data += _obis_float("RealPowerIn", DataType.DoubleLongUnsigned, power_in, 0, PhysicalUnits.W)
+    data += _obis_float("RealPowerOut", DataType.DoubleLongUnsigned, power_out, 0, PhysicalUnits.W)
+    data += _obis_float("RealEnergyIn", DataType.DoubleLongUnsigned, energy_in, 0, PhysicalUnits.Wh)
+    data += _obis_float("RealEnergyOut", DataType.DoubleLongUnsigned, energy_out, 0, PhysicalUnits.Wh)
+    if "ReactiveEnergyIn" in supplier.supplied_values:
+        data += _obis_float("ReactiveEnergyIn", DataType.DoubleLongUnsigned, 1000, 0, PhysicalUnits.varh)
+        data += _obis_float("ReactiveEnergyOut", DataType.DoubleLongUnsigned, 2000, 0, PhysicalUnits.varh)
+    if "Factor" in supplier.supplied_values:
+        data += _obis_float("Factor", DataType.LongUnsigned, power_factor, -3, PhysicalUnits.NoUnit)
+    data += _obis_octet("DeviceNumber", device_number.encode())
+    return data
+
+
+def _long_frame(payload: bytes) -> bytes:
+    """Wrap the payload into a M-BUS long frame."""
+    length = len(payload)
+    checksum = sum(payload) & 0xFF
+    return bytes([0x68, length, length, 0x68]) + payload + bytes([checksum, 0x16])
+
+
+def telegram_frames(
+    supplier: Supplier,
+    key_hex: str = KEY_HEX,
+    system_title: bytes = SYSTEM_TITLE,
+    invocation_counter: int = 1,
+    **values,
+) -> tuple[bytes, bytes]:
+    """Create both encrypted frames of one telegram."""
+    frame2_length = supplier.frame2_start_bytes[1]
+    frame1_header_length = supplier.enc_data_start_byte - 4
+    frame1_data_length = 0xFA - frame1_header_length
+    frame2_data_length = frame2_length - 5
+
+    data = plaintext(supplier, **values)
+    data += bytes(frame1_data_length + frame2_data_length - len(data))
+
+    ic = invocation_counter.to_bytes(4, "big")
+    cipher = AES.new(bytes.fromhex(key_hex), AES.MODE_GCM, nonce=system_title + ic)
+    encrypted = cipher.encrypt(data)
+
+    # C, A, CI and DLMS header up to the system title at byte 11
+    header = b"\x53\xff\x00\x01\x67\xdb\x08" + system_title
+    header += bytes(supplier.ic_start_byte - 4 - len(header)) + ic
+    frame1 = _long_frame(header + encrypted[:frame1_data_length])
+    frame2 = _long_frame(b"\x53\xff\x11\x01\x67" + encrypted[frame1_data_length:])
+    return frame1, frame2
+
+
+def telegram_bytes(supplier: Supplier, **kwargs) -> bytes:
+    """Create one encrypted telegram as sent on the serial line."""
+    frame1, frame2 = telegram_frames(supplier, **kwargs)
+    return frame1 + frame2
+
+
+class FakeSerial:
+    """Stands in for serial.Serial and returns a prepared byte stream."""
+
+    def __init__(self, stream: bytes = b"", chunk_size: int = 64, **kwargs) -> None:
+        """Initialize."""
+        self.stream = bytearray(stream)
+        self.chunk_size = chunk_size
+        self.kwargs = kwargs
+        self.is_open = True
+
+    @property
+    def in_waiting(self) -> int:
+        """Gets the number of bytes which can be read without blocking."""
+        return min(len(self.stream), self.chunk_size)
+
+    def isOpen(self) -> bool:
+        """Return if the port is open, the pyserial 2 name."""
+        return self.is_open
+
+    def inWaiting(self) -> int:
+        """Return the number of bytes which can be read, the pyserial 2 name."""
+        return self.in_waiting
+
+    def read(self, size: int = 1) -> bytes:
+        """Read up to size bytes."""
+        data = bytes(self.stream[:size])
+        del self.stream[:size]
+        return data
+
+    def close(self) -> None:
+        """Close the port."""
+        self.is_open = False
+
+
+class LoopingFakeSerial(FakeSerial):
+    """Stands in for serial.Serial and sends a new telegram after the last one was read."""
+
+    def __init__(self, supplier: Supplier, device_number: str = DEVICE_NUMBER, **kwargs) -> None:
+        """Initialize."""
+        super().__init__(**kwargs)
+        self.supplier = supplier
+        self.device_number = device_number
+        self.invocation_counter = 0
+
+    @property
+    def in_waiting(self) -> int:
+        """Gets the number of bytes of the current telegram."""
+        if not self.stream:
+            self.invocation_counter += 1
+            self.stream += telegram_bytes(
+                self.supplier,
+                device_number=self.device_number,
+                invocation_counter=self.invocation_counter,
+                power_in=1000 + self.invocation_counter % 500,
+            )
+        return len(self.stream)
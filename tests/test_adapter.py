@@ -0,0 +1,166 @@
+"""Tests the creation of the smart meter adapters."""
+import asyncio
+import time
+from unittest.mock import patch
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+import pytest
+from smartmeter_austria_energy.exceptions import SmartmeterTimeoutException
+from smartmeter_austria_energy.smartmeter import Smartmeter
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_EVN_NAME
+
+from custom_components.smartmeter_austria.adapter import (
+    async_close_adapter,
+    async_create_adapter,
+    async_get_multiplexer,
+    async_get_read_executor,
+    async_read_adapter,
+    async_read_adapter_batch,
+    async_shutdown_read_executor,
+)
+from custom_components.smartmeter_austria.multiplexer import (
+    MultiplexedSmartmeter,
+    PortMultiplexer,
+)
+from custom_components.smartmeter_austria.network import NetworkSmartmeter
+from custom_components.smartmeter_austria.serial_protocol import SerialSmartmeter
+
+_SUPPLIER = SUPPLIERS[SUPPLIER_EVN_NAME]
+_HEX_KEY = "my_hex_key"
+
+# Platforms which cannot read the ports on the event loop use the library.
+_LIBRARY_FALLBACK = patch(
+    "custom_components.smartmeter_austria.adapter.supports_event_loop_reads",
+    return_value=False,
+)
+
+
+def test_async_get_multiplexer(hass):
+    """Test one multiplexer is used per port."""
+    multiplexer = async_get_multiplexer(hass, "/dev/ttyUSB1")
+
+    assert async_get_multiplexer(hass, "/dev/ttyUSB1") is multiplexer
+    assert async_get_multiplexer(hass, "/dev/ttyUSB2") is not multiplexer
+
+
+def test_async_create_adapter_local_port(hass):
+    """Test a local port is read on the event loop, or by Smartmeter as fallback."""
+    adapter = async_create_adapter(hass, _SUPPLIER, "/dev/ttyUSB1", _HEX_KEY)
+    with _LIBRARY_FALLBACK:
+        fallback_adapter = async_create_adapter(
+            hass, _SUPPLIER, "/dev/ttyUSB1", _HEX_KEY)
+
+    assert isinstance(adapter, SerialSmartmeter)
+    assert isinstance(fallback_adapter, Smartmeter)
+
+
+def test_async_create_adapter_shared_port(hass):
+    """Test a shared port is read by the multiplexer."""
+    adapter = async_create_adapter(
+        hass, _SUPPLIER, "/dev/ttyUSB1", _HEX_KEY, shared_port=True)
+
+    assert isinstance(adapter, MultiplexedSmartmeter)
+
+
+def test_async_create_adapter_network_ports(hass):
+    """Test the adapters of network bridges."""
+    socket_adapter = async_create_adapter(
+        hass, _SUPPLIER, "socket://127.0.0.1:2000", _HEX_KEY)
+    rfc2217_adapter = async_create_adapter(
+        hass, _SUPPLIER, "rfc2217://127.0.0.1:2000", _HEX_KEY)
+
+    assert isinstance(socket_adapter, NetworkSmartmeter)
+    assert isinstance(rfc2217_adapter, MultiplexedSmartmeter)
+
+
+@pytest.mark.asyncio
+async def test_async_get_read_executor_stop_listener(hass):
+    """Test the pool has one stop listener, which is removed with the pool."""
+    listeners = hass.bus.async_listeners().get(EVENT_HOMEASSISTANT_STOP, 0)
+
+    for _ in range(2):
+        executor = async_get_read_executor(hass)
+        assert async_get_read_executor(hass) is executor
+        assert hass.bus.async_listeners()[EVENT_HOMEASSISTANT_STOP] == listeners + 1
+        async_shutdown_read_executor(hass)
+        assert hass.bus.async_listeners().get(EVENT_HOMEASSISTANT_STOP, 0) == listeners
+
+    executor = async_get_read_executor(hass)
+    with patch.object(executor, "shutdown") as shutdown_mock:
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+        await hass.async_block_till_done()
+    shutdown_mock.assert_called_once()
+    assert async_get_read_executor(hass) is not executor
+    async_shutdown_read_executor(hass)
+
+
+@pytest.mark.asyncio
+async def test_async_read_adapter_executor(hass):
+    """Test a blocking adapter is read in the executor."""
+    with _LIBRARY_FALLBACK:
+        adapter = async_create_adapter(hass, _SUPPLIER, "/dev/ttyUSB1", _HEX_KEY)
+
+    with patch.object(Smartmeter, "read", return_value="data") as read_mock:
+        result = await async_read_adapter(hass, adapter)
+        await async_close_adapter(hass, adapter)
+
+    assert result == "data"
+    read_mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_read_adapter_batch(hass):
+    """Test the library's adapter reads a batch of one telegram."""
+    with _LIBRARY_FALLBACK:
+        adapter = async_create_adapter(hass, _SUPPLIER, "/dev/ttyUSB1", _HEX_KEY)
+
+    with patch.object(Smartmeter, "read", return_value="data"):
+        assert await async_read_adapter_batch(hass, adapter) == ["data"]
+
+
+@pytest.mark.asyncio
+async def test_async_read_adapter_interrupts_multiplexed_read(hass):
+    """Test a read of a shared port which takes too long is interrupted."""
+    adapter = async_create_adapter(hass, _SUPPLIER, "/dev/ttyUSB1", _HEX_KEY, True)
+    executor = async_get_read_executor(hass)
+
+    def _read_until_interrupted(meter):
+        """Block like a stuck port. Helper method."""
+        while not meter.interrupted:
+            time.sleep(0.01)
+        raise SmartmeterTimeoutException()
+
+    with (
+        patch.object(executor, "_timeout", 0.1),
+        patch.object(PortMultiplexer, "read_telegram", side_effect=_read_until_interrupted),
+        pytest.raises(SmartmeterTimeoutException),
+    ):
+        await async_read_adapter(hass, adapter)
+
+    assert adapter.interrupted
+    assert executor.timeouts == 1
+
+    # The interrupted read gives its thread back.
+    async with asyncio.timeout(5):
+        while executor.running:
+            await asyncio.sleep(0.01)
+
+    await async_close_adapter(hass, adapter)
+    async_shutdown_read_executor(hass)
+
+
+@pytest.mark.asyncio
+async def test_async_read_adapter_network(hass):
+    """Test a network adapter is read on the event loop."""
+    adapter = async_create_adapter(
+        hass, _SUPPLIER, "socket://127.0.0.1:2000", _HEX_KEY)
+
+    with patch.object(
+        NetworkSmartmeter, "async_read", return_value="data"
+    ) as read_mock, patch.object(NetworkSmartmeter, "close") as close_mock:
+        result = await async_read_adapter(hass, adapter)
+        await async_close_adapter(hass, adapter)
+
+    assert result == "data"
+    read_mock.assert_called_once()
+    close_mock.assert_called_once()
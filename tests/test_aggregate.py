@@ -0,0 +1,145 @@
+"""Tests the building totals of all meters."""
+import random
+
+import pytest
+from smartmeter_austria_energy.constants import PhysicalUnits
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.obisvalue import ObisValueFloat
+
+from custom_components.smartmeter_austria.aggregate import (
+    AGGREGATE_DELTA,
+    MeterAggregate,
+)
+
+
+def _obisdata(power_in: float, power_out: float, energy_in: float = 1000.0) -> ObisData:
+    """Create a telegram of a meter. Helper method."""
+    obisdata = ObisData(dec=None, wanted_values=[])
+    obisdata.RealPowerIn = ObisValueFloat(power_in, PhysicalUnits.W)
+    obisdata.RealPowerOut = ObisValueFloat(power_out, PhysicalUnits.W)
+    obisdata.RealEnergyIn = ObisValueFloat(energy_in, PhysicalUnits.Wh)
+    obisdata.RealEnergyOut = ObisValueFloat(0, PhysicalUnits.Wh)
+    obisdata.CurrentL1 = ObisValueFloat(1.25, PhysicalUnits.A)
+    return obisdata
+
+
+def test_aggregate_replaces_the_contribution_of_a_meter():
+    """Test the newest telegram of a meter replaces its previous one."""
+    aggregate = MeterAggregate()
+
+    aggregate.update("meter 1", _obisdata(1000, 0))
+    aggregate.update("meter 2", _obisdata(200, 50))
+    aggregate.update("meter 1", _obisdata(1500, 0))
+
+    values = aggregate.values()
+    assert aggregate.meters == 2
+    assert values["RealPowerIn"] == 1700
+    assert values["RealPowerOut"] == 50
+    assert values["RealEnergyIn"] == 2000
+    assert values["CurrentL1"] == 2.5
+    assert values[AGGREGATE_DELTA] == 1650
+
+
+def test_aggregate_remove():
+    """Test a removed meter does not count any longer."""
+    aggregate = MeterAggregate()
+    aggregate.update("meter 1", _obisdata(1000, 0))
+    aggregate.update("meter 2", _obisdata(200, 50))
+
+    aggregate.remove("meter 1")
+    aggregate.remove("unknown meter")
+
+    assert aggregate.meters == 1
+    assert aggregate.values()["RealPowerIn"] == 200
+
+    aggregate.remove("meter 2")
+
+    assert aggregate.meters == 0
+    assert aggregate.values()["RealPowerIn"] is None
+    assert AGGREGATE_DELTA not in aggregate.values()
+
+
+def test_aggregate_leave_keeps_counters():
+    """Test a meter which leaves for a reload keeps its counters only."""
+    aggregate = MeterAggregate()
+    aggregate.update("meter 1", _obisdata(1000, 0))
+    aggregate.update("meter 2", _obisdata(200, 50))
+
+    aggregate.leave("meter 1")
+    aggregate.leave("unknown meter")
+
+    values = aggregate.values()
+    assert values["RealPowerIn"] == 200
+    assert values["CurrentL1"] == 1.25
+    assert values["RealEnergyIn"] == 2000
+
+    aggregate.update("meter 1", _obisdata(1500, 0, 1001))
+
+    assert aggregate.values()["RealPowerIn"] == 1700
+    assert aggregate.values()["RealEnergyIn"] == 2001
+
+
+def test_aggregate_counters_need_all_meters():
+    """Test the counters are None until all expected meters have reported."""
+    aggregate = MeterAggregate()
+    aggregate.update("meter 1", _obisdata(1000, 0))
+    aggregate.update("removed meter", _obisdata(200, 50))
+    aggregate.expect(["meter 1", "meter 2"])
+
+    values = aggregate.values()
+    assert not aggregate.complete
+    assert aggregate.meters == 1
+    assert values["RealPowerIn"] == 1000
+    assert values["RealEnergyIn"] is None
+    assert values["RealEnergyOut"] is None
+
+    aggregate.update("meter 2", _obisdata(200, 50))
+
+    assert aggregate.complete
+    assert aggregate.values()["RealEnergyIn"] == 2000
+    assert aggregate.as_dict() == {"meters": 2, "expected_meters": 2, "updates": 3}
+
+
+def test_aggregate_configured_meter_not_running():
+    """Test a configured meter which is not running keeps its counters but is not waited for."""
+    aggregate = MeterAggregate()
+    aggregate.update("meter 1", _obisdata(1000, 0))
+    aggregate.update("meter 2", _obisdata(200, 50))
+    aggregate.update("removed meter", _obisdata(300, 0))
+
+    aggregate.expect(["meter 1"], ["meter 1", "meter 2", "meter 3"])
+
+    assert aggregate.complete
+    assert aggregate.meters == 2
+    assert aggregate.values()["RealEnergyIn"] == 2000
+
+
+def test_aggregate_value_not_supplied():
+    """Test a value which no meter supplies is None."""
+    aggregate = MeterAggregate(keys=("RealPowerIn", "Frequency"))
+    aggregate.update("meter 1", _obisdata(1000, 0))
+    aggregate.update("meter 2", _obisdata(200, 50))
+
+    values = aggregate.values()
+    assert values["RealPowerIn"] == 1200
+    assert values["Frequency"] is None
+
+
+@pytest.mark.parametrize("resum_updates", [7, 10000])
+def test_aggregate_matches_the_sum(resum_updates):
+    """Test the running totals match the sum of the newest telegrams."""
+    generator = random.Random(4)
+    aggregate = MeterAggregate(resum_updates=resum_updates)
+    newest: dict[int, tuple[float, float]] = {}
+
+    for _ in range(2000):
+        meter = generator.randrange(20)
+        newest[meter] = (generator.uniform(0, 5000), generator.uniform(0, 1e8))
+        aggregate.update(meter, _obisdata(newest[meter][0], 0, newest[meter][1]))
+
+    values = aggregate.values()
+    assert aggregate.updates == 2000
+    assert values["RealPowerIn"] == pytest.approx(
+        sum(power for power, _ in newest.values()), abs=1e-3)
+    assert values["RealEnergyIn"] == pytest.approx(
+        sum(energy for _, energy in newest.values()), abs=1e-3)
@@ -0,0 +1,100 @@
+"""Tests the power quality analytics."""
+import pytest
+from smartmeter_austria_energy.constants import PhysicalUnits
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.obisvalue import ObisValueFloat
+
+from custom_components.smartmeter_austria.analytics import (
+    LOAD_SHARE,
+    NEUTRAL_CURRENT,
+    NEUTRAL_CURRENT_AVERAGE,
+    OVER_VOLTAGE_COUNT,
+    UNDER_VOLTAGE_COUNT,
+    UNDER_VOLTAGE_SEVERE_COUNT,
+    VOLTAGE_IMBALANCE,
+    VOLTAGE_IMBALANCE_AVERAGE,
+    PhaseQualityAnalyzer,
+    SlidingWindow,
+    neutral_current,
+    voltage_imbalance,
+)
+
+
+def _obisdata(voltages, currents) -> ObisData:
+    """Create a telegram with phase values. Helper method."""
+    obisdata = ObisData(dec=None, wanted_values=[])
+    for phase, (voltage, current) in enumerate(zip(voltages, currents), 1):
+        setattr(obisdata, f"VoltageL{phase}", ObisValueFloat(voltage, PhysicalUnits.V))
+        setattr(obisdata, f"CurrentL{phase}", ObisValueFloat(current, PhysicalUnits.A))
+    return obisdata
+
+
+def test_sliding_window():
+    """Test the oldest values drop out of the window."""
+    window = SlidingWindow(3)
+    assert window.mean is None
+
+    for value in (1, 2, 3, 4, 5):
+        window.add(value)
+
+    assert len(window) == 3
+    assert window.sum == 12
+    assert window.mean == 4
+
+
+def test_voltage_imbalance():
+    """Test the imbalance in percent."""
+    assert voltage_imbalance((230, 230, 230)) == 0
+    assert voltage_imbalance((220, 230, 240)) == pytest.approx(10 / 230 * 100)
+
+
+def test_neutral_current():
+    """Test the neutral current estimate."""
+    assert neutral_current((10, 10, 10)) == pytest.approx(0)
+    assert neutral_current((10, 0, 0)) == pytest.approx(10)
+    assert neutral_current((10, 10, 0)) == pytest.approx(10)
+
+
+def test_analyzer_voltage_bands():
+    """Test the voltages are counted in the EN 50160 bands."""
+    analyzer = PhaseQualityAnalyzer(window_size=2)
+
+    analyzer.update(_obisdata((190, 205, 260), (1, 1, 1)))
+    values = analyzer.update(_obisdata((230, 230, 255), (1, 1, 1)))
+
+    assert values[UNDER_VOLTAGE_SEVERE_COUNT] == 1
+    assert values[UNDER_VOLTAGE_COUNT] == 2
+    assert values[OVER_VOLTAGE_COUNT] == 2
+
+    # the first telegram drops out of the window
+    values = analyzer.update(_obisdata((230, 230, 230), (1, 1, 1)))
+
+    assert values[UNDER_VOLTAGE_COUNT] == 0
+    assert values[OVER_VOLTAGE_COUNT] == 1
+
+
+def test_analyzer_imbalance_and_load_share():
+    """Test the rolling imbalance and load share."""
+    analyzer = PhaseQualityAnalyzer()
+
+    analyzer.update(_obisdata((230, 230, 230), (10, 0, 0)))
+    values = analyzer.update(_obisdata((220, 230, 240), (5, 5, 0)))
+
+    assert values[VOLTAGE_IMBALANCE] == pytest.approx(4.348, abs=0.001)
+    assert values[VOLTAGE_IMBALANCE_AVERAGE] == pytest.approx(2.174, abs=0.001)
+    assert values[LOAD_SHARE.format(1)] == pytest.approx(75)
+    assert values[LOAD_SHARE.format(2)] == pytest.approx(25)
+    assert values[LOAD_SHARE.format(3)] == pytest.approx(0)
+    assert values[NEUTRAL_CURRENT] == pytest.approx(5)
+    assert values[NEUTRAL_CURRENT_AVERAGE] == pytest.approx(7.5)
+
+
+def test_analyzer_single_phase():
+    """Test single phase meters do not create voltage values."""
+    analyzer = PhaseQualityAnalyzer()
+
+    values = analyzer.update(_obisdata((230, 0, 0), (5, 0, 0)))
+
+    assert VOLTAGE_IMBALANCE not in values
+    assert values[VOLTAGE_IMBALANCE_AVERAGE] is None
+    assert values[LOAD_SHARE.format(1)] == pytest.approx(100)
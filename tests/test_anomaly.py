@@ -0,0 +1,137 @@
+"""Tests the anomaly detection on the consumption baseline."""
+from datetime import datetime, timedelta, timezone
+
+from smartmeter_austria_energy.constants import PhysicalUnits
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.obisvalue import ObisValueFloat
+
+from custom_components.smartmeter_austria.anomaly import (
+    BASE_LOAD,
+    BASE_LOAD_JUMP,
+    CONSUMPTION_ANOMALY,
+    CONSUMPTION_BASELINE,
+    SHORT_WINDOW_SIZE,
+    STANDBY_ANOMALY,
+    ConsumptionAnomalyDetector,
+    ExponentialStatistics,
+)
+
+_START = datetime(2026, 1, 5, tzinfo=timezone(timedelta(hours=1)))
+
+
+def _obisdata(power_in: int) -> ObisData:
+    """Create a telegram with the power in W. Helper method."""
+    obisdata = ObisData(dec=None, wanted_values=[])
+    obisdata.RealPowerIn = ObisValueFloat(power_in, PhysicalUnits.W)
+    return obisdata
+
+
+class _Clock:
+    """Returns the set moment. Helper class."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.moment = _START
+
+    def __call__(self) -> datetime:
+        """Return the moment."""
+        return self.moment
+
+
+def _learn(detector: ConsumptionAnomalyDetector, clock: _Clock, hours: int, power) -> None:
+    """Feed a telegram every 5 minutes for several hours. Helper method."""
+    for _ in range(hours):
+        for minute in range(0, 60, 5):
+            clock.moment += timedelta(minutes=5)
+            detector.update(_obisdata(power(clock.moment.hour, minute)))
+
+
+def test_exponential_statistics():
+    """Test the weighted mean and deviation follow the values."""
+    statistics = ExponentialStatistics(alpha=0.5)
+    assert statistics.mean is None
+
+    for value in (100, 200, 100, 200):
+        statistics.add(value)
+
+    assert statistics.count == 4
+    assert 100 < statistics.mean < 200
+    assert statistics.deviation > 0
+    assert not statistics.exceeded_by(200)
+    assert statistics.exceeded_by(1000)
+
+
+def test_exponential_statistics_not_enough_samples():
+    """Test a new baseline never reports an anomaly."""
+    statistics = ExponentialStatistics()
+    statistics.add(100)
+
+    assert not statistics.exceeded_by(100000)
+
+
+def test_consumption_anomaly():
+    """Test a high consumption at an usually quiet hour is flagged."""
+    clock = _Clock()
+    detector = ConsumptionAnomalyDetector(now=clock)
+    _learn(detector, clock, 5 * 24, lambda hour, minute: 2000 if hour == 18 else 300)
+
+    clock.moment = clock.moment.replace(hour=10, minute=0) + timedelta(days=1)
+    for _ in range(SHORT_WINDOW_SIZE):
+        values = detector.update(_obisdata(3000))
+
+    assert values[CONSUMPTION_ANOMALY]
+    assert values[CONSUMPTION_BASELINE] == 300.0
+
+    clock.moment = clock.moment.replace(hour=18)
+    for _ in range(SHORT_WINDOW_SIZE):
+        values = detector.update(_obisdata(2000))
+
+    assert not values[CONSUMPTION_ANOMALY]
+
+
+def test_standby_anomaly():
+    """Test a raised minimum power at night is flagged."""
+    clock = _Clock()
+    detector = ConsumptionAnomalyDetector(now=clock)
+    _learn(detector, clock, 5 * 24, lambda hour, minute: 100 if hour < 5 else 1000)
+
+    clock.moment = clock.moment.replace(hour=2, minute=0) + timedelta(days=1)
+    for _ in range(SHORT_WINDOW_SIZE):
+        values = detector.update(_obisdata(600))
+
+    assert values[STANDBY_ANOMALY]
+
+    clock.moment = clock.moment.replace(hour=12)
+    values = detector.update(_obisdata(600))
+
+    assert not values[STANDBY_ANOMALY]
+
+
+def test_base_load_jump():
+    """Test an hour which never drops to the base load is flagged."""
+    clock = _Clock()
+    detector = ConsumptionAnomalyDetector(now=clock)
+    _learn(detector, clock, 3 * 24, lambda hour, minute: 1000 if minute else 100)
+    assert detector.update(_obisdata(100))[BASE_LOAD] == 100.0
+
+    _learn(detector, clock, 2, lambda hour, minute: 1000)
+
+    assert detector.update(_obisdata(1000))[BASE_LOAD_JUMP]
+
+    # The baseline follows a lasting change.
+    _learn(detector, clock, 2 * 24, lambda hour, minute: 1000)
+
+    assert not detector.update(_obisdata(1000))[BASE_LOAD_JUMP]
+
+
+def test_restore():
+    """Test the baselines continue after a restart."""
+    clock = _Clock()
+    detector = ConsumptionAnomalyDetector(now=clock)
+    _learn(detector, clock, 3 * 24, lambda hour, minute: 1000 if minute else 100)
+
+    restored = ConsumptionAnomalyDetector(now=clock)
+    restored.restore(detector.as_state())
+
+    assert restored.as_state() == detector.as_state()
+    assert restored.update(_obisdata(100))[BASE_LOAD] == 100.0
@@ -0,0 +1,104 @@
+"""Tests the backfill of the energy statistics."""
+from datetime import UTC, datetime, timedelta
+
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.components.recorder.models import StatisticMeanType
+from homeassistant.components.recorder.statistics import (
+    async_import_statistics,
+    statistics_during_period,
+)
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT, UnitOfEnergy
+from homeassistant.helpers import entity_registry as er
+import pytest
+from pytest_homeassistant_custom_component.components.recorder.common import (
+    async_wait_recording_done,
+)
+
+from custom_components.smartmeter_austria.backfill import (
+    MAX_BACKFILL_HOURS,
+    async_backfill_statistics,
+    interpolate_statistics,
+)
+from custom_components.smartmeter_austria.const import DOMAIN
+
+_DEVICE_NUMBER = "123456789012"
+_LAST_READING = datetime(2026, 1, 1, 10, 30, tzinfo=UTC)
+_RESTART = datetime(2026, 1, 1, 14, 30, tzinfo=UTC)
+
+
+def test_interpolate_statistics():
+    """Test the energy of the gap is spread over the missed hours."""
+    result = interpolate_statistics(990, 50, _LAST_READING, 1000, _RESTART, 1400)
+
+    assert [row["start"].hour for row in result] == [10, 11, 12, 13]
+    assert [row["state"] for row in result] == [1050, 1150, 1250, 1350]
+    assert [row["sum"] for row in result] == [110, 210, 310, 410]
+
+
+def test_interpolate_statistics_no_gap():
+    """Test nothing is filled if the reading and the restart are in the same hour."""
+    now = _LAST_READING + timedelta(minutes=10)
+
+    assert interpolate_statistics(990, 50, _LAST_READING, 1000, now, 1010) == []
+
+
+def test_interpolate_statistics_meter_replaced():
+    """Test nothing is filled if the counter went backwards."""
+    assert interpolate_statistics(990, 50, _LAST_READING, 1000, _RESTART, 10) == []
+
+
+def test_interpolate_statistics_gap_too_long():
+    """Test long gaps are not filled."""
+    now = _LAST_READING + timedelta(hours=MAX_BACKFILL_HOURS + 2)
+
+    assert interpolate_statistics(990, 50, _LAST_READING, 1000, now, 2000) == []
+
+
+@pytest.mark.asyncio
+async def test_async_backfill_statistics(
+    recorder_mock, hass, freezer: FrozenDateTimeFactory
+):
+    """Test the missed hours are imported into the recorder."""
+    entity_id = er.async_get(hass).async_get_or_create(
+        "sensor",
+        DOMAIN,
+        f"{DOMAIN}_{_DEVICE_NUMBER}_RealEnergyIn",
+        suggested_object_id="energy_in",
+    ).entity_id
+    attributes = {ATTR_UNIT_OF_MEASUREMENT: UnitOfEnergy.WATT_HOUR}
+
+    freezer.move_to(_LAST_READING)
+    hass.states.async_set(entity_id, "1000", attributes)
+    async_import_statistics(
+        hass,
+        {
+            "has_mean": False,
+            "mean_type": StatisticMeanType.NONE,
+            "has_sum": True,
+            "name": None,
+            "source": "recorder",
+            "statistic_id": entity_id,
+            "unit_of_measurement": UnitOfEnergy.WATT_HOUR,
+        },
+        [{"start": datetime(2026, 1, 1, 9, tzinfo=UTC), "state": 990, "sum": 50}],
+    )
+    await async_wait_recording_done(hass)
+
+    freezer.move_to(_RESTART)
+    hass.states.async_set(entity_id, "1400", attributes)
+    await async_wait_recording_done(hass)
+
+    await async_backfill_statistics(hass, _DEVICE_NUMBER, _RESTART)
+    await async_wait_recording_done(hass)
+
+    result = await recorder_mock.async_add_executor_job(
+        statistics_during_period,
+        hass,
+        datetime(2026, 1, 1, 10, tzinfo=UTC),
+        _RESTART,
+        {entity_id},
+        "hour",
+        None,
+        {"state", "sum"},
+    )
+    assert [row["sum"] for row in result[entity_id]] == [110, 210, 310, 410]
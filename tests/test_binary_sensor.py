@@ -0,0 +1,44 @@
+"""Test the binary sensor platform."""
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_EVN_NAME
+
+from custom_components.smartmeter_austria.const import (
+    CONF_COM_PORT,
+    CONF_KEY_HEX,
+    CONF_SUPPLIER_NAME,
+    DOMAIN,
+)
+
+from .fake_meter import DEVICE_NUMBER, KEY_HEX, LoopingFakeSerial
+
+
+@pytest.mark.asyncio
+async def test_anomaly_binary_sensors(hass, enable_custom_integrations):
+    """Test the anomaly binary sensors are set up and off without a baseline."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="my_unique_test_id",
+        data={
+            CONF_SUPPLIER_NAME: SUPPLIER_EVN_NAME,
+            CONF_COM_PORT: "/dev/ttyUSB1",
+            CONF_KEY_HEX: KEY_HEX,
+        },
+    )
+    config_entry.add_to_hass(hass)
+
+    with patch(
+        "serial.Serial",
+        side_effect=lambda **kwargs: LoopingFakeSerial(SUPPLIERS[SUPPLIER_EVN_NAME]),
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        for key in ("consumption_anomaly", "standby_load_at_night", "base_load_jump"):
+            state = hass.states.get(f"binary_sensor.smart_meter_{DEVICE_NUMBER}_{key}")
+            assert state is not None, key
+            assert state.state == "off"
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
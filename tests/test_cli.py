@@ -0,0 +1,59 @@
+"""Tests the headless reader."""
+from io import StringIO
+import json
+from pathlib import Path
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_EVN_NAME
+
+from custom_components.smartmeter_austria.cli import async_run, build_parser
+
+from .fake_meter import DEVICE_NUMBER, KEY_HEX, FakeSerial, telegram_bytes
+
+_READER = Path(__file__).resolve().parent.parent / "scripts" / "reader"
+_SUPPLIER = SUPPLIERS[SUPPLIER_EVN_NAME]
+
+
+def test_reader_does_not_import_home_assistant():
+    """Test the reader and its pipeline load without Home Assistant."""
+    code = (
+        "import runpy, sys\n"
+        f"runpy.run_path({str(_READER)!r})['load_package']()\n"
+        "print(sorted({name.split('.')[0] for name in sys.modules} & {'homeassistant'}))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("event_loop_reads", [True, False])
+async def test_async_run_writes_json_lines(event_loop_reads):
+    """Test every telegram is written as one JSON line with the derived values.
+
+    Platforms which cannot read the port on the event loop read it in a thread.
+    """
+    args = build_parser().parse_args(
+        ["--port", "/dev/ttyUSB1", "--supplier", SUPPLIER_EVN_NAME, "--key", KEY_HEX,
+         "--count", "2"])
+    stream = telegram_bytes(_SUPPLIER, power_in=100) + telegram_bytes(
+        _SUPPLIER, invocation_counter=2, power_in=200)
+    fake_serial = FakeSerial(stream)
+    output = StringIO()
+
+    with patch("serial.Serial", return_value=fake_serial), patch(
+        "custom_components.smartmeter_austria.cli.supports_event_loop_reads",
+        return_value=event_loop_reads,
+    ):
+        assert await async_run(args, output) == 0
+
+    messages = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [message["p_in"] for message in messages] == [100, 200]
+    assert messages[0]["dev"] == DEVICE_NUMBER
+    assert messages[1]["voltage_imbalance"] is not None
+    assert not fake_serial.is_open
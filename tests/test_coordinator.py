@@ -1,8 +1,13 @@
 """Test the coordinator."""
-from unittest.mock import patch
+import asyncio
+from datetime import UTC, datetime, timedelta
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 from smartmeter_austria_energy.exceptions import (
     SmartmeterException,
     SmartmeterSerialException,
@@ -10,9 +15,14 @@ from smartmeter_austria_energy.exceptions import (
 )
 from smartmeter_austria_energy.obisdata import ObisData, ObisValueBytes
 from smartmeter_austria_energy.smartmeter import Smartmeter
-from smartmeter_austria_energy.supplier import SUPPLIER_EVN_NAME
+from smartmeter_austria_energy.supplier import SUPPLIER_EVN_NAME, SUPPLIERS
 
+from custom_components.smartmeter_austria.const import CONF_COM_PORT, DOMAIN
 from custom_components.smartmeter_austria.coordinator import SmartmeterDataCoordinator
+from custom_components.smartmeter_austria.serial_protocol import SerialSmartmeter
+from custom_components.smartmeter_austria.surplus import SURPLUS_POWER
+from custom_components.smartmeter_austria.telegram import Telegram
+from custom_components.smartmeter_austria.watchdog import PortIdentity, TelegramWatchdog
 
 _COM_PORT = "/dev/ttyUSB1"
 SERIAL_NUMBER = "DEVICE_NUMBER"
@@ -107,6 +117,66 @@ async def test_smartmeter_datacoordinator_async_update_data_smartmeter_exception
     assert coordinator.last_update_success is False
 
 
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_skips_corrupt_telegram(hass):
+    """Tests a corrupt telegram is skipped and the next one is read right away."""
+    adapter = MagicMock()
+    obisdata = ObisData(dec=None, wanted_values=[])
+    adapter.read.side_effect = [SmartmeterException(), obisdata]
+    coordinator = SmartmeterDataCoordinator(hass, adapter=adapter)
+
+    with patch("asyncio.sleep") as sleep_mock:
+        assert await coordinator._async_update_data() is obisdata
+
+    sleep_mock.assert_not_called()
+    assert coordinator.bad_telegrams == 1
+    assert coordinator.last_update_success
+
+
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_counts_skipped_telegrams(hass):
+    """Tests the corrupt telegrams skipped in a batch are counted."""
+    adapter = SerialSmartmeter(SUPPLIERS[_SUPPLIER_NAME], _COM_PORT, _HEX_KEY)
+    coordinator = SmartmeterDataCoordinator(hass, adapter=adapter)
+    obisdata = _obisdata(100, 230.1)
+
+    async def _read_batch(hass, adapter):
+        """Decode a corrupt and a good telegram. Helper method."""
+        return adapter.decode_cache.decode_batch(
+            adapter.supplier,
+            [Telegram(bytes(20), bytes(20)), Telegram(bytes(21), bytes(21))],
+            _HEX_KEY,
+        )
+
+    with patch(
+        "custom_components.smartmeter_austria.telegram.decode_telegram",
+        side_effect=[ValueError(), obisdata],
+    ), patch(
+        "custom_components.smartmeter_austria.coordinator.async_read_adapter_batch",
+        side_effect=_read_batch,
+    ):
+        assert await coordinator._async_read() == [obisdata]
+
+    assert coordinator.bad_telegrams == 1
+    assert adapter.decode_cache.pop_skipped() == 0
+
+
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_does_not_skip_wrapped_timeout(hass):
+    """Tests a timeout wrapped by the library is not read again right away."""
+    adapter = MagicMock()
+    exception = SmartmeterException()
+    exception.__cause__ = SmartmeterTimeoutException()
+    adapter.read.side_effect = exception
+    coordinator = SmartmeterDataCoordinator(hass, adapter=adapter)
+
+    with patch("asyncio.sleep"), pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
+
+    assert adapter.read.call_count == 1
+    assert coordinator.bad_telegrams == 0
+
+
 @pytest.mark.asyncio
 async def test_smartmeter_datacoordinator_async_update_data_exception(
     hass,
@@ -125,3 +195,210 @@ async def test_smartmeter_datacoordinator_async_update_data_exception(
             await coordinator._async_update_data()  # has 30 s timeout
 
     assert coordinator.last_update_success is False
+
+
+def _obisdata(power_in: float, voltage_l1: float) -> SimpleNamespace:
+    """Create the values of a telegram. Helper method."""
+    return SimpleNamespace(
+        RealPowerIn=SimpleNamespace(value=power_in),
+        VoltageL1=SimpleNamespace(value=voltage_l1),
+    )
+
+
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_updates_changed_entities(hass):
+    """Tests only the entities with changed values are updated."""
+
+    coordinator = SmartmeterDataCoordinator(hass, adapter=MagicMock())
+    power_listener = MagicMock()
+    voltage_listener = MagicMock()
+    coordinator.async_add_listener(power_listener, "RealPowerIn")
+    coordinator.async_add_listener(voltage_listener, "VoltageL1")
+
+    with patch(
+        "custom_components.smartmeter_austria.coordinator.async_read_adapter_batch",
+        side_effect=[[_obisdata(100, 230.1)], [_obisdata(150, 230.1)]],
+    ):
+        await coordinator.async_refresh()
+        assert power_listener.call_count == 1
+        assert voltage_listener.call_count == 1
+
+        await coordinator.async_refresh()
+        assert power_listener.call_count == 2
+        assert voltage_listener.call_count == 1
+
+    coordinator.async_update_listeners()
+    assert power_listener.call_count == 3
+    assert voltage_listener.call_count == 2
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_catches_up_after_stall(hass):
+    """Tests all telegrams of a backlog are processed and the newest is shown."""
+    coordinator = SmartmeterDataCoordinator(hass, adapter=MagicMock())
+    stage = MagicMock()
+    stage.update.return_value = {}
+    coordinator.pipeline.stages[:] = [stage]
+    batch = [_obisdata(power_in, 230.1) for power_in in (100, 150, 200)]
+
+    with patch(
+        "custom_components.smartmeter_austria.coordinator.async_read_adapter_batch",
+        return_value=batch,
+    ):
+        assert await coordinator._async_update_data() is batch[-1]
+
+    assert [call.args[0] for call in stage.update.call_args_list] == batch
+    assert coordinator.caught_up_telegrams == 2
+
+
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_publishes_every_telegram(hass):
+    """Tests every telegram of a backlog is published with the values of its step."""
+    coordinator = SmartmeterDataCoordinator(hass, adapter=MagicMock())
+    coordinator.publisher = MagicMock(async_publish=AsyncMock())
+    stage = MagicMock()
+    stage.update.side_effect = lambda obisdata: {
+        SURPLUS_POWER: obisdata.RealPowerIn.value / 10}
+    coordinator.pipeline.stages[:] = [stage]
+    batch = [_obisdata(power_in, 230.1) for power_in in (100, 150, 200)]
+
+    with patch(
+        "custom_components.smartmeter_austria.coordinator.async_read_adapter_batch",
+        return_value=batch,
+    ):
+        await coordinator._async_update_data()
+
+    assert [
+        call.args for call in coordinator.publisher.async_publish.call_args_list
+    ] == [(obisdata, {SURPLUS_POWER: obisdata.RealPowerIn.value / 10}) for obisdata in batch]
+    assert coordinator.derived_values[SURPLUS_POWER] == 20
+
+
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_recovers_port(hass):
+    """Tests the adapter is bound to the new port of its USB adapter."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_COM_PORT: "/dev/ttyUSB0"})
+    config_entry.add_to_hass(hass)
+    adapter = SerialSmartmeter(SUPPLIERS[_SUPPLIER_NAME], "/dev/ttyUSB0", _HEX_KEY)
+    coordinator = SmartmeterDataCoordinator(hass, adapter=adapter)
+    coordinator.config_entry = config_entry
+    clock = SimpleNamespace(seconds=0.0)
+    coordinator.watchdog = TelegramWatchdog(
+        "/dev/ttyUSB0", PortIdentity(vid=0x0403), monotonic=lambda: clock.seconds)
+
+    with patch(
+        "custom_components.smartmeter_austria.coordinator.async_read_adapter_batch",
+        return_value=[_obisdata(100, 230.1)],
+    ), patch(
+        "custom_components.smartmeter_austria.coordinator.find_port",
+        return_value="/dev/ttyUSB1",
+    ) as find_port_mock:
+        clock.seconds = 10.0
+        await coordinator._async_update_data()
+        find_port_mock.assert_not_called()
+
+        # No telegram for the update interval and 3 push periods
+        clock.seconds = 10.0 + 30 + 15 + 1
+        await coordinator._async_update_data()
+
+    assert adapter.port == "/dev/ttyUSB1"
+    assert config_entry.data[CONF_COM_PORT] == "/dev/ttyUSB1"
+    assert coordinator.watchdog.recoveries == 1
+    assert coordinator.watchdog.recovery_time == 0
+
+
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_shutdown_cancels_backoff(hass):
+    """Tests the shutdown cancels the backoff after a failed read right away."""
+    coordinator = SmartmeterDataCoordinator(hass, adapter=MagicMock())
+
+    with patch(
+        "custom_components.smartmeter_austria.coordinator.async_read_adapter_batch",
+        side_effect=SmartmeterSerialException(),
+    ):
+        update = asyncio.ensure_future(coordinator._async_update_data())
+        await asyncio.sleep(0.05)
+        assert not update.done()
+
+        started = time.monotonic()
+        await coordinator.async_shutdown()
+
+    assert time.monotonic() - started < 0.5
+    # The task which requested the update is not cancelled, its update fails.
+    assert isinstance(update.exception(), UpdateFailed)
+
+    # A read failing while shutting down does not wait either.
+    with patch(
+        "custom_components.smartmeter_austria.coordinator.async_read_adapter_batch",
+        side_effect=SmartmeterSerialException(),
+    ), patch("asyncio.sleep") as sleep_mock, pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
+
+    sleep_mock.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_shutdown_cancels_read(hass):
+    """Tests the shutdown cancels the running read, not the task which waits for it."""
+    coordinator = SmartmeterDataCoordinator(hass, adapter=MagicMock())
+    read_started = asyncio.Event()
+
+    async def _async_read(hass, adapter):
+        read_started.set()
+        await asyncio.sleep(60)
+
+    with patch(
+        "custom_components.smartmeter_austria.coordinator.async_read_adapter_batch",
+        side_effect=_async_read,
+    ):
+        update = asyncio.ensure_future(coordinator._async_update_data())
+        await read_started.wait()
+
+        # The shutdown runs in the task which requested the update, e.g. a service call.
+        await coordinator.async_shutdown()
+        with pytest.raises(UpdateFailed):
+            await update
+
+    assert not coordinator.last_update_success
+    assert coordinator._read_task is None
+
+
+@pytest.mark.asyncio
+async def test_smartmeter_datacoordinator_rollup_states(hass):
+    """Tests the energy counters are written with the 5 minute rollups only, if set."""
+    coordinator = SmartmeterDataCoordinator(hass, adapter=MagicMock())
+    coordinator.rollup_states = True
+    power_listener = MagicMock()
+    energy_listener = MagicMock()
+    coordinator.async_add_listener(power_listener, "RealPowerIn")
+    coordinator.async_add_listener(energy_listener, "RealEnergyIn")
+    telegrams = [
+        SimpleNamespace(
+            RealPowerIn=SimpleNamespace(value=power_in),
+            RealEnergyIn=SimpleNamespace(value=energy_in),
+        )
+        for power_in, energy_in in ((100, 1000), (150, 1001), (200, 1002))
+    ]
+    start = datetime(2026, 1, 1, 10, 58, 30, tzinfo=UTC)
+
+    with patch(
+        "custom_components.smartmeter_austria.coordinator.async_read_adapter_batch",
+        side_effect=[[telegram] for telegram in telegrams],
+    ), patch(
+        "custom_components.smartmeter_austria.coordinator.dt_util.utcnow",
+        side_effect=[start, start + timedelta(seconds=60), start + timedelta(seconds=95)],
+    ):
+        await coordinator.async_refresh()
+        await coordinator.async_refresh()
+        assert power_listener.call_count == 2
+        assert energy_listener.call_count == 1
+
+        # 11:00:05 finishes the 5 minute period.
+        await coordinator.async_refresh()
+        assert power_listener.call_count == 3
+        assert energy_listener.call_count == 2
+
+    assert coordinator.rollups.short["RealEnergyIn"].finished[-1].increase == 1
+    await coordinator.async_shutdown()
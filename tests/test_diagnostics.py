@@ -0,0 +1,92 @@
+"""Tests the diagnostics."""
+import sys
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_EVN_NAME
+
+from custom_components.smartmeter_austria.const import (
+    CONF_COM_PORT,
+    CONF_KEY_HEX,
+    CONF_SUPPLIER_NAME,
+    DOMAIN,
+)
+from custom_components.smartmeter_austria.coordinator import SmartmeterDataCoordinator
+from custom_components.smartmeter_austria.diagnostics import (
+    async_get_config_entry_diagnostics,
+    deep_getsizeof,
+)
+from custom_components.smartmeter_austria.multiplexer import (
+    MultiplexedSmartmeter,
+    PortMultiplexer,
+)
+from custom_components.smartmeter_austria.publisher import TelegramPublisher
+from custom_components.smartmeter_austria.sensor import Sensor
+from custom_components.smartmeter_austria.smartmeter_data import SmartMeterData
+
+_COM_PORT = "/dev/ttyUSB1"
+_SUPPLIER_NAME = SUPPLIER_EVN_NAME
+_HEX_KEY = "my_hex_key"
+
+
+def _config_entry(coordinator) -> MockConfigEntry:
+    """Create a config entry with runtime data. Helper method."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="my_unique_test_id",
+        data={
+            CONF_SUPPLIER_NAME: _SUPPLIER_NAME,
+            CONF_COM_PORT: _COM_PORT,
+            CONF_KEY_HEX: _HEX_KEY,
+        },
+    )
+    config_entry.runtime_data = SmartMeterData(
+        coordinator=coordinator, device_info=None, device_number="number 1")
+    return config_entry
+
+
+@pytest.mark.asyncio
+async def test_diagnostics_redacts_key(hass):
+    """Test the key is not part of the diagnostics."""
+    with patch("smartmeter_austria_energy.smartmeter.Smartmeter") as smartmeter_mock:
+        coordinator = SmartmeterDataCoordinator(hass, adapter=smartmeter_mock)
+        coordinator.derived_values["voltage_imbalance"] = 1.0
+
+        result = await async_get_config_entry_diagnostics(
+            hass, _config_entry(coordinator))
+
+    assert result["entry"]["data"][CONF_KEY_HEX] == "**REDACTED**"
+    assert result["entry"]["data"][CONF_COM_PORT] == _COM_PORT
+    assert result["coordinator"]["derived_values"] == {"voltage_imbalance": 1.0}
+    assert "decode_cache" not in result
+    assert result["memory"]["entities"] == 0
+    assert result["memory"]["derived_values"] > 0
+
+
+@pytest.mark.asyncio
+async def test_diagnostics_decode_cache_and_publisher(hass):
+    """Test the statistics of the decode cache, multiplexer and publisher."""
+    adapter = MultiplexedSmartmeter(
+        PortMultiplexer(_COM_PORT), SUPPLIERS[_SUPPLIER_NAME], _HEX_KEY)
+    coordinator = SmartmeterDataCoordinator(hass, adapter=adapter)
+    coordinator.publisher = TelegramPublisher(hass, "number 1")
+
+    result = await async_get_config_entry_diagnostics(
+        hass, _config_entry(coordinator))
+
+    assert result["adapter"] == "MultiplexedSmartmeter"
+    assert result["decode_cache"] == {"size": 0, "hits": 0, "misses": 0}
+    assert result["multiplexer"] == {"meters": 1, "unknown_telegrams": 0}
+    assert result["publisher"] == {"published": 0, "failed": 0}
+    assert result["memory"]["decode_cache"] > 0
+
+
+def test_deep_getsizeof():
+    """Test referenced objects are counted once."""
+    value = "x" * 1000
+    single = deep_getsizeof([value])
+
+    assert single > sys.getsizeof(value)
+    assert deep_getsizeof([value, value]) < single + sys.getsizeof(value)
+    assert deep_getsizeof(Sensor(value)) > sys.getsizeof(value)
@@ -0,0 +1,101 @@
+"""Tests the external statistics of the energy rollups."""
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+from homeassistant.components.recorder.models import StatisticMeanType
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    statistics_during_period,
+)
+from homeassistant.const import UnitOfEnergy
+import pytest
+from pytest_homeassistant_custom_component.components.recorder.common import (
+    async_wait_recording_done,
+)
+
+from custom_components.smartmeter_austria import energy_statistics
+from custom_components.smartmeter_austria.const import DOMAIN
+from custom_components.smartmeter_austria.energy_statistics import (
+    RollupStatisticsPublisher,
+    rollup_statistic_id,
+)
+from custom_components.smartmeter_austria.rollup import EnergyRollups
+
+_DEVICE_NUMBER = "123456789012"
+_START = datetime(2026, 1, 1, 10, 58, 30, tzinfo=UTC)
+
+
+def _obisdata(energy_in: float) -> SimpleNamespace:
+    """Telegram with the energy counters. Helper method."""
+    return SimpleNamespace(
+        RealEnergyIn=SimpleNamespace(value=energy_in),
+        RealEnergyOut=SimpleNamespace(value=0),
+        ReactiveEnergyIn=SimpleNamespace(value=0),
+        ReactiveEnergyOut=SimpleNamespace(value=0),
+    )
+
+
+def test_rollup_statistic_id():
+    """Test the statistic ids are valid external statistic ids."""
+    assert (
+        rollup_statistic_id(_DEVICE_NUMBER, "ReactiveEnergyOut")
+        == f"{DOMAIN}:{_DEVICE_NUMBER}_reactive_energy_out"
+    )
+
+
+def test_rollup_statistics_metadata_without_mean_type(monkeypatch):
+    """Test the metadata has no mean type on cores which do not know it."""
+    publisher = RollupStatisticsPublisher(None, _DEVICE_NUMBER, EnergyRollups())
+    assert publisher._metadata("RealEnergyIn")["mean_type"] == StatisticMeanType.NONE
+
+    monkeypatch.setattr(energy_statistics, "StatisticMeanType", None)
+    metadata = publisher._metadata("RealEnergyIn")
+    assert "mean_type" not in metadata
+    assert metadata["has_mean"] is False
+
+
+@pytest.mark.asyncio
+async def test_rollup_statistics_continue_sum(recorder_mock, hass):
+    """Test the hourly rollups continue the sum of the last statistics."""
+    statistic_id = rollup_statistic_id(_DEVICE_NUMBER, "RealEnergyIn")
+    async_add_external_statistics(
+        hass,
+        {
+            "has_mean": False,
+            "mean_type": StatisticMeanType.NONE,
+            "has_sum": True,
+            "name": None,
+            "source": DOMAIN,
+            "statistic_id": statistic_id,
+            "unit_of_measurement": UnitOfEnergy.WATT_HOUR,
+        },
+        [{"start": datetime(2026, 1, 1, 9, tzinfo=UTC), "state": 990, "sum": 50}],
+    )
+    await async_wait_recording_done(hass)
+
+    rollups = EnergyRollups()
+    publisher = RollupStatisticsPublisher(hass, _DEVICE_NUMBER, rollups)
+    rollups.update(_START, _obisdata(1000))
+    rollups.update(_START + timedelta(minutes=1), _obisdata(1010))
+    rollups.update(_START + timedelta(minutes=2), _obisdata(1025))
+
+    # The hour finished before the last statistics were loaded.
+    publisher.async_publish(rollups.pop_finished())
+    await publisher.async_load()
+    await async_wait_recording_done(hass)
+
+    result = await recorder_mock.async_add_executor_job(
+        statistics_during_period,
+        hass,
+        datetime(2026, 1, 1, 9, tzinfo=UTC),
+        None,
+        {statistic_id},
+        "hour",
+        None,
+        {"state", "sum"},
+    )
+    assert [(row["state"], row["sum"]) for row in result[statistic_id]] == [
+        (990, 50),
+        (1010, 70),
+    ]
+    assert publisher.published == 4
@@ -0,0 +1,108 @@
+"""Tests the thread pool of the blocking reads."""
+import asyncio
+import threading
+
+import pytest
+
+from custom_components.smartmeter_austria.executor import SPARE_WORKERS, ReadExecutor
+
+
+@pytest.mark.asyncio
+async def test_read_executor_runs_in_own_thread():
+    """Test the function runs in a thread of the pool."""
+    executor = ReadExecutor(max_workers=1)
+    try:
+        name = await executor.async_run(lambda: threading.current_thread().name)
+    finally:
+        executor.shutdown()
+
+    assert name.startswith("smartmeter_austria_read")
+    assert executor.as_dict() == {
+        "max_workers": 1,
+        "readers": 0,
+        "queued": 0,
+        "running": 0,
+        "completed": 1,
+        "timeouts": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_read_executor_timeout_interrupts():
+    """Test a read which takes too long is interrupted and a waiting read is dropped."""
+    executor = ReadExecutor(max_workers=1)
+    stop = threading.Event()
+
+    try:
+        blocked = asyncio.ensure_future(
+            executor.async_run(lambda: stop.wait(5), stop.set, timeout=0.1))
+        waiting = asyncio.ensure_future(
+            executor.async_run(lambda: "never", timeout=0.05))
+
+        with pytest.raises(TimeoutError):
+            await waiting
+        with pytest.raises(TimeoutError):
+            await blocked
+
+        assert stop.is_set()
+        assert await executor.async_run(lambda: "next") == "next"
+    finally:
+        executor.shutdown()
+
+    assert executor.timeouts == 2
+    assert executor.queued == 0
+    assert executor.running == 0
+
+
+@pytest.mark.asyncio
+async def test_read_executor_shutdown_drops_waiting_reads():
+    """Test the reads dropped by the shutdown are not counted as queued."""
+    executor = ReadExecutor(max_workers=1)
+    stop = threading.Event()
+    blocked = asyncio.ensure_future(executor.async_run(lambda: stop.wait(5)))
+    waiting = [
+        asyncio.ensure_future(executor.async_run(lambda: "never")) for _ in range(3)
+    ]
+    await asyncio.sleep(0.05)
+    assert executor.queued == 3
+
+    executor.shutdown()
+    stop.set()
+    await blocked
+    await asyncio.gather(*waiting, return_exceptions=True)
+
+    assert executor.queued == 0
+    assert executor.completed == 1
+
+
+@pytest.mark.asyncio
+async def test_read_executor_thread_for_every_reader():
+    """Test the pool gets a thread for every meter whose reads block."""
+    executor = ReadExecutor(max_workers=2)
+    readers = [object() for _ in range(3)]
+    stop = threading.Event()
+
+    try:
+        for reader in readers:
+            executor.add_reader(reader)
+        executor.add_reader(readers[0])
+        assert executor.readers == 3
+        assert executor.max_workers == 3 + SPARE_WORKERS
+
+        # The reads of all meters block at the same time.
+        blocked = [
+            asyncio.ensure_future(executor.async_run(lambda: stop.wait(5)))
+            for _ in readers
+        ]
+        await asyncio.sleep(0.05)
+        assert executor.running == 3
+        assert await executor.async_run(lambda: "open") == "open"
+        stop.set()
+        await asyncio.gather(*blocked)
+
+        executor.remove_reader(readers[0])
+        assert executor.readers == 2
+        assert executor.max_workers == 3 + SPARE_WORKERS
+    finally:
+        stop.set()
+        executor.shutdown()
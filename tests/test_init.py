@@ -1,4 +1,7 @@
 """Test the component setup."""
+import asyncio
+from datetime import timedelta
+import time
 from unittest.mock import patch
 
 from homeassistant.exceptions import ConfigEntryNotReady
@@ -6,12 +9,13 @@ import pytest
 from pytest_homeassistant_custom_component.common import (
     MockConfigEntry,
     MockModule,
+    async_capture_events,
     mock_integration,
 )
 from serial.tools import list_ports_common
 from smartmeter_austria_energy.exceptions import SmartmeterSerialException
 from smartmeter_austria_energy.obisdata import ObisData, ObisValueBytes
-from smartmeter_austria_energy.supplier import SUPPLIER_EVN_NAME
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_EVN_NAME
 
 from custom_components.smartmeter_austria.__init__ import (
     async_options_update_listener,
@@ -21,10 +25,23 @@ from custom_components.smartmeter_austria.__init__ import (
 from custom_components.smartmeter_austria.const import (
     CONF_COM_PORT,
     CONF_KEY_HEX,
+    CONF_SHARED_PORT,
     CONF_SUPPLIER_NAME,
     DOMAIN,
+    EVENT_ANOMALY,
+    OPT_DATA_INTERVAL,
+    OPT_PUBLISH_UDP_TARGET,
+    OPT_SURPLUS_FILTER,
+    OPT_SURPLUS_WINDOW,
+    OPT_TARIFF_IMPORT_PRICE,
+    OPT_TARIFF_PEAK_HOURS,
+    OPT_TARIFF_PEAK_PRICE,
 )
 from custom_components.smartmeter_austria.coordinator import SmartmeterDataCoordinator
+from custom_components.smartmeter_austria.surplus import SurplusController
+from custom_components.smartmeter_austria.tariff import CostCalculator
+
+from .fake_meter import DEVICE_NUMBER, KEY_HEX, LoopingFakeSerial
 
 _COM_PORT = "/dev/ttyUSB1"
 _SUPPLIER_NAME = SUPPLIER_EVN_NAME
@@ -92,7 +109,10 @@ async def test_async_setup_entry_domain_not_loaded(hass):
                 "smartmeter_austria_energy.smartmeter.Smartmeter.read"
             ) as smartmeter_read_mock, patch(
                 "smartmeter_austria_energy.obisdata.ObisData"
-            ) as obis_data_mock:
+            ) as obis_data_mock, patch(
+                "custom_components.smartmeter_austria.adapter.supports_event_loop_reads",
+                return_value=False,
+            ):
                 with patch.object(ObisData, "DeviceNumber") as device_number_mock:
                     device_number_object = ObisValueBytes(device_nr)
                     device_number_mock.return_value = device_number_object
@@ -139,7 +159,10 @@ async def test_async_setup_entry_domain_loaded(hass):
                 "smartmeter_austria_energy.smartmeter.Smartmeter.read"
             ) as smartmeter_read_mock, patch(
                 "smartmeter_austria_energy.obisdata.ObisData"
-            ) as obis_data_mock:
+            ) as obis_data_mock, patch(
+                "custom_components.smartmeter_austria.adapter.supports_event_loop_reads",
+                return_value=False,
+            ):
                 with patch.object(ObisData, "DeviceNumber") as device_number_mock:
                     device_number_object = ObisValueBytes(device_nr)
                     device_number_mock.return_value = device_number_object
@@ -209,3 +232,262 @@ async def test_async_options_update_listener(hass):
 
         # assert
         method_mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_setup_entry_with_tariff(hass, enable_custom_integrations):
+    """Test the cost sensors are set up if a tariff is configured."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="my_unique_test_id",
+        data={
+            CONF_SUPPLIER_NAME: _SUPPLIER_NAME,
+            CONF_COM_PORT: _COM_PORT,
+            CONF_KEY_HEX: KEY_HEX,
+        },
+        options={
+            OPT_TARIFF_IMPORT_PRICE: 0.2,
+            OPT_TARIFF_PEAK_PRICE: 0.3,
+            OPT_TARIFF_PEAK_HOURS: "mon-fri 06:00-22:00",
+        },
+    )
+    config_entry.add_to_hass(hass)
+
+    with patch(
+        "serial.Serial",
+        side_effect=lambda **kwargs: LoopingFakeSerial(SUPPLIERS[_SUPPLIER_NAME]),
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = config_entry.runtime_data.coordinator
+        assert any(
+            isinstance(stage, CostCalculator) for stage in coordinator.pipeline.stages
+        )
+        assert coordinator.derived_values["current_import_price"] in (0.2, 0.3)
+        assert hass.states.get(
+            f"sensor.smart_meter_{DEVICE_NUMBER}_import_cost_today").state == "0.0"
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_async_options_update_listener_live(hass, enable_custom_integrations):
+    """Test the interval and the prices are applied without a reload."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="my_unique_test_id",
+        data={
+            CONF_SUPPLIER_NAME: _SUPPLIER_NAME,
+            CONF_COM_PORT: _COM_PORT,
+            CONF_KEY_HEX: KEY_HEX,
+        },
+        options={OPT_TARIFF_IMPORT_PRICE: 0.2},
+    )
+    config_entry.add_to_hass(hass)
+
+    with patch(
+        "serial.Serial",
+        side_effect=lambda **kwargs: LoopingFakeSerial(SUPPLIERS[_SUPPLIER_NAME]),
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = config_entry.runtime_data.coordinator
+
+        with patch(
+            "homeassistant.config_entries.ConfigEntries.async_reload"
+        ) as reload_mock:
+            hass.config_entries.async_update_entry(
+                config_entry,
+                options={OPT_DATA_INTERVAL: 5, OPT_TARIFF_IMPORT_PRICE: 0.25},
+            )
+            await hass.async_block_till_done()
+
+            reload_mock.assert_not_called()
+            assert config_entry.runtime_data.coordinator is coordinator
+            assert coordinator.update_interval == timedelta(seconds=5)
+
+            await coordinator.async_refresh()
+            assert coordinator.derived_values["current_import_price"] == 0.25
+
+            # A new publish target needs a reload.
+            hass.config_entries.async_update_entry(
+                config_entry,
+                options={
+                    OPT_DATA_INTERVAL: 5,
+                    OPT_TARIFF_IMPORT_PRICE: 0.25,
+                    OPT_PUBLISH_UDP_TARGET: "239.0.0.1:5000",
+                },
+            )
+            await hass.async_block_till_done()
+
+            reload_mock.assert_called_once()
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+class _AnomalyStage:
+    """Reports a consumption anomaly for every telegram. Helper class."""
+
+    def update(self, obisdata) -> dict:
+        """Return the anomaly."""
+        return {"consumption_anomaly": True, "consumption_baseline": 300.0}
+
+
+@pytest.mark.asyncio
+async def test_async_setup_entry_fires_anomaly_event(hass, enable_custom_integrations):
+    """Test an event is fired once when an anomaly starts."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="my_unique_test_id",
+        data={
+            CONF_SUPPLIER_NAME: _SUPPLIER_NAME,
+            CONF_COM_PORT: _COM_PORT,
+            CONF_KEY_HEX: KEY_HEX,
+        },
+    )
+    config_entry.add_to_hass(hass)
+    events = async_capture_events(hass, EVENT_ANOMALY)
+
+    with patch(
+        "serial.Serial",
+        side_effect=lambda **kwargs: LoopingFakeSerial(SUPPLIERS[_SUPPLIER_NAME]),
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        assert events == []
+
+        coordinator = config_entry.runtime_data.coordinator
+        coordinator.pipeline.stages.append(_AnomalyStage())
+        await coordinator.async_refresh()
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert len(events) == 1
+        assert events[0].data["device_number"] == DEVICE_NUMBER
+        assert events[0].data["type"] == "consumption_anomaly"
+        assert events[0].data["baseline"] == 300.0
+        assert hass.states.get(
+            f"binary_sensor.smart_meter_{DEVICE_NUMBER}_consumption_anomaly").state == "on"
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_async_setup_entry_with_surplus(hass, enable_custom_integrations):
+    """Test the surplus sensors are set up and the filter is changed without a reload."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="my_unique_test_id",
+        data={
+            CONF_SUPPLIER_NAME: _SUPPLIER_NAME,
+            CONF_COM_PORT: _COM_PORT,
+            CONF_KEY_HEX: KEY_HEX,
+        },
+        options={OPT_SURPLUS_FILTER: "ema"},
+    )
+    config_entry.add_to_hass(hass)
+
+    with patch(
+        "serial.Serial",
+        side_effect=lambda **kwargs: LoopingFakeSerial(SUPPLIERS[_SUPPLIER_NAME]),
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = config_entry.runtime_data.coordinator
+        assert any(
+            isinstance(stage, SurplusController) for stage in coordinator.pipeline.stages
+        )
+        assert hass.states.get(
+            f"sensor.smart_meter_{DEVICE_NUMBER}_surplus_setpoint").state == "0.0"
+
+        with patch(
+            "homeassistant.config_entries.ConfigEntries.async_reload"
+        ) as reload_mock:
+            hass.config_entries.async_update_entry(
+                config_entry,
+                options={OPT_SURPLUS_FILTER: "median", OPT_SURPLUS_WINDOW: 3},
+            )
+            await hass.async_block_till_done()
+
+            reload_mock.assert_not_called()
+
+            # Switching the controller off removes its sensors.
+            hass.config_entries.async_update_entry(config_entry, options={})
+            await hass.async_block_till_done()
+
+            reload_mock.assert_called_once()
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+class _SilencedFakeSerial(LoopingFakeSerial):
+    """Stops sending telegrams when silent is set, like a meter without power. Helper class."""
+
+    silent = False
+
+    @property
+    def in_waiting(self) -> int:
+        """Gets the number of bytes of the current telegram, none while silent."""
+        return 0 if self.silent else super().in_waiting
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("shared_port", [False, True])
+async def test_async_unload_entry_waiting_reads(hass, enable_custom_integrations, shared_port):
+    """Test the entries are unloaded right away while their reads wait for a telegram."""
+    device_numbers = {
+        "/dev/ttyUSB0": DEVICE_NUMBER,
+        "/dev/ttyUSB1": "210987654321",
+        "/dev/ttyUSB2": "109876543210",
+    }
+    config_entries = []
+    for com_port in device_numbers:
+        config_entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id=com_port,
+            data={
+                CONF_SUPPLIER_NAME: _SUPPLIER_NAME,
+                CONF_COM_PORT: com_port,
+                CONF_KEY_HEX: KEY_HEX,
+                CONF_SHARED_PORT: shared_port,
+            },
+        )
+        config_entry.add_to_hass(hass)
+        config_entries.append(config_entry)
+
+    with patch(
+        "serial.Serial",
+        side_effect=lambda **kwargs: _SilencedFakeSerial(
+            SUPPLIERS[_SUPPLIER_NAME], device_numbers[kwargs["port"]]),
+    ), patch.object(_SilencedFakeSerial, "silent", False):
+        assert await hass.config_entries.async_setup(config_entries[0].entry_id)
+        await hass.async_block_till_done()
+
+        _SilencedFakeSerial.silent = True
+        coordinators = [
+            config_entry.runtime_data.coordinator for config_entry in config_entries
+        ]
+        refreshes = [
+            hass.async_create_task(coordinator.async_refresh())
+            for coordinator in coordinators
+        ]
+        await asyncio.sleep(0.1)
+        # A refresh which read the telegrams received before the meters went
+        # silent is started again.
+        refreshes = [
+            hass.async_create_task(coordinator.async_refresh()) if refresh.done() else refresh
+            for coordinator, refresh in zip(coordinators, refreshes, strict=True)
+        ]
+        await asyncio.sleep(0.1)
+        assert not any(refresh.done() for refresh in refreshes)
+
+        started = time.monotonic()
+        for config_entry in config_entries:
+            assert await hass.config_entries.async_unload(config_entry.entry_id)
+        await asyncio.wait(refreshes, timeout=1)
+        elapsed = time.monotonic() - started
+
+    assert all(refresh.done() for refresh in refreshes)
+    assert elapsed < 1
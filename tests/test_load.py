@@ -0,0 +1,175 @@
+"""Load test of many meters against a Home Assistant core.
+
+The number of meters is set with SMARTMETER_LOAD_METERS (e.g. 100 or 1000),
+the default is small to keep the normal test run fast. If
+SMARTMETER_LOAD_REPORT is set, the measured values are written to this
+JSON file, so the scaling limits can be tracked between releases.
+"""
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from smartmeter_austria_energy.supplier import SUPPLIERS
+
+from custom_components.smartmeter_austria.const import (
+    CONF_COM_PORT,
+    CONF_KEY_HEX,
+    CONF_SHARED_PORT,
+    CONF_SUPPLIER_NAME,
+    DATA_READ_EXECUTOR,
+    DOMAIN,
+)
+
+from .fake_meter import KEY_HEX, LoopingFakeSerial
+
+LOAD_METERS = int(os.environ.get("SMARTMETER_LOAD_METERS", "3"))
+LOAD_REPORT = os.environ.get("SMARTMETER_LOAD_REPORT")
+
+# Number of telegrams read by every meter while the event loop is measured
+LOAD_ROUNDS = 3
+
+# Interval of the event loop lag probe in seconds
+LAG_PROBE_INTERVAL = 0.01
+
+
+class LoopMonitor:
+    """Measures the event loop lag and the executor queue depth."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._task: asyncio.Task | None = None
+        self.lags: list[float] = []
+        self.queue_depths: list[int] = []
+        self.read_queue_depths: list[int] = []
+
+    def start(self) -> None:
+        """Start the probe."""
+        self._task = self._hass.loop.create_task(self._probe())
+
+    async def stop(self) -> None:
+        """Stop the probe."""
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+    async def _probe(self) -> None:
+        """Measure how late the loop wakes up a sleeping task."""
+        executor = getattr(self._hass.loop, "_default_executor", None)
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.lags.append(time.perf_counter() - start - LAG_PROBE_INTERVAL)
+            if isinstance(executor, ThreadPoolExecutor):
+                self.queue_depths.append(executor._work_queue.qsize())
+            if (read_executor := self._hass.data.get(DOMAIN, {}).get(DATA_READ_EXECUTOR)) is not None:
+                self.read_queue_depths.append(read_executor.queued)
+
+
+def _config_entry(index: int) -> MockConfigEntry:
+    """Create the config entry of a meter, suppliers and adapters alternate."""
+    supplier_name = list(SUPPLIERS)[index % len(SUPPLIERS)]
+    return MockConfigEntry(
+        domain=DOMAIN,
+        unique_id=f"{index:012d}",
+        data={
+            CONF_SUPPLIER_NAME: supplier_name,
+            CONF_COM_PORT: f"/dev/ttyLOAD{index}",
+            CONF_KEY_HEX: KEY_HEX,
+            CONF_SHARED_PORT: index % 2 == 1,
+        },
+    )
+
+
+def _fake_serial(entries: dict[str, MockConfigEntry]):
+    """Create the fake meter of the opened port. Helper method."""
+
+    def open_serial(port: str, **kwargs) -> LoopingFakeSerial:
+        entry = entries[port]
+        return LoopingFakeSerial(
+            SUPPLIERS[entry.data[CONF_SUPPLIER_NAME]],
+            device_number=entry.unique_id,
+            port=port,
+            **kwargs,
+        )
+
+    return open_serial
+
+
+@pytest.mark.asyncio
+async def test_load_many_meters(hass, enable_custom_integrations):
+    """Set up many meters and measure the load of the telegrams."""
+
+    entries = {}
+    for index in range(LOAD_METERS):
+        entry = _config_entry(index)
+        entry.add_to_hass(hass)
+        entries[entry.data[CONF_COM_PORT]] = entry
+
+    monitor = LoopMonitor(hass)
+
+    with patch("serial.Serial", side_effect=_fake_serial(entries)):
+        tracemalloc.start()
+        try:
+            memory_start = tracemalloc.get_traced_memory()[0]
+            setup_start = time.perf_counter()
+            results = await asyncio.gather(
+                *(hass.config_entries.async_setup(entry.entry_id)
+                  for entry in entries.values())
+            )
+            await hass.async_block_till_done()
+            setup_time = time.perf_counter() - setup_start
+            memory = tracemalloc.get_traced_memory()[0] - memory_start
+        finally:
+            tracemalloc.stop()
+
+        assert all(results)
+        assert all(
+            entry.state is ConfigEntryState.LOADED for entry in entries.values()
+        )
+
+        coordinators = [entry.runtime_data.coordinator for entry in entries.values()]
+        monitor.start()
+        update_start = time.perf_counter()
+        for _ in range(LOAD_ROUNDS):
+            await asyncio.gather(
+                *(coordinator.async_refresh() for coordinator in coordinators)
+            )
+        await hass.async_block_till_done()
+        update_time = time.perf_counter() - update_start
+        await monitor.stop()
+
+        assert all(coordinator.last_update_success for coordinator in coordinators)
+        states = len(hass.states.async_all())
+
+        for entry in entries.values():
+            assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    report = {
+        "meters": LOAD_METERS,
+        "setup_time": setup_time,
+        "setup_time_per_entry": setup_time / LOAD_METERS,
+        "memory_per_entry": memory / LOAD_METERS,
+        "telegrams": LOAD_METERS * LOAD_ROUNDS,
+        "update_time_per_telegram": update_time / (LOAD_METERS * LOAD_ROUNDS),
+        "loop_lag_max": max(monitor.lags, default=0.0),
+        "loop_lag_mean": sum(monitor.lags) / max(len(monitor.lags), 1),
+        "executor_queue_depth_max": max(monitor.queue_depths, default=0),
+        "read_executor_queue_depth_max": max(monitor.read_queue_depths, default=0),
+        "states": states,
+    }
+    if LOAD_REPORT:
+        with open(LOAD_REPORT, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+
+    assert report["memory_per_entry"] > 0
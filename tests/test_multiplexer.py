@@ -0,0 +1,200 @@
+"""Tests the multiplexer of a shared serial line."""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+import serial
+from smartmeter_austria_energy.exceptions import (
+    SmartmeterSerialException,
+    SmartmeterTimeoutException,
+)
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_EVN_NAME
+
+from custom_components.smartmeter_austria.multiplexer import (
+    MultiplexedSmartmeter,
+    PortMultiplexer,
+)
+
+from .fake_meter import FakeSerial, telegram_bytes
+
+_COM_PORT = "/dev/ttyUSB1"
+_SUPPLIER = SUPPLIERS[SUPPLIER_EVN_NAME]
+_KEY_1 = "00112233445566778899AABBCCDDEEFF"
+_KEY_2 = "FFEEDDCCBBAA99887766554433221100"
+_TITLE_1 = b"KFM\x00\x00\x00\x00\x01"
+_TITLE_2 = b"KFM\x00\x00\x00\x00\x02"
+_TITLE_3 = b"KFM\x00\x00\x00\x00\x03"
+
+
+def _shared_line(count: int) -> bytes:
+    """Interleaved telegrams of two known and one unknown meter. Helper method."""
+    stream = b""
+    for i in range(count):
+        stream += telegram_bytes(
+            _SUPPLIER, key_hex=_KEY_1, system_title=_TITLE_1,
+            device_number="METER000001", power_in=100 + i)
+        stream += telegram_bytes(
+            _SUPPLIER, key_hex=_KEY_2, system_title=_TITLE_2,
+            device_number="METER000002", power_in=200 + i)
+        stream += telegram_bytes(
+            _SUPPLIER, key_hex=_KEY_2, system_title=_TITLE_3,
+            device_number="METER000003", power_in=300 + i)
+    return stream
+
+
+def test_multiplexer_routes_telegrams_by_system_title():
+    """Test each meter gets its own telegrams and the port is opened once."""
+    fake_serial = FakeSerial(_shared_line(1), chunk_size=1024)
+    with patch.object(serial, "Serial", return_value=fake_serial) as serial_mock:
+        multiplexer = PortMultiplexer(_COM_PORT, read_timeout=1)
+        meter1 = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_1)
+        meter2 = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_2)
+
+        obisdata1 = meter1.read()
+        obisdata2 = meter2.read()
+
+    assert obisdata1.DeviceNumber.value == "METER000001"
+    assert obisdata2.DeviceNumber.value == "METER000002"
+    assert meter1.system_title == _TITLE_1
+    assert meter2.system_title == _TITLE_2
+    assert multiplexer.unknown_telegrams == 1
+    serial_mock.assert_called_once()
+
+
+def test_multiplexer_returns_newest_telegram():
+    """Test a meter gets the newest telegram read from the line."""
+    fake_serial = FakeSerial(_shared_line(3), chunk_size=4096)
+    with patch.object(serial, "Serial", return_value=fake_serial):
+        multiplexer = PortMultiplexer(_COM_PORT, read_timeout=1)
+        meter1 = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_1)
+
+        obisdata = meter1.read()
+
+    assert obisdata.RealPowerIn.value == 102
+
+
+def test_multiplexer_reads_batch():
+    """Test a meter gets all telegrams read since its last read, oldest first."""
+    fake_serial = FakeSerial(_shared_line(3), chunk_size=4096)
+    with patch.object(serial, "Serial", return_value=fake_serial):
+        multiplexer = PortMultiplexer(_COM_PORT, read_timeout=1)
+        meter1 = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_1)
+        meter2 = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_2)
+
+        batch = meter1.read_batch()
+        obisdata2 = meter2.read()
+
+    assert [obisdata.RealPowerIn.value for obisdata in batch] == [100, 101, 102]
+    assert obisdata2.RealPowerIn.value == 202
+
+
+def test_multiplexer_concurrent_reads():
+    """Test meters reading at the same time from different threads."""
+    fake_serial = FakeSerial(_shared_line(5), chunk_size=32)
+    with patch.object(serial, "Serial", return_value=fake_serial):
+        multiplexer = PortMultiplexer(_COM_PORT, read_timeout=1)
+        meters = [
+            MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_1),
+            MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_2),
+        ]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(lambda meter: meter.read(), meters))
+
+    assert results[0].DeviceNumber.value == "METER000001"
+    assert results[1].DeviceNumber.value == "METER000002"
+
+
+def test_multiplexer_timeout():
+    """Test a timeout if the meter does not send telegrams."""
+    fake_serial = FakeSerial(b"")
+    with patch.object(serial, "Serial", return_value=fake_serial):
+        multiplexer = PortMultiplexer(_COM_PORT, read_timeout=0.1)
+        meter = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_1)
+
+        with pytest.raises(SmartmeterTimeoutException):
+            meter.read()
+
+
+def test_multiplexer_interrupt_before_read():
+    """Test an interrupt which arrives before the read starts stops the read."""
+    fake_serial = FakeSerial(b"")
+    with patch.object(serial, "Serial", return_value=fake_serial):
+        multiplexer = PortMultiplexer(_COM_PORT, read_timeout=5)
+        meter = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_1)
+
+        meter.interrupt()
+        started = time.monotonic()
+        with pytest.raises(SmartmeterTimeoutException):
+            meter.read()
+
+    assert time.monotonic() - started < 0.5
+    # The interrupt was observed, it does not stop the next read.
+    assert not meter.interrupted
+
+
+def test_multiplexer_serial_exception():
+    """Test a serial exception if the port cannot be opened."""
+    with patch.object(serial, "Serial", side_effect=serial.SerialException()):
+        multiplexer = PortMultiplexer(_COM_PORT, read_timeout=0.1)
+        meter = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_1)
+
+        with pytest.raises(SmartmeterSerialException):
+            meter.read()
+
+
+def test_multiplexer_register_takes_lock():
+    """Test a meter is registered while no other thread reads the line."""
+    multiplexer = PortMultiplexer(_COM_PORT)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with multiplexer._lock:
+            registering = executor.submit(
+                MultiplexedSmartmeter, multiplexer, _SUPPLIER, _KEY_1)
+            time.sleep(0.05)
+            assert multiplexer.meters == []
+        meter = registering.result(timeout=1)
+
+    assert multiplexer.meters == [meter]
+
+
+def test_multiplexer_closes_port_with_last_meter():
+    """Test the port is closed after the last meter was unregistered."""
+    fake_serial = FakeSerial(_shared_line(1), chunk_size=1024)
+    with patch.object(serial, "Serial", return_value=fake_serial):
+        multiplexer = PortMultiplexer(_COM_PORT, read_timeout=1)
+        meter1 = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_1)
+        meter2 = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_2)
+        meter1.read()
+
+        meter1.close()
+        assert fake_serial.is_open
+        meter2.close()
+
+    assert not fake_serial.is_open
+    assert multiplexer.meters == []
+
+
+
+def test_multiplexer_close_interrupts_read():
+    """Test closing a meter wakes its blocking serial read right away."""
+    master, slave = os.openpty()
+    try:
+        multiplexer = PortMultiplexer(os.ttyname(slave))
+        meter = MultiplexedSmartmeter(multiplexer, _SUPPLIER, _KEY_1)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            read = executor.submit(meter.read)
+            time.sleep(0.2)
+
+            started = time.monotonic()
+            meter.close()
+            with pytest.raises(SmartmeterTimeoutException):
+                read.result(timeout=1)
+            elapsed = time.monotonic() - started
+    finally:
+        os.close(master)
+        os.close(slave)
+
+    # The serial read timeout is 1 s.
+    assert elapsed < 0.5
+    assert multiplexer.meters == []
@@ -0,0 +1,137 @@
+"""Tests the network serial bridge transport."""
+import asyncio
+
+import pytest
+from smartmeter_austria_energy.exceptions import (
+    SmartmeterSerialException,
+    SmartmeterTimeoutException,
+)
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_TINETZ_NAME
+
+from custom_components.smartmeter_austria.network import (
+    NetworkSmartmeter,
+    is_network_port,
+    is_serial_url,
+    parse_network_port,
+)
+
+from .fake_meter import DEVICE_NUMBER, KEY_HEX, telegram_bytes
+
+_SUPPLIER = SUPPLIERS[SUPPLIER_TINETZ_NAME]
+
+
+async def _start_bridge(payloads: list[bytes], close: bool = False):
+    """Start a local TCP server standing in for a serial bridge. Helper method."""
+
+    async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        for payload in payloads:
+            writer.write(payload)
+            await writer.drain()
+            await asyncio.sleep(0.01)
+        if close:
+            writer.close()
+            return
+        await reader.read()
+
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_port_types():
+    """Test the detection of the port types."""
+    assert is_network_port("socket://192.168.1.20:2000")
+    assert is_network_port("tcp://bridge.local:2000")
+    assert not is_network_port("/dev/ttyUSB0")
+    assert not is_network_port("rfc2217://192.168.1.20:2000")
+    assert is_serial_url("rfc2217://192.168.1.20:2000")
+    assert not is_serial_url("/dev/ttyUSB0")
+
+
+def test_parse_network_port():
+    """Test parsing of valid and invalid bridge URLs."""
+    assert parse_network_port("socket://192.168.1.20:2000") == ("192.168.1.20", 2000)
+
+    for port in ("socket://192.168.1.20", "/dev/ttyUSB0", "http://host:80"):
+        with pytest.raises(ValueError):
+            parse_network_port(port)
+
+
+@pytest.mark.asyncio
+async def test_network_smartmeter_read(socket_enabled):
+    """Test telegrams are read from the bridge, split into several chunks."""
+    telegram = telegram_bytes(_SUPPLIER, power_in=4321)
+    server, port = await _start_bridge([telegram[:100], telegram[100:]])
+    adapter = NetworkSmartmeter(_SUPPLIER, f"socket://127.0.0.1:{port}", KEY_HEX)
+    try:
+        obisdata = await adapter.async_read()
+    finally:
+        adapter.close()
+        server.close()
+        await server.wait_closed()
+
+    assert obisdata.DeviceNumber.value == DEVICE_NUMBER
+    assert obisdata.RealPowerIn.value == 4321
+
+
+@pytest.mark.asyncio
+async def test_network_smartmeter_keeps_connection(socket_enabled):
+    """Test the connection is reused for the next telegram."""
+    telegrams = [telegram_bytes(_SUPPLIER, power_in=i) for i in (1, 2)]
+    server, port = await _start_bridge(telegrams)
+    adapter = NetworkSmartmeter(_SUPPLIER, f"tcp://127.0.0.1:{port}", KEY_HEX)
+    try:
+        first = await adapter.async_read()
+        await asyncio.sleep(0.05)
+        second = await adapter.async_read()
+    finally:
+        adapter.close()
+        server.close()
+        await server.wait_closed()
+
+    assert first.RealPowerIn.value in (1, 2)
+    assert second.RealPowerIn.value == 2
+
+
+@pytest.mark.asyncio
+async def test_network_smartmeter_read_batch(socket_enabled):
+    """Test all telegrams received since the last read are returned."""
+    telegrams = [telegram_bytes(_SUPPLIER, power_in=i) for i in (1, 2, 3)]
+    server, port = await _start_bridge([b"".join(telegrams)])
+    adapter = NetworkSmartmeter(_SUPPLIER, f"socket://127.0.0.1:{port}", KEY_HEX)
+    try:
+        batch = await adapter.async_read_batch()
+    finally:
+        adapter.close()
+        server.close()
+        await server.wait_closed()
+
+    assert [obisdata.RealPowerIn.value for obisdata in batch] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_network_smartmeter_timeout(socket_enabled):
+    """Test a timeout if the bridge does not send telegrams."""
+    server, port = await _start_bridge([])
+    adapter = NetworkSmartmeter(
+        _SUPPLIER, f"socket://127.0.0.1:{port}", KEY_HEX, read_timeout=0.1)
+    try:
+        with pytest.raises(SmartmeterTimeoutException):
+            await adapter.async_read()
+    finally:
+        adapter.close()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_network_smartmeter_connection_closed(socket_enabled):
+    """Test a serial exception if the bridge closes the connection."""
+    server, port = await _start_bridge([b"\x00"], close=True)
+    adapter = NetworkSmartmeter(_SUPPLIER, f"socket://127.0.0.1:{port}", KEY_HEX)
+    try:
+        with pytest.raises(SmartmeterSerialException):
+            await adapter.async_read()
+    finally:
+        adapter.close()
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,66 @@
+"""Tests the registry of the OBIS values shown as sensors."""
+from smartmeter_austria_energy.supplier import (
+    SUPPLIER_EVN_NAME,
+    SUPPLIER_TINETZ_NAME,
+    SUPPLIERS,
+    Supplier,
+)
+
+from custom_components.smartmeter_austria.obis_registry import (
+    OBIS_FIELDS,
+    SUPPLIER_CATALOGUES,
+    build_catalogue,
+    supplier_catalogue,
+    supplier_extra_fields,
+)
+from custom_components.smartmeter_austria.sensor_descriptions import (
+    SENSOR_DESCRIPTIONS,
+)
+
+
+def test_obis_field_codes():
+    """Test the OBIS codes match the codes of the library."""
+    assert OBIS_FIELDS["VoltageL1"].obis_bytes == bytes([1, 0, 32, 7, 0, 255])
+    assert OBIS_FIELDS["RealPowerDelta"].obis_bytes is None
+    assert OBIS_FIELDS["RealPowerIn"].library
+    assert not OBIS_FIELDS["Factor"].library
+
+
+def test_supplier_catalogue():
+    """Test the catalogue contains the supplied and the calculated values."""
+    evn = [field.sensor_id for field in SUPPLIER_CATALOGUES[SUPPLIER_EVN_NAME]]
+    tinetz = [field.sensor_id for field in SUPPLIER_CATALOGUES[SUPPLIER_TINETZ_NAME]]
+
+    assert "RealPowerDelta" in evn
+    assert "Factor" in evn
+    assert "ReactiveEnergyIn" not in evn
+    assert "ReactiveEnergyIn" in tinetz
+    assert "DeviceNumber" not in tinetz
+    assert supplier_catalogue(SUPPLIERS[SUPPLIER_EVN_NAME]) is SUPPLIER_CATALOGUES[
+        SUPPLIER_EVN_NAME
+    ]
+    assert [field.sensor_id for field in supplier_extra_fields(SUPPLIERS[SUPPLIER_EVN_NAME])] == [
+        "Factor"
+    ]
+
+
+def test_build_catalogue_new_values():
+    """Test a declared value shows up once a supplier sends it."""
+    class _Supplier(Supplier):
+        """Supplier with additional values. Helper class."""
+
+        name = "NEW"
+        supplied_values = ["RealPowerIn", "Frequency", "Unknown"]
+
+    catalogue = supplier_catalogue(_Supplier())
+
+    assert [field.sensor_id for field in catalogue] == ["RealPowerIn", "Frequency"]
+    assert build_catalogue(["RealPowerIn", "RealPowerOut"])[-1].sensor_id == "RealPowerDelta"
+
+
+def test_sensor_descriptions_generated():
+    """Test a description is generated for every declared value."""
+    assert SENSOR_DESCRIPTIONS.keys() == OBIS_FIELDS.keys()
+    assert SENSOR_DESCRIPTIONS["Factor"].device_class == "power_factor"
+    assert SENSOR_DESCRIPTIONS["Frequency"].native_unit_of_measurement == "Hz"
+    assert SENSOR_DESCRIPTIONS["VoltageL1"].key == "voltagel1"
@@ -0,0 +1,126 @@
+"""Tests the telegram pipeline."""
+from datetime import UTC, datetime, timedelta
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from smartmeter_austria_energy.constants import PhysicalUnits
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.obisvalue import ObisValueFloat
+
+from custom_components.smartmeter_austria.pipeline import (
+    TelegramClock,
+    TelegramPipeline,
+    encode_telegram,
+    parse_udp_target,
+    telegram_message,
+)
+
+_DEVICE_NUMBER = "DEVICE_NUMBER"
+
+
+def _obisdata() -> ObisData:
+    """Create a telegram with some values. Helper method."""
+    obisdata = ObisData(dec=None, wanted_values=[])
+    obisdata.RealPowerIn = ObisValueFloat(1500, PhysicalUnits.W)
+    obisdata.RealPowerOut = ObisValueFloat(500, PhysicalUnits.W)
+    obisdata.VoltageL1 = ObisValueFloat(2301, PhysicalUnits.V, -1)
+    return obisdata
+
+
+def test_pipeline_merges_stage_values():
+    """Test the values of all stages are kept."""
+    first = MagicMock()
+    first.update.return_value = {"a": 1.0}
+    second = MagicMock()
+    second.update.return_value = {"b": 2.0}
+    pipeline = TelegramPipeline([first, second])
+
+    result = pipeline.process(_obisdata())
+
+    assert result == {"a": 1.0, "b": 2.0}
+    assert pipeline.values is result
+
+
+def test_pipeline_stage_error():
+    """Test a failing stage does not stop the other stages."""
+    failing = MagicMock()
+    failing.update.side_effect = ValueError()
+    stage = MagicMock()
+    stage.update.return_value = {"b": 2.0}
+    pipeline = TelegramPipeline([failing, stage])
+
+    assert pipeline.process(_obisdata()) == {"b": 2.0}
+
+
+def test_pipeline_process_batch():
+    """Test every stage gets all telegrams of a batch, the newest values are kept."""
+    stage = MagicMock()
+    stage.update.side_effect = lambda obisdata: {"p": obisdata.RealPowerIn.value}
+    pipeline = TelegramPipeline([stage])
+    batch = [_obisdata(), _obisdata()]
+    batch[-1].RealPowerIn = ObisValueFloat(2000, PhysicalUnits.W)
+
+    assert pipeline.process_batch(batch) == [{"p": 1500}, {"p": 2000}]
+    assert pipeline.values == {"p": 2000}
+    assert stage.update.call_count == 2
+
+
+def test_pipeline_clock():
+    """Test the stages get the time of each telegram, one push period apart in a batch."""
+    now = datetime(2026, 1, 5, 10, tzinfo=UTC)
+    clock = TelegramClock(lambda: now, push_period=5)
+    moments = []
+    stage = MagicMock()
+    stage.update.side_effect = lambda obisdata: moments.append(clock()) or {}
+    pipeline = TelegramPipeline([stage], clock)
+
+    pipeline.process_batch([_obisdata(), _obisdata(), _obisdata()])
+    pipeline.process(_obisdata(), backlog=1)
+
+    assert moments == [
+        now - timedelta(seconds=10),
+        now - timedelta(seconds=5),
+        now,
+        now - timedelta(seconds=5),
+    ]
+    assert clock() == now
+
+
+def test_telegram_message_with_values():
+    """Test calculated values are added to the message."""
+    message = telegram_message(_obisdata(), _DEVICE_NUMBER, {"voltage_imbalance": 1.5})
+
+    assert message["p_in"] == 1500
+    assert message["voltage_imbalance"] == 1.5
+
+
+def test_parse_udp_target():
+    """Test parsing of valid and invalid UDP targets."""
+    assert parse_udp_target("239.1.2.3:5005") == ("239.1.2.3", 5005)
+    assert parse_udp_target("[::1]:5005") == ("::1", 5005)
+
+    for udp_target in ("239.1.2.3", ":5005", "host:abc", "host:70000"):
+        with pytest.raises(ValueError):
+            parse_udp_target(udp_target)
+
+
+def test_encode_telegram():
+    """Test the compact message contains the values of the telegram."""
+    message = json.loads(encode_telegram(_obisdata(), _DEVICE_NUMBER))
+
+    assert message["dev"] == _DEVICE_NUMBER
+    assert message["p_in"] == 1500
+    assert message["p_out"] == 500
+    assert message["p_delta"] == 1000
+    assert message["u1"] == pytest.approx(230.1)
+    assert message["ts"] > 0
+
+
+def test_encode_telegram_with_values():
+    """Test calculated values are added to the message."""
+    message = json.loads(
+        encode_telegram(_obisdata(), _DEVICE_NUMBER, {"surplus_setpoint": 1200.0}))
+
+    assert message["p_in"] == 1500
+    assert message["surplus_setpoint"] == 1200.0
@@ -0,0 +1,75 @@
+"""Tests the profiler of the update cycles."""
+import cProfile
+import threading
+import tracemalloc
+
+import pytest
+
+from custom_components.smartmeter_austria.profiler import UpdateProfiler
+
+
+def _work() -> list[bytes]:
+    """Allocate and burn some time. Helper method."""
+    return [bytes(1000) for _ in range(100)]
+
+
+def test_update_profiler(tmp_path):
+    """Test the cycles are profiled and the report is written."""
+    path = tmp_path / "profile.txt"
+    profiler = UpdateProfiler(str(path), cycles=2)
+
+    kept = []
+    for _ in range(2):
+        assert not profiler.finished
+        profiler.start_memory()
+        profiler.start()
+        kept.append(_work())
+        profiler.stop()
+
+    assert profiler.finished
+    assert tracemalloc.is_tracing()
+    profiler.stop_memory()
+    assert profiler.cycles_done == 2
+    assert not tracemalloc.is_tracing()
+
+    summary = profiler.summary()
+    assert summary["cycles"] == 2
+    assert any("_work" in function["function"] for function in summary["functions"])
+    assert summary["memory"]
+
+    profiler.write()
+    report = path.read_text(encoding="utf-8")
+    assert report.startswith("2 update cycles")
+    assert "_work" in report
+    assert "Allocations since the first cycle" in report
+
+
+def test_update_profiler_thread(tmp_path):
+    """Test a function run in another thread is profiled too."""
+    profiler = UpdateProfiler(str(tmp_path / "profile.txt"), cycles=1, memory=False)
+
+    profiler.start()
+    thread = threading.Thread(target=_work)
+    thread.start()
+    thread.join()
+    profiler.stop()
+
+    summary = profiler.summary()
+    assert any("_work" in function["function"] for function in summary["functions"])
+    assert summary["memory"] == []
+
+
+def test_update_profiler_other_profiler_active(tmp_path):
+    """Test a cycle cannot be started while another profiler is active."""
+    profiler = UpdateProfiler(str(tmp_path / "profile.txt"), cycles=1)
+    profiler.start_memory()
+    other = cProfile.Profile()
+    other.enable()
+    try:
+        with pytest.raises(ValueError):
+            profiler.start()
+    finally:
+        other.disable()
+        profiler.stop_memory()
+
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,80 @@
+"""Tests the telegram publisher."""
+import asyncio
+import json
+import socket
+from unittest.mock import patch
+
+import pytest
+from smartmeter_austria_energy.constants import PhysicalUnits
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.obisvalue import ObisValueFloat
+
+from custom_components.smartmeter_austria.publisher import TelegramPublisher
+
+_DEVICE_NUMBER = "DEVICE_NUMBER"
+
+
+def _obisdata() -> ObisData:
+    """Create a telegram with some values. Helper method."""
+    obisdata = ObisData(dec=None, wanted_values=[])
+    obisdata.RealPowerIn = ObisValueFloat(1500, PhysicalUnits.W)
+    obisdata.RealPowerOut = ObisValueFloat(500, PhysicalUnits.W)
+    obisdata.VoltageL1 = ObisValueFloat(2301, PhysicalUnits.V, -1)
+    return obisdata
+
+
+@pytest.mark.asyncio
+async def test_publisher_udp(hass, socket_enabled):
+    """Test one UDP datagram is sent per published telegram."""
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setblocking(False)
+    port = receiver.getsockname()[1]
+
+    publisher = TelegramPublisher(
+        hass, _DEVICE_NUMBER, udp_target=f"127.0.0.1:{port}")
+    try:
+        await publisher.async_start()
+        await publisher.async_publish(_obisdata())
+
+        datagram = await asyncio.wait_for(
+            hass.loop.sock_recv(receiver, 4096), timeout=5)
+    finally:
+        publisher.stop()
+        receiver.close()
+
+    assert json.loads(datagram)["dev"] == _DEVICE_NUMBER
+    assert publisher.published == 1
+    assert publisher.failed == 0
+
+
+@pytest.mark.asyncio
+async def test_publisher_mqtt(hass):
+    """Test the telegram is published to the MQTT topic."""
+    hass.config.components.add("mqtt")
+    publisher = TelegramPublisher(hass, _DEVICE_NUMBER, mqtt_topic="meter/1")
+
+    with patch(
+        "homeassistant.components.mqtt.async_publish"
+    ) as publish_mock:
+        await publisher.async_publish(_obisdata())
+
+    publish_mock.assert_called_once()
+    assert publish_mock.call_args.args[1] == "meter/1"
+    assert publisher.published == 1
+
+
+@pytest.mark.asyncio
+async def test_publisher_mqtt_error_is_counted(hass):
+    """Test a failing publish is counted and not raised."""
+    hass.config.components.add("mqtt")
+    publisher = TelegramPublisher(hass, _DEVICE_NUMBER, mqtt_topic="meter/1")
+
+    with patch(
+        "homeassistant.components.mqtt.async_publish"
+    ) as publish_mock:
+        publish_mock.side_effect = Exception()
+        await publisher.async_publish(_obisdata())
+
+    assert publisher.published == 0
+    assert publisher.failed == 1
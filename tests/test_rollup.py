@@ -0,0 +1,73 @@
+"""Tests the rollups of the energy counters."""
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+from custom_components.smartmeter_austria.rollup import (
+    CounterRollup,
+    EnergyRollups,
+    period_start,
+)
+
+_START = datetime(2026, 1, 1, 10, 58, 30, tzinfo=UTC)
+
+
+def _obisdata(energy_in: float, energy_out: float = 0) -> SimpleNamespace:
+    """Telegram with the energy counters. Helper method."""
+    return SimpleNamespace(
+        RealEnergyIn=SimpleNamespace(value=energy_in),
+        RealEnergyOut=SimpleNamespace(value=energy_out),
+        ReactiveEnergyIn=SimpleNamespace(value=0),
+        ReactiveEnergyOut=SimpleNamespace(value=0),
+    )
+
+
+def test_period_start():
+    """Test the periods start at the full 5 minutes and hours in UTC."""
+    assert period_start(_START, 300) == datetime(2026, 1, 1, 10, 55, tzinfo=UTC)
+    assert period_start(_START, 3600) == datetime(2026, 1, 1, 10, tzinfo=UTC)
+
+
+def test_counter_rollup():
+    """Test the periods keep the counter and the sum at their last telegram."""
+    rollup = CounterRollup(3600)
+
+    assert rollup.update(_START, 1000) is None
+    assert rollup.update(_START + timedelta(minutes=1), 1010) is None
+    # The first telegram of the next hour finishes the period.
+    finished = rollup.update(_START + timedelta(minutes=2), 1025)
+
+    assert finished.start == datetime(2026, 1, 1, 10, tzinfo=UTC)
+    assert (finished.state, finished.sum, finished.increase) == (1010, 10, 10)
+    assert rollup.current.start == datetime(2026, 1, 1, 11, tzinfo=UTC)
+    assert (rollup.current.sum, rollup.current.increase) == (25, 15)
+    assert rollup.first_state == 1000
+    assert list(rollup.finished) == [finished]
+
+
+def test_counter_rollup_reset():
+    """Test a counter which went backwards was reset, e.g. the meter was replaced."""
+    rollup = CounterRollup(300)
+    rollup.update(_START, 1000)
+    rollup.update(_START + timedelta(seconds=5), 20)
+
+    assert rollup.current.sum == 20
+
+
+def test_energy_rollups():
+    """Test the finished hours are taken once and 5 minute periods are reported."""
+    rollups = EnergyRollups(history=2)
+
+    assert not rollups.update(_START, _obisdata(1000, 50))
+    assert not rollups.update(_START + timedelta(seconds=60), _obisdata(1004, 50))
+    assert rollups.update(_START + timedelta(seconds=120), _obisdata(1010, 51))
+
+    finished = rollups.pop_finished()
+    assert list(finished) == ["RealEnergyIn", "RealEnergyOut", "ReactiveEnergyIn", "ReactiveEnergyOut"]
+    assert finished["RealEnergyIn"][0].sum == 4
+    assert rollups.pop_finished() == {}
+
+    # Not more than the history is kept if nobody takes the periods.
+    for hour in range(1, 5):
+        rollups.update(_START + timedelta(hours=hour), _obisdata(1010 + hour))
+    assert len(rollups.pop_finished()["RealEnergyIn"]) == 2
+    assert len(rollups.as_dict()["RealEnergyIn"]["3600s"]) == 3
@@ -1,35 +1,48 @@
 """Tests the smartmeter sensors."""
+from datetime import UTC, datetime, timedelta
 from unittest.mock import patch
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.config_entries import ConfigEntryDisabler
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+import homeassistant.util.dt as dt_util
 import pytest
 from pytest_homeassistant_custom_component.common import (
     MockConfigEntry,
     MockModule,
+    async_fire_time_changed,
     mock_integration,
 )
 from serial.tools import list_ports_common
 import serial.tools.list_ports
 from smartmeter_austria_energy.obisdata import ObisData, ObisValueBytes
 from smartmeter_austria_energy.smartmeter import Smartmeter
-from smartmeter_austria_energy.supplier import SUPPLIER_EVN_NAME
+from smartmeter_austria_energy.supplier import SUPPLIER_EVN_NAME, SUPPLIERS
 
 from custom_components.smartmeter_austria.config_flow import SmartmeterConfigFlow
 from custom_components.smartmeter_austria.const import (
     CONF_COM_PORT,
     CONF_KEY_HEX,
+    CONF_SHARED_PORT,
     CONF_SUPPLIER_NAME,
+    DATA_AGGREGATE,
+    DATA_AGGREGATE_OWNER,
     DOMAIN,
+    OPT_AGGREGATE_INTERVAL,
 )
 from custom_components.smartmeter_austria.coordinator import SmartmeterDataCoordinator
 from custom_components.smartmeter_austria.sensor import (
     Sensor,
+    SmartmeterCostSensor,
+    SmartmeterDerivedSensor,
     SmartmeterSensor,
     async_setup_entry,
 )
 from custom_components.smartmeter_austria.smartmeter_data import SmartMeterData
+from custom_components.smartmeter_austria.tariff import CostCalculator, TariffSchedule
+
+from .fake_meter import DEVICE_NUMBER, KEY_HEX, LoopingFakeSerial
 
 _COM_PORT = "/dev/ttyUSB1"
 _SERIAL_NUMBER = "DEVICE_NUMBER"
@@ -182,3 +195,155 @@ def test_smartsensor_entity_registry_native_value_property(hass):
         result = smartsensor.native_value
 
     assert result is not None
+
+
+def test_smartmeter_derived_sensor_native_value(hass):
+    """Test the derived sensor returns the calculated value."""
+    with patch("smartmeter_austria_energy.smartmeter.Smartmeter") as smartmeter_mock:
+        coordinator = SmartmeterDataCoordinator(hass, adapter=smartmeter_mock)
+        device_info = DeviceInfo()
+        device_number = "number 1"
+
+        derived_sensor = SmartmeterDerivedSensor(
+            coordinator, device_info, device_number, "voltage_imbalance")
+
+        assert derived_sensor.native_value is None
+        coordinator.derived_values["voltage_imbalance"] = 1.5
+
+        result = derived_sensor.native_value
+
+    assert result == 1.5
+    assert derived_sensor.unique_id == f"{DOMAIN}_number 1_voltage_imbalance"
+    assert derived_sensor.entity_registry_enabled_default is False
+
+
+def test_smartmeter_derived_sensor_cost(hass):
+    """Test the cost sensors use their own descriptions and reset with the day."""
+    today = datetime(2026, 1, 5, tzinfo=UTC)
+    cost_calculator = CostCalculator(TariffSchedule(0.20), now=lambda: today)
+    cost_calculator.restore({"day": [2026, 1, 5], "month": [2026, 1]})
+    with patch("smartmeter_austria_energy.smartmeter.Smartmeter") as smartmeter_mock:
+        coordinator = SmartmeterDataCoordinator(hass, adapter=smartmeter_mock)
+        coordinator.derived_values["import_cost_today"] = 1.25
+
+        cost_sensor = SmartmeterCostSensor(
+            coordinator, DeviceInfo(), "number 1", "import_cost_today", cost_calculator)
+
+    assert cost_sensor.native_value == 1.25
+    assert cost_sensor.entity_registry_enabled_default is True
+    assert cost_sensor.state_class is SensorStateClass.TOTAL
+    assert cost_sensor.last_reset == today
+
+
+@pytest.mark.parametrize(
+    ("shared_port", "event_loop_reads", "power_factor"),
+    [(False, True, "0.998"), (True, True, "0.998"), (False, False, None)],
+)
+async def test_async_setup_entry_supplier_catalogue(
+    hass, enable_custom_integrations, shared_port, event_loop_reads, power_factor
+):
+    """Test the sensors of the supplier's values are added.
+
+    The power factor is decoded by the readers of the integration only, not
+    by the library's read, which is the fallback of local ports.
+    """
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="my_unique_test_id",
+        data={
+            CONF_SUPPLIER_NAME: _SUPPLIER_NAME,
+            CONF_COM_PORT: _COM_PORT,
+            CONF_KEY_HEX: KEY_HEX,
+            CONF_SHARED_PORT: shared_port,
+        },
+    )
+    config_entry.add_to_hass(hass)
+
+    with patch(
+        "serial.Serial",
+        side_effect=lambda **kwargs: LoopingFakeSerial(SUPPLIERS[_SUPPLIER_NAME]),
+    ), patch(
+        "custom_components.smartmeter_austria.adapter.supports_event_loop_reads",
+        return_value=event_loop_reads,
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        def _state(name: str) -> str | None:
+            """Get the state of a sensor of the meter. Helper method."""
+            state = hass.states.get(f"sensor.smart_meter_{DEVICE_NUMBER}_{name}")
+            return None if state is None else state.state
+
+        assert float(_state("real_power_delta")) == (
+            float(_state("real_power_in")) - float(_state("real_power_out")))
+        assert _state("power_factor") == power_factor
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_async_setup_entry_aggregate(hass, enable_custom_integrations):
+    """Test the building totals sum the newest telegrams of all meters."""
+    device_numbers = {"/dev/ttyUSB0": DEVICE_NUMBER, "/dev/ttyUSB1": "210987654321"}
+    config_entries = []
+    for com_port, device_number in device_numbers.items():
+        config_entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id=device_number,
+            data={
+                CONF_SUPPLIER_NAME: _SUPPLIER_NAME,
+                CONF_COM_PORT: com_port,
+                CONF_KEY_HEX: KEY_HEX,
+            },
+            options={OPT_AGGREGATE_INTERVAL: 5} if not config_entries else {},
+        )
+        config_entry.add_to_hass(hass)
+        config_entries.append(config_entry)
+
+    with patch(
+        "serial.Serial",
+        side_effect=lambda **kwargs: LoopingFakeSerial(
+            SUPPLIERS[_SUPPLIER_NAME], device_numbers[kwargs["port"]]),
+    ):
+        # All entries of the domain are set up.
+        assert await hass.config_entries.async_setup(config_entries[0].entry_id)
+        await hass.async_block_till_done()
+
+        def _total(name: str) -> str | None:
+            """Get the state of a building total. Helper method."""
+            state = hass.states.get(f"sensor.smart_meter_building_totals_{name}")
+            return None if state is None else state.state
+
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=6))
+        await hass.async_block_till_done()
+        assert float(_total("real_energy_in")) == 2_000_000
+        assert float(_total("real_power_delta")) == (
+            float(_total("real_power_in")) - float(_total("real_power_out")))
+
+        # The totals are shown by one entry only, the others keep updating
+        # them. An unloaded meter keeps its counters, so the energy does not drop.
+        power_in = float(_total("real_power_in"))
+        assert await hass.config_entries.async_unload(config_entries[1].entry_id)
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=12))
+        await hass.async_block_till_done()
+        assert float(_total("real_energy_in")) == 2_000_000
+        assert float(_total("real_power_in")) < power_in
+
+        # Reloading the entry which shows the totals keeps the counters of
+        # the unloaded meter.
+        aggregate = hass.data[DOMAIN][DATA_AGGREGATE]
+        assert await hass.config_entries.async_reload(config_entries[0].entry_id)
+        await hass.async_block_till_done()
+        assert hass.data[DOMAIN][DATA_AGGREGATE] is aggregate
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=15))
+        await hass.async_block_till_done()
+        assert float(_total("real_energy_in")) == 2_000_000
+
+        # A disabled meter does not count any longer.
+        assert await hass.config_entries.async_set_disabled_by(
+            config_entries[1].entry_id, ConfigEntryDisabler.USER)
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=18))
+        await hass.async_block_till_done()
+        assert float(_total("real_energy_in")) == 1_000_000
+
+        assert await hass.config_entries.async_unload(config_entries[0].entry_id)
+        assert DATA_AGGREGATE_OWNER not in hass.data[DOMAIN]
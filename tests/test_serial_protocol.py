@@ -0,0 +1,121 @@
+"""Tests the reads of local serial ports on the event loop."""
+import asyncio
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+import serial
+from smartmeter_austria_energy.exceptions import SmartmeterSerialException
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_EVN_NAME
+
+from custom_components.smartmeter_austria.executor import ReadExecutor
+from custom_components.smartmeter_austria.serial_protocol import SerialSmartmeter
+
+from .fake_meter import DEVICE_NUMBER, KEY_HEX, FakeSerial, telegram_bytes
+
+_SUPPLIER = SUPPLIERS[SUPPLIER_EVN_NAME]
+
+
+@pytest.fixture
+def pseudo_terminal():
+    """Open a pseudo terminal, its slave stands in for the port of the M-BUS adapter."""
+    master, slave = os.openpty()
+    yield master, os.ttyname(slave)
+    os.close(master)
+    os.close(slave)
+
+
+@pytest.mark.asyncio
+async def test_serial_smartmeter_read(pseudo_terminal):
+    """Test the telegrams are read from the file descriptor of the port."""
+    master, port = pseudo_terminal
+    adapter = SerialSmartmeter(_SUPPLIER, port, KEY_HEX, read_timeout=5)
+    try:
+        read = asyncio.ensure_future(adapter.async_read())
+        await asyncio.sleep(0.1)
+        telegram = telegram_bytes(_SUPPLIER, power_in=4321)
+        os.write(master, telegram[:100])
+        await asyncio.sleep(0.01)
+        os.write(master, telegram[100:])
+        obisdata = await read
+    finally:
+        adapter.close()
+
+    assert obisdata.DeviceNumber.value == DEVICE_NUMBER
+    assert obisdata.RealPowerIn.value == 4321
+    assert adapter.reader.as_dict()["telegrams"] == 1
+
+
+@pytest.mark.asyncio
+async def test_serial_smartmeter_read_batch_polled():
+    """Test a port without a file descriptor is polled."""
+    stream = b"".join(telegram_bytes(_SUPPLIER, power_in=i) for i in (1, 2, 3))
+    fake_serial = FakeSerial(stream, chunk_size=1000)
+    adapter = SerialSmartmeter(_SUPPLIER, "/dev/ttyUSB1", KEY_HEX, read_timeout=5)
+
+    with patch("serial.Serial", return_value=fake_serial) as serial_mock:
+        try:
+            batch = await adapter.async_read_batch()
+        finally:
+            adapter.close()
+
+    assert [obisdata.RealPowerIn.value for obisdata in batch] == [1, 2, 3]
+    assert serial_mock.call_args.kwargs["timeout"] == 0
+    assert not fake_serial.is_open
+
+
+@pytest.mark.asyncio
+async def test_serial_smartmeter_opens_in_read_executor():
+    """Test the port is opened in the read executor."""
+    fake_serial = FakeSerial(telegram_bytes(_SUPPLIER, power_in=1), chunk_size=1000)
+    executor = ReadExecutor(max_workers=1)
+    adapter = SerialSmartmeter(
+        _SUPPLIER, "/dev/ttyUSB1", KEY_HEX, read_timeout=5, executor=executor)
+
+    with patch("serial.Serial", return_value=fake_serial):
+        try:
+            obisdata = await adapter.async_read()
+        finally:
+            adapter.close()
+            executor.shutdown()
+
+    assert obisdata.RealPowerIn.value == 1
+    assert executor.completed == 1
+
+
+@pytest.mark.asyncio
+async def test_serial_smartmeter_cancel(pseudo_terminal):
+    """Test a waiting read is cancelled right away and the port can be closed."""
+    _, port = pseudo_terminal
+    adapter = SerialSmartmeter(_SUPPLIER, port, KEY_HEX)
+    read = asyncio.ensure_future(adapter.async_read())
+    await asyncio.sleep(0.1)
+
+    started = time.monotonic()
+    read.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await read
+    adapter.close()
+
+    assert time.monotonic() - started < 0.1
+
+
+@pytest.mark.asyncio
+async def test_serial_smartmeter_port_error():
+    """Test a serial exception if the port fails, e.g. the adapter was unplugged."""
+
+    class _UnpluggedSerial(FakeSerial):
+        """Fails after the adapter was unplugged. Helper class."""
+
+        @property
+        def in_waiting(self) -> int:
+            """Fail like an unplugged adapter."""
+            raise serial.SerialException("device disconnected")
+
+    adapter = SerialSmartmeter(_SUPPLIER, "/dev/ttyUSB1", KEY_HEX, read_timeout=5)
+    with (
+        patch("serial.Serial", return_value=_UnpluggedSerial()),
+        pytest.raises(SmartmeterSerialException),
+    ):
+        await adapter.async_read()
@@ -0,0 +1,97 @@
+"""Test the services of the integration."""
+from unittest.mock import patch
+
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_EVN_NAME
+
+from custom_components.smartmeter_austria.const import (
+    CONF_COM_PORT,
+    CONF_KEY_HEX,
+    CONF_SUPPLIER_NAME,
+    DOMAIN,
+)
+from custom_components.smartmeter_austria.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.smartmeter_austria.services import SERVICE_PROFILE
+
+from .fake_meter import DEVICE_NUMBER, KEY_HEX, LoopingFakeSerial
+
+_SUPPLIER_NAME = SUPPLIER_EVN_NAME
+
+
+@pytest.mark.asyncio
+async def test_profile_service(hass, enable_custom_integrations, tmp_path):
+    """Test the profile service profiles the next cycles and writes a report."""
+    hass.config.config_dir = str(tmp_path)
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="my_unique_test_id",
+        data={
+            CONF_SUPPLIER_NAME: _SUPPLIER_NAME,
+            CONF_COM_PORT: "/dev/ttyUSB1",
+            CONF_KEY_HEX: KEY_HEX,
+        },
+    )
+    config_entry.add_to_hass(hass)
+
+    with patch(
+        "serial.Serial",
+        side_effect=lambda **kwargs: LoopingFakeSerial(SUPPLIERS[_SUPPLIER_NAME]),
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = config_entry.runtime_data.coordinator
+
+        with pytest.raises(ServiceValidationError):
+            await hass.services.async_call(
+                DOMAIN, SERVICE_PROFILE, {"config_entry_id": "unknown"}, blocking=True
+            )
+
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_PROFILE,
+            {"config_entry_id": config_entry.entry_id, "cycles": 2},
+            blocking=True,
+        )
+        assert coordinator.profiler is not None
+
+        # One profile at a time
+        with pytest.raises(HomeAssistantError):
+            await hass.services.async_call(
+                DOMAIN,
+                SERVICE_PROFILE,
+                {"config_entry_id": config_entry.entry_id},
+                blocking=True,
+            )
+
+        await coordinator.async_refresh()
+        assert coordinator.profile_summary is None
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+        assert coordinator.profiler is None
+        summary = coordinator.profile_summary
+        assert summary["cycles"] == 2
+        assert summary["functions"]
+
+        reports = list(tmp_path.glob(f"{DOMAIN}_profile_{DEVICE_NUMBER}_*.txt"))
+        assert len(reports) == 1
+        assert reports[0].read_text(encoding="utf-8").startswith("2 update cycles")
+
+        diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+        assert diagnostics["profile"] == summary
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+    # The service is registered once by the integration, not by its entries.
+    assert hass.services.has_service(DOMAIN, SERVICE_PROFILE)
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_PROFILE,
+            {"config_entry_id": config_entry.entry_id},
+            blocking=True,
+        )
@@ -0,0 +1,59 @@
+"""Tests the state of the pipeline stages is kept over restarts."""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.smartmeter_austria.anomaly import ConsumptionAnomalyDetector
+from custom_components.smartmeter_austria.const import DOMAIN
+from custom_components.smartmeter_austria.pipeline import TelegramPipeline
+from custom_components.smartmeter_austria.stage_store import (
+    PipelineStore,
+    async_remove_pipeline_state,
+)
+from custom_components.smartmeter_austria.tariff import CostCalculator, TariffSchedule
+
+_ENTRY_ID = "entry_id"
+_NOW = datetime(2026, 1, 5, 10, tzinfo=timezone(timedelta(hours=1)))
+
+
+def _cost_calculator() -> CostCalculator:
+    """Create a cost calculation at a fixed time. Helper method."""
+    return CostCalculator(TariffSchedule(0.20), now=lambda: _NOW)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_store(hass, hass_storage):
+    """Test the state of the stages is stored by entry and restored."""
+    calculator = _cost_calculator()
+    calculator.restore({"day": [2026, 1, 5], "month": [2026, 1], "import_cost_today": 1.5})
+    detector = ConsumptionAnomalyDetector(now=lambda: _NOW)
+    detector.update(SimpleNamespace(RealPowerIn=SimpleNamespace(value=500)))
+    await PipelineStore(
+        hass, _ENTRY_ID, TelegramPipeline([calculator, detector])).async_save()
+
+    key = f"{DOMAIN}.{_ENTRY_ID}"
+    assert hass_storage[key]["data"]["CostCalculator"]["import_cost_today"] == 1.5
+
+    restored = [_cost_calculator(), ConsumptionAnomalyDetector(now=lambda: _NOW)]
+    await PipelineStore(hass, _ENTRY_ID, TelegramPipeline(restored)).async_restore()
+    assert restored[0].as_state() == calculator.as_state()
+    assert restored[1].as_state() == detector.as_state()
+
+    await async_remove_pipeline_state(hass, _ENTRY_ID)
+    assert key not in hass_storage
+
+
+@pytest.mark.asyncio
+async def test_pipeline_store_invalid_state(hass, hass_storage):
+    """Test an invalid state is skipped."""
+    hass_storage[f"{DOMAIN}.{_ENTRY_ID}"] = {
+        "version": 1,
+        "key": f"{DOMAIN}.{_ENTRY_ID}",
+        "data": {"CostCalculator": {"day": 5}},
+    }
+    calculator = _cost_calculator()
+
+    await PipelineStore(hass, _ENTRY_ID, TelegramPipeline([calculator])).async_restore()
+
+    assert calculator.as_state()["day"] is None
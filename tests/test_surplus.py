@@ -0,0 +1,113 @@
+"""Tests the solar surplus controller."""
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from smartmeter_austria_energy.constants import PhysicalUnits
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.obisvalue import ObisValueFloat
+
+from custom_components.smartmeter_austria.pipeline import TelegramClock, TelegramPipeline
+from custom_components.smartmeter_austria.surplus import (
+    SURPLUS_FILTER_EMA,
+    SURPLUS_FILTER_MEDIAN,
+    SURPLUS_FILTER_NONE,
+    SURPLUS_POWER,
+    SURPLUS_SETPOINT,
+    SurplusController,
+)
+
+
+def _obisdata(power_in: int, power_out: int) -> ObisData:
+    """Create a telegram with the power in W. Helper method."""
+    obisdata = ObisData(dec=None, wanted_values=[])
+    obisdata.RealPowerIn = ObisValueFloat(power_in, PhysicalUnits.W)
+    obisdata.RealPowerOut = ObisValueFloat(power_out, PhysicalUnits.W)
+    return obisdata
+
+
+class _Clock:
+    """Advances 5 seconds per call, like the telegrams of a meter. Helper class."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.moment = datetime(2026, 1, 1, 12, tzinfo=UTC)
+
+    def __call__(self) -> datetime:
+        """Return the next time."""
+        self.moment += timedelta(seconds=5)
+        return self.moment
+
+
+def test_surplus_median_ignores_spikes():
+    """Test the median filter ignores a single spike of the flow."""
+    controller = SurplusController(
+        SURPLUS_FILTER_MEDIAN, window=5, ramp_rate=0, now=_Clock())
+
+    for power_in, power_out in ((0, 2000), (0, 2000), (3000, 0), (0, 2000), (0, 2000)):
+        values = controller.update(_obisdata(power_in, power_out))
+
+    assert values[SURPLUS_POWER] == 2000.0
+
+
+def test_surplus_ema_smooths():
+    """Test the moving average follows a step of the flow slowly."""
+    controller = SurplusController(
+        SURPLUS_FILTER_EMA, window=5, ramp_rate=0, now=_Clock())
+
+    controller.update(_obisdata(0, 0))
+    values = controller.update(_obisdata(0, 1200))
+
+    assert values[SURPLUS_POWER] == pytest.approx(400.0)
+
+
+def test_surplus_setpoint_is_ramped():
+    """Test the setpoint follows the surplus with the ramp rate."""
+    controller = SurplusController(
+        SURPLUS_FILTER_NONE, ramp_rate=100, max_power=1500, now=_Clock())
+
+    setpoints = [
+        controller.update(_obisdata(0, 2000))[SURPLUS_SETPOINT] for _ in range(5)
+    ]
+    assert setpoints == [0.0, 500.0, 1000.0, 1500.0, 1500.0]
+
+    # The consumer draws the setpoint, an import lowers it.
+    values = controller.update(_obisdata(300, 0))
+    assert values[SURPLUS_POWER] == -300.0
+    assert values[SURPLUS_SETPOINT] == 1200.0
+
+
+def test_surplus_setpoint_never_negative():
+    """Test the setpoint stays at 0 while power is imported."""
+    controller = SurplusController(SURPLUS_FILTER_NONE, now=_Clock())
+
+    for _ in range(3):
+        values = controller.update(_obisdata(1000, 0))
+
+    assert values[SURPLUS_SETPOINT] == 0.0
+
+
+def test_surplus_configure():
+    """Test new parameters keep the setpoint and unknown filters are rejected."""
+    controller = SurplusController(
+        SURPLUS_FILTER_NONE, ramp_rate=1000, now=_Clock())
+    controller.update(_obisdata(0, 1000))
+    controller.update(_obisdata(0, 1000))
+
+    controller.configure(SURPLUS_FILTER_MEDIAN, window=3, ramp_rate=0)
+
+    assert controller.update(_obisdata(0, 0))[SURPLUS_SETPOINT] == 1000.0
+    with pytest.raises(ValueError):
+        controller.configure("kalman")
+
+
+def test_surplus_setpoint_is_ramped_in_catch_up_batch():
+    """Test the telegrams of a catch-up batch ramp the setpoint one push period apart."""
+    start = datetime(2026, 1, 1, 12, tzinfo=UTC)
+    clock = TelegramClock(lambda: start)
+    controller = SurplusController(
+        SURPLUS_FILTER_NONE, ramp_rate=100, max_power=1500, now=clock)
+    pipeline = TelegramPipeline([controller], clock)
+
+    pipeline.process_batch([_obisdata(0, 2000) for _ in range(4)])
+
+    assert pipeline.values[SURPLUS_SETPOINT] == 1500.0
@@ -0,0 +1,166 @@
+"""Tests the tariff and the cost calculation."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from smartmeter_austria_energy.constants import PhysicalUnits
+from smartmeter_austria_energy.obisdata import ObisData
+from smartmeter_austria_energy.obisvalue import ObisValueFloat
+
+from custom_components.smartmeter_austria.tariff import (
+    CURRENT_IMPORT_PRICE,
+    EXPORT_REVENUE_MONTH,
+    EXPORT_REVENUE_TODAY,
+    IMPORT_COST_MONTH,
+    IMPORT_COST_TODAY,
+    CostCalculator,
+    TariffSchedule,
+    load_dynamic_prices,
+    parse_peak_hours,
+)
+
+_TZ = timezone(timedelta(hours=1))
+
+# 2026-01-05 is a Monday.
+_MONDAY = datetime(2026, 1, 5, tzinfo=_TZ)
+
+
+def _obisdata(energy_in: int, energy_out: int) -> ObisData:
+    """Create a telegram with the energy counters in Wh. Helper method."""
+    obisdata = ObisData(dec=None, wanted_values=[])
+    obisdata.RealEnergyIn = ObisValueFloat(energy_in, PhysicalUnits.Wh)
+    obisdata.RealEnergyOut = ObisValueFloat(energy_out, PhysicalUnits.Wh)
+    return obisdata
+
+
+def test_parse_peak_hours():
+    """Test parsing of valid peak hours."""
+    assert parse_peak_hours("mon-fri 06:00-22:00; sat,sun 08:00-12:00; 23:00-24:00") == [
+        (frozenset(range(5)), 360, 1320),
+        (frozenset({5, 6}), 480, 720),
+        (frozenset(range(7)), 1380, 1440),
+    ]
+    assert parse_peak_hours("mon-fri 22:00-06:00") == [(frozenset(range(5)), 1320, 360)]
+    assert parse_peak_hours("") == []
+
+
+@pytest.mark.parametrize(
+    "peak_hours",
+    ["mon-fri", "mon-fri 06:00-06:00", "xyz 06:00-08:00", "fri-mon 06:00-08:00",
+     "mon 06:00-25:00", "mon 0600-0800"],
+)
+def test_parse_peak_hours_invalid(peak_hours):
+    """Test invalid peak hours are rejected."""
+    with pytest.raises(ValueError):
+        parse_peak_hours(peak_hours)
+
+
+def test_schedule_price():
+    """Test the peak price is used in the peak hours only."""
+    schedule = TariffSchedule(0.20, 0.30, "mon-fri 06:00-22:00")
+
+    assert schedule.price(_MONDAY.replace(hour=5, minute=59)) == 0.20
+    assert schedule.price(_MONDAY.replace(hour=6)) == 0.30
+    assert schedule.price(_MONDAY.replace(hour=21, minute=59)) == 0.30
+    assert schedule.price(_MONDAY.replace(hour=22)) == 0.20
+    assert schedule.price(_MONDAY + timedelta(days=5, hours=12)) == 0.20
+
+
+def test_schedule_price_overnight():
+    """Test overnight peak hours run past midnight, Sunday into Monday."""
+    schedule = TariffSchedule(0.20, 0.30, "fri,sun 22:00-06:00")
+
+    assert schedule.price(_MONDAY.replace(hour=5, minute=59)) == 0.30
+    assert schedule.price(_MONDAY.replace(hour=6)) == 0.20
+    assert schedule.price(_MONDAY.replace(hour=22)) == 0.20
+    assert schedule.price(_MONDAY + timedelta(days=4, hours=22)) == 0.30
+    assert schedule.price(_MONDAY + timedelta(days=5, hours=5)) == 0.30
+    assert schedule.price(_MONDAY + timedelta(days=5, hours=22)) == 0.20
+
+
+def test_schedule_dynamic_prices(tmp_path):
+    """Test the dynamic prices are used while they are valid."""
+    price_file = tmp_path / "prices.csv"
+    price_file.write_text(
+        "start,price\n"
+        "2026-01-05T10:00:00+01:00,0.10\n"
+        "2026-01-05T11:00:00+01:00;0.50\n",
+        encoding="utf-8",
+    )
+    schedule = TariffSchedule(0.20, dynamic_prices=load_dynamic_prices(str(price_file)))
+
+    assert schedule.price(_MONDAY.replace(hour=9, minute=59)) == 0.20
+    assert schedule.price(_MONDAY.replace(hour=10, minute=45)) == 0.10
+    assert schedule.price(_MONDAY.replace(hour=11)) == 0.50
+    # the last price is valid for at most 24 hours
+    assert schedule.price(_MONDAY.replace(hour=11) + timedelta(days=1)) == 0.20
+
+
+def test_load_dynamic_prices_without_time_zone(tmp_path):
+    """Test prices without time zone are rejected."""
+    price_file = tmp_path / "prices.csv"
+    price_file.write_text("2026-01-05T10:00:00,0.10\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        load_dynamic_prices(str(price_file))
+
+
+def test_cost_calculator():
+    """Test the energy deltas are priced and the daily totals are reset."""
+    moments = iter([
+        _MONDAY.replace(hour=5),
+        _MONDAY.replace(hour=7),
+        _MONDAY.replace(hour=8),
+        _MONDAY + timedelta(days=1, hours=1),
+    ])
+    calculator = CostCalculator(
+        TariffSchedule(0.20, 0.30, "mon-fri 06:00-22:00"),
+        export_price=0.10,
+        now=lambda: next(moments),
+    )
+
+    values = calculator.update(_obisdata(1_000_000, 500_000))
+    assert values[IMPORT_COST_TODAY] == 0
+    assert values[CURRENT_IMPORT_PRICE] == 0.20
+
+    calculator.update(_obisdata(1_002_000, 500_000))
+    values = calculator.update(_obisdata(1_003_000, 504_000))
+    assert values[CURRENT_IMPORT_PRICE] == 0.30
+    assert values[IMPORT_COST_TODAY] == pytest.approx(0.9)
+    assert values[EXPORT_REVENUE_TODAY] == pytest.approx(0.4)
+
+    values = calculator.update(_obisdata(1_004_000, 504_000))
+    assert values[IMPORT_COST_TODAY] == pytest.approx(0.2)
+    assert values[IMPORT_COST_MONTH] == pytest.approx(1.1)
+    assert values[EXPORT_REVENUE_TODAY] == 0
+    assert values[EXPORT_REVENUE_MONTH] == pytest.approx(0.4)
+
+
+def test_cost_calculator_restore():
+    """Test the totals continue after a restart and are reset on a new day.
+
+    The energy while the integration was stopped is counted with the first telegram.
+    """
+    moments = iter([_MONDAY.replace(hour=5), _MONDAY.replace(hour=6), _MONDAY + timedelta(days=1)])
+    schedule = TariffSchedule(0.20)
+    calculator = CostCalculator(schedule, now=lambda: next(moments))
+    calculator.update(_obisdata(1_000_000, 0))
+    calculator.update(_obisdata(1_001_000, 0))
+
+    restarted = CostCalculator(schedule, now=lambda: next(moments))
+    restarted.restore(calculator.as_state())
+    values = restarted.update(_obisdata(1_002_000, 0))
+
+    assert values[IMPORT_COST_TODAY] == pytest.approx(0.2)
+    assert values[IMPORT_COST_MONTH] == pytest.approx(0.4)
+
+
+def test_cost_calculator_last_reset():
+    """Test the totals are reset at the start of the day and the month."""
+    calculator = CostCalculator(TariffSchedule(0.20), now=lambda: _MONDAY.replace(hour=5))
+    assert calculator.last_reset(IMPORT_COST_TODAY) is None
+
+    calculator.update(_obisdata(1_000_000, 0))
+
+    assert calculator.last_reset(IMPORT_COST_TODAY) == _MONDAY
+    assert calculator.last_reset(EXPORT_REVENUE_MONTH) == _MONDAY.replace(day=1)
+    assert calculator.last_reset(CURRENT_IMPORT_PRICE) is None
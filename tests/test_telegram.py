@@ -0,0 +1,202 @@
+"""Tests the telegram reader and decoder."""
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+from smartmeter_austria_energy.supplier import SUPPLIERS, SUPPLIER_EVN_NAME
+
+from custom_components.smartmeter_austria.telegram import (
+    RECEIVE_BUFFER_SIZE,
+    Telegram,
+    TelegramDecodeCache,
+    TelegramReader,
+    decode_telegram,
+)
+
+from .fake_meter import DEVICE_NUMBER, KEY_HEX, SYSTEM_TITLE, telegram_bytes
+
+_SUPPLIER = SUPPLIERS[SUPPLIER_EVN_NAME]
+
+
+def test_telegram_reader_complete_telegram():
+    """Test a complete telegram is returned."""
+    reader = TelegramReader()
+
+    telegrams = reader.feed(telegram_bytes(_SUPPLIER))
+
+    assert len(telegrams) == 1
+    assert telegrams[0].system_title == SYSTEM_TITLE
+
+
+def test_telegram_reader_chunks():
+    """Test a telegram split into small chunks is assembled."""
+    reader = TelegramReader()
+    stream = telegram_bytes(_SUPPLIER) * 2
+
+    telegrams = []
+    for pos in range(0, len(stream), 7):
+        telegrams += reader.feed(stream[pos : pos + 7])
+
+    assert len(telegrams) == 2
+
+
+def test_telegram_reader_large_chunk():
+    """Test a chunk larger than the receive buffer is split into all its telegrams."""
+    reader = TelegramReader()
+    stream = b"".join(
+        telegram_bytes(_SUPPLIER, invocation_counter=ic, power_in=ic)
+        for ic in range(1, 21)
+    )
+
+    telegrams = reader.feed(stream)
+
+    assert len(stream) > RECEIVE_BUFFER_SIZE
+    assert [telegram.frame1 + telegram.frame2 for telegram in telegrams] == [
+        telegram_bytes(_SUPPLIER, invocation_counter=ic, power_in=ic)
+        for ic in range(1, 21)
+    ]
+
+
+def test_telegram_reader_allocations():
+    """Test the frames are assembled without copies of the received chunk."""
+    reader = TelegramReader()
+    stream = b"".join(
+        telegram_bytes(_SUPPLIER, invocation_counter=ic) for ic in range(1, 101)
+    )
+    reader.feed(stream[:1000])
+    chunk = stream[1000:]
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        telegrams = reader.feed(chunk)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Only the returned frames are kept, the temporary allocations are far
+    # below the size of the chunk.
+    assert len(telegrams) == 97
+    assert peak - current < 2048
+
+
+def test_telegram_reader_resyncs_after_garbage():
+    """Test garbage and truncated frames are skipped."""
+    reader = TelegramReader()
+    telegram = telegram_bytes(_SUPPLIER)
+
+    telegrams = reader.feed(b"\x68\x01\x16garbage" + telegram[:100] + telegram)
+
+    assert len(telegrams) == 1
+
+
+def test_telegram_reader_rejects_bad_checksum():
+    """Test a frame with a wrong checksum is dropped and counted."""
+    reader = TelegramReader()
+    telegram = bytearray(telegram_bytes(_SUPPLIER))
+    telegram[20] ^= 0xFF
+
+    telegrams = reader.feed(bytes(telegram) + telegram_bytes(_SUPPLIER))
+
+    assert len(telegrams) == 1
+    assert reader.bad_checksums == 1
+    assert reader.orphaned_frames == 1
+    assert reader.skipped_bytes > 0
+    assert reader.as_dict()["telegrams"] == 1
+
+
+def test_telegram_reader_reset():
+    """Test reset drops a partially received telegram."""
+    reader = TelegramReader()
+    telegram = telegram_bytes(_SUPPLIER)
+    reader.feed(telegram[:300])
+
+    reader.reset()
+
+    assert reader.feed(telegram[300:]) == []
+
+
+def test_decode_telegram_all_suppliers():
+    """Test the telegrams of all suppliers are decoded."""
+    for supplier in SUPPLIERS.values():
+        telegram = TelegramReader().feed(telegram_bytes(supplier, power_in=1234))[0]
+
+        obisdata = decode_telegram(supplier, telegram, KEY_HEX)
+
+        assert obisdata.DeviceNumber.value == DEVICE_NUMBER
+        assert obisdata.RealPowerIn.value == 1234
+
+
+def test_decode_telegram_extra_values():
+    """Test supplied values which ObisData does not keep are decoded too."""
+    telegram = TelegramReader().feed(telegram_bytes(_SUPPLIER, power_factor=987))[0]
+
+    obisdata = decode_telegram(_SUPPLIER, telegram, KEY_HEX)
+
+    assert obisdata.Factor.value == 0.987
+
+
+def test_decode_cache_duplicates():
+    """Test a duplicate telegram is not decoded again."""
+    cache = TelegramDecodeCache(size=2)
+    telegram = TelegramReader().feed(telegram_bytes(_SUPPLIER))[0]
+    duplicate = TelegramReader().feed(telegram_bytes(_SUPPLIER))[0]
+
+    with patch(
+        "custom_components.smartmeter_austria.telegram.decode_telegram",
+        wraps=decode_telegram,
+    ) as decode_mock:
+        first = cache.decode(_SUPPLIER, telegram, KEY_HEX)
+        second = cache.decode(_SUPPLIER, duplicate, KEY_HEX)
+
+    assert second is first
+    assert decode_mock.call_count == 1
+    assert cache.as_dict() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_decode_cache_evicts_oldest():
+    """Test the least recently used telegram is dropped."""
+    cache = TelegramDecodeCache(size=2)
+    telegrams = [
+        TelegramReader().feed(telegram_bytes(_SUPPLIER, invocation_counter=ic))[0]
+        for ic in (1, 2, 3)
+    ]
+
+    for telegram in telegrams:
+        cache.decode(_SUPPLIER, telegram, KEY_HEX)
+    cache.decode(_SUPPLIER, telegrams[0], KEY_HEX)
+
+    assert cache.hits == 0
+    assert cache.misses == 4
+
+
+def test_decode_cache_batch_skips_corrupt_telegram():
+    """Test a batch is decoded oldest first and corrupt telegrams are skipped."""
+    cache = TelegramDecodeCache()
+    telegrams = [
+        TelegramReader().feed(
+            telegram_bytes(_SUPPLIER, invocation_counter=ic, power_in=ic)
+        )[0]
+        for ic in (1, 2)
+    ]
+    corrupt = Telegram(bytes(20), bytes(20))
+
+    def _decode(supplier, telegram, key_hex):
+        """Fail for the corrupt telegram. Helper method."""
+        if telegram is corrupt:
+            raise ValueError()
+        return decode_telegram(supplier, telegram, key_hex)
+
+    with patch(
+        "custom_components.smartmeter_austria.telegram.decode_telegram",
+        side_effect=_decode,
+    ):
+        batch = cache.decode_batch(
+            _SUPPLIER, [telegrams[0], corrupt, telegrams[1]], KEY_HEX)
+
+        with pytest.raises(ValueError):
+            cache.decode_batch(_SUPPLIER, [corrupt], KEY_HEX)
+
+    assert [obisdata.RealPowerIn.value for obisdata in batch] == [1, 2]
+    assert cache.pop_skipped() == 1
+    assert cache.pop_skipped() == 0
@@ -0,0 +1,125 @@
+"""Tests the watchdog of the telegrams and the search of the USB adapters."""
+import os
+from unittest.mock import patch
+
+from serial.tools.list_ports_common import ListPortInfo
+
+from custom_components.smartmeter_austria.watchdog import (
+    PortIdentity,
+    TelegramWatchdog,
+    find_port,
+    identify_port,
+)
+
+
+def _port_info(
+    device: str,
+    vid: int | None = 0x0403,
+    pid: int | None = 0x6001,
+    serial_number: str | None = "A10K1234",
+    location: str | None = "1-1.2",
+) -> ListPortInfo:
+    """Create the port info of an USB serial adapter. Helper method."""
+    port_info = ListPortInfo(device, skip_link_detection=True)
+    port_info.vid = vid
+    port_info.pid = pid
+    port_info.serial_number = serial_number
+    port_info.location = location
+    return port_info
+
+
+class _Clock:
+    """Returns the time set by the test. Helper class."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.seconds = 0.0
+
+    def __call__(self) -> float:
+        """Return the time."""
+        return self.seconds
+
+
+def test_identify_port_by_id(tmp_path):
+    """Test the by-id link of an adapter is found."""
+    device = tmp_path / "ttyUSB0"
+    device.touch()
+    by_id_directory = tmp_path / "by-id"
+    by_id_directory.mkdir()
+    by_id = by_id_directory / "usb-FTDI_A10K1234-if00-port0"
+    by_id.symlink_to(device)
+    ports = [_port_info(str(device)), _port_info(str(by_id))]
+
+    with patch(
+        "custom_components.smartmeter_austria.watchdog.BY_ID_DIRECTORY",
+        f"{by_id_directory}{os.sep}",
+    ):
+        identity = identify_port(str(device), ports)
+
+    assert identity == PortIdentity(
+        str(by_id), 0x0403, 0x6001, "A10K1234", "1-1.2")
+    assert identity.is_usb
+    assert identify_port("/dev/ttyUSB7", ports) is None
+
+
+def test_find_port_after_enumeration():
+    """Test an adapter is found on its new port by VID, PID and serial number."""
+    identity = PortIdentity(None, 0x0403, 0x6001, "A10K1234", "1-1.2")
+    ports = [
+        _port_info("/dev/ttyUSB0", serial_number="OTHER"),
+        _port_info("/dev/ttyUSB1"),
+    ]
+
+    assert find_port(identity, ports) == "/dev/ttyUSB1"
+    assert find_port(identity, ports[:1]) is None
+    assert find_port(PortIdentity(), ports) is None
+
+
+def test_find_port_identical_adapters():
+    """Test identical adapters without serial number are told apart by their location."""
+    identity = PortIdentity(None, 0x1A86, 0x7523, None, "1-1.3")
+    ports = [
+        _port_info("/dev/ttyUSB0", 0x1A86, 0x7523, None, "1-1.2"),
+        _port_info("/dev/ttyUSB1", 0x1A86, 0x7523, None, "1-1.3"),
+    ]
+
+    assert find_port(identity, ports) == "/dev/ttyUSB1"
+    assert find_port(PortIdentity(None, 0x1A86, 0x7523, None, "1-1.4"), ports) is None
+
+
+def test_find_port_prefers_by_id(tmp_path):
+    """Test the by-id link is used while it exists."""
+    by_id = tmp_path / "usb-FTDI_A10K1234-if00-port0"
+    by_id.touch()
+    identity = PortIdentity(str(by_id), 0x0403, 0x6001, "A10K1234", "1-1.2")
+
+    assert find_port(identity, [_port_info("/dev/ttyUSB1")]) == str(by_id)
+
+
+def test_watchdog_recovery():
+    """Test stale telegrams are detected and the recovery time is measured."""
+    clock = _Clock()
+    watchdog = TelegramWatchdog(
+        "/dev/ttyUSB0", PortIdentity(vid=0x0403), monotonic=clock)
+
+    # 5 s update interval and 3 missed telegrams of 5 s
+    clock.seconds = 20.0
+    assert not watchdog.rescan_due(5)
+    clock.seconds = 21.0
+    assert watchdog.rescan_due(5)
+
+    # The ports are not scanned again right away.
+    clock.seconds = 25.0
+    assert not watchdog.rescan_due(5)
+    clock.seconds = 31.0
+    assert watchdog.rescan_due(5)
+
+    watchdog.port_rebound("/dev/ttyUSB1")
+    clock.seconds = 33.5
+    watchdog.telegram_received()
+
+    assert watchdog.port == "/dev/ttyUSB1"
+    assert watchdog.recoveries == 1
+    assert watchdog.recovery_time == 12.5
+    assert not watchdog.rescan_due(5)
+    assert watchdog.as_dict()["telegram_age"] == 0